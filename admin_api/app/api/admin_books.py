@@ -1,14 +1,127 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import io
+import json
+import tempfile
+from typing import Any, Iterator, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
-from ..crud import books
-from .. import schemas
+from ..crud import books, facets
+from .. import models, schemas
+from ..config import settings
 from ..dependencies import get_db
-from ..publisher import publish_event
+from ..etag import book_etag, etag_matches, not_modified, page_etag
+from ..pagination import cursor_param, set_next_cursor
+from ..projection import Projection, json_response
+from ..publisher import publish_event, publish_events
 
 router = APIRouter()
 
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+CSV_TYPES = ("text/csv", "application/csv")
+
+# Request bodies above this size are spooled to disk during a bulk import
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+# Listing pages are read as these columns and dumped without validation
+BOOK_ROWS = Projection(schemas.Book, models.Book)
+
+
+def _read_records(stream, content_type: str) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield (row number, record) pairs from a JSON array, NDJSON or CSV body.
+    A record that cannot be decoded is yielded as the exception instead.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+
+    if content_type in NDJSON_TYPES:
+        lines = (line for line in text if line.strip())
+        for row, line in enumerate(lines, start=1):
+            try:
+                yield row, json.loads(line)
+            except ValueError as e:
+                yield row, e
+    elif content_type in CSV_TYPES:
+        for row, record in enumerate(csv.DictReader(text), start=1):
+            # Empty cells mean "not set", e.g. a missing description
+            yield row, {key: value if value != "" else None for key, value in record.items()}
+    else:
+        try:
+            records = json.load(text)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON body: {str(e)}")
+        if not isinstance(records, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of books")
+        yield from enumerate(records, start=1)
+
+
+def _import_books(stream, content_type: str, db: Session) -> schemas.BulkImportResult:
+    """Validate records and insert them chunk by chunk, collecting per-row errors"""
+    result = schemas.BulkImportResult(created=0, errors=[], unpublished=[])
+    chunk: List[Tuple[int, schemas.BookCreate]] = []
+
+    def flush():
+        created, errors = books.book.bulk_create(
+            db, objs_in=[book_in for _, book_in in chunk], chunk_size=len(chunk)
+        )
+        for index, detail in errors:
+            row, book_in = chunk[index]
+            result.errors.append(schemas.BulkImportError(row=row, isbn=book_in.isbn, detail=detail))
+        result.created += len(created)
+
+        # Notify frontend service with one batch of book_created events per chunk.
+        # The chunk is already committed, so a failure is reported, not raised.
+        if created:
+            try:
+                publish_events("book_created", created)
+            except Exception as e:
+                rows = {book_in.isbn: row for row, book_in in chunk}
+                result.unpublished.extend(
+                    schemas.BulkImportError(row=rows[book["isbn"]], isbn=book["isbn"], detail=f"Event not published: {str(e)}")
+                    for book in created
+                )
+        chunk.clear()
+
+    for row, record in _read_records(stream, content_type):
+        if isinstance(record, Exception):
+            result.errors.append(schemas.BulkImportError(row=row, detail=f"Invalid JSON: {str(record)}"))
+            continue
+        try:
+            book_in = schemas.BookCreate.model_validate(record)
+        except ValidationError as e:
+            detail = "; ".join(
+                f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in e.errors()
+            )
+            isbn = record.get("isbn") if isinstance(record, dict) else None
+            result.errors.append(schemas.BulkImportError(row=row, isbn=isbn, detail=detail))
+            continue
+
+        chunk.append((row, book_in))
+        if len(chunk) >= settings.BULK_IMPORT_CHUNK_SIZE:
+            flush()
+
+    if chunk:
+        flush()
+    result.errors.sort(key=lambda error: error.row)
+    return result
+
+
+def _book_page(request: Request, response: Response, db: Session, statement, limit: int):
+    """
+    Serve one listing page with an ETag. A client whose If-None-Match still
+    matches gets a 304, decided from the page's (id, version) pairs alone.
+    """
+    if request.headers.get("if-none-match"):
+        etag = page_etag(books.book.get_versions(db, statement))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    rows = books.book.get_listing(db, statement)
+    set_next_cursor(request, response, rows, limit)
+    response.headers["ETag"] = page_etag((row.id, row.version) for row in rows)
+    return json_response(BOOK_ROWS.to_dicts(rows), response)
+
 #Create a new book
 @router.post("/", response_model=schemas.Book)
 def create_book(book: schemas.BookCreate, db: Session = Depends(get_db)):
@@ -26,43 +139,112 @@ def create_book(book: schemas.BookCreate, db: Session = Depends(get_db)):
     return db_book
 
 
+#Bulk import books
+@router.post("/bulk", response_model=schemas.BulkImportResult)
+async def bulk_create_books(request: Request, db: Session = Depends(get_db)):
+    """
+    Import many books at once from a JSON array, NDJSON (application/x-ndjson)
+    or CSV (text/csv) body. Rows are inserted in chunks; invalid rows and
+    duplicate ISBNs are reported per row without aborting the import. Rows
+    created but whose book_created event could not be published are listed
+    in `unpublished`.
+    """
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+
+    # Stream the body into a spooled file so memory stays bounded
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as spool:
+        async for data in request.stream():
+            spool.write(data)
+        spool.seek(0)
+        return await run_in_threadpool(_import_books, spool, content_type, db)
+
+
 #Fetch all books
 @router.get("/", response_model=List[schemas.Book])
-def read_books(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_books(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[int] = Depends(cursor_param),
+    db: Session = Depends(get_db)
+):
     """
     Retrieve all books in the catalog.
+
+    Full pages carry an `X-Next-Cursor` header (and a `Link: rel="next"`);
+    pass it back as `cursor` to fetch the next page without OFFSET. The
+    other admin listings page the same way.
+
+    Pages carry an `ETag`; send it back in `If-None-Match` to get a 304
+    without a body while none of the page's books changed.
     """
-    book_list = books.book.get_multi(db, skip=skip, limit=limit)
-    return book_list
+    statement = books.book.listing_statement(skip=skip, limit=limit, after=after, projection=BOOK_ROWS)
+    return _book_page(request, response, db, statement, limit)
 
 
 #Fetch all available books
 @router.get("/available/", response_model=List[schemas.Book])
-def read_available_books(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_available_books(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[int] = Depends(cursor_param),
+    db: Session = Depends(get_db)
+):
     """
     Retrieve all books that are currently available for borrowing.
     """
-    return books.book.get_available_books(db, skip=skip, limit=limit)
+    statement = books.book.listing_statement(is_available=True, skip=skip, limit=limit, after=after, projection=BOOK_ROWS)
+    return _book_page(request, response, db, statement, limit)
 
 
 #Fetch all unavailable books
 @router.get("/unavailable/", response_model=List[schemas.Book])
-def read_unavailable_books(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_unavailable_books(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[int] = Depends(cursor_param),
+    db: Session = Depends(get_db)
+):
     """
     Retrieve all books that are currently unavailable (checked out).
     """
-    return books.book.get_unavailable_books(db, skip=skip, limit=limit)
+    statement = books.book.listing_statement(is_available=False, skip=skip, limit=limit, after=after, projection=BOOK_ROWS)
+    return _book_page(request, response, db, statement, limit)
+
+
+#Fetch category and publisher counts
+@router.get("/facets", response_model=schemas.BookFacets)
+def read_book_facets(db: Session = Depends(get_db)):
+    """
+    Number of books, and of available books, per category and per publisher,
+    for catalog navigation.
+    """
+    counts = facets.get_all(db)
+    return {"categories": counts["category"], "publishers": counts["publisher"]}
 
 
 #Get a specific book by ID
 @router.get("/{book_id}", response_model=schemas.Book)
-def read_book(book_id: int, db: Session = Depends(get_db)):
+def read_book(book_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
     """
     Get a specific book by ID.
+
+    Responses carry an `ETag`; send it back in `If-None-Match` to get a
+    304 without a body while the book is unchanged.
     """
+    if request.headers.get("if-none-match"):
+        version = books.book.get_version(db, id=book_id)
+        if version is not None and etag_matches(request, book_etag(book_id, version)):
+            return not_modified(book_etag(book_id, version))
     db_book = books.book.get(db, id=book_id)
     if db_book is None:
         raise HTTPException(status_code=404, detail="Book not found")
+    response.headers["ETag"] = book_etag(db_book.id, db_book.version)
     return db_book
 
 
@@ -1,37 +1,103 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
-from ..crud import books, lending
+from ..crud import books, lending, overdue
+from ..crud.overdue import MOST_OVERDUE, LEAST_OVERDUE
 from ..crud.users import user as users
-from .. import schemas
+from .. import models, schemas
 from ..dependencies import get_db
+from ..pagination import (
+    cursor_param, decode_sort_cursor, encode_sort_cursor, link_next_page, set_next_cursor
+)
+from ..projection import Projection, json_response
 from ..publisher import publish_event
+from ..streaming import StreamFormat, serializer, stream_rows
 
 
 router = APIRouter()
 
+# Listing pages are read as these columns and dumped without validation
+ACTIVE_LENDING_ROWS = Projection(schemas.LendingWithUserAndBook, models.Lending)
+OVERDUE_ROWS = Projection(
+    schemas.OverdueLending, models.Lending,
+    computed={"days_overdue": lambda item: (date.today() - item["due_date"]).days}
+)
+
+
 #User borrowed books
 @router.get("/borrowed-books/", response_model=List[schemas.LendingWithUserAndBook])
-def read_borrowed_books(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_borrowed_books(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[int] = Depends(cursor_param),
+    stream: Optional[StreamFormat] = None,
+    db: Session = Depends(get_db)
+):
     """
     Fetch/List users and the books they have borrowed.
+
+    `stream=ndjson` (or `stream=json`) streams every active lending after
+    `cursor` instead of one page, with memory use independent of the count.
     """
-    return lending.get_active_lendings(db, skip=skip, limit=limit)
+    if stream:
+        statement = lending.active_lendings_statement().order_by(models.Lending.id)
+        if after is not None:
+            statement = statement.where(models.Lending.id > after)
+        return stream_rows(db, statement, serializer(schemas.LendingWithUserAndBook), stream)
+
+    rows = lending.get_active_lendings(db, skip=skip, limit=limit, after=after, projection=ACTIVE_LENDING_ROWS)
+    set_next_cursor(request, response, rows, limit)
+    return json_response(ACTIVE_LENDING_ROWS.to_dicts(rows), response)
 
 
 #Unavailable books
 @router.get("/unavailable-books/", response_model=List[schemas.BookWithDueDate])
-def read_unavailable_books(db: Session = Depends(get_db)):
+def read_unavailable_books(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[int] = Depends(cursor_param),
+    category: Optional[str] = None,
+    publisher: Optional[str] = None,
+    stream: Optional[StreamFormat] = None,
+    db: Session = Depends(get_db)
+):
     """
-    Fetch/List books that are not available for borrowing (showing when they will be available).
+    Fetch/List books that are not available for borrowing (showing when they will be available),
+    optionally only those of one category and/or publisher.
+
+    `stream=ndjson` (or `stream=json`) streams every matching book after
+    `cursor` instead of one page.
     """
-    return lending.get_unavailable_books(db)
+    if stream:
+        statement = lending.unavailable_books_statement(category=category, publisher=publisher)
+        if after is not None:
+            statement = statement.where(models.Lending.book_id > after)
+        return stream_rows(db, statement, serializer(schemas.BookWithDueDate), stream)
+
+    books = lending.get_unavailable_books(
+        db, skip=skip, limit=limit, after=after, category=category, publisher=publisher
+    )
+    set_next_cursor(request, response, books, limit)
+    return books
 
 
 #Borrowed books by user
 @router.get("/user-borrowings/{user_id}", response_model=List[schemas.LendingWithBook])
-def read_user_borrowings(user_id: int, db: Session = Depends(get_db)):
+def read_user_borrowings(
+    user_id: int,
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[int] = Depends(cursor_param),
+    db: Session = Depends(get_db)
+):
     """
     Get all books borrowed by a specific user.
     """
@@ -40,7 +106,9 @@ def read_user_borrowings(user_id: int, db: Session = Depends(get_db)):
     if not user_record:
         raise HTTPException(status_code=404, detail="User not found")
     
-    return lending.get_user_lendings(db, user_id=user_id)  
+    lendings = lending.get_user_lendings(db, user_id=user_id, skip=skip, limit=limit, after=after)
+    set_next_cursor(request, response, lendings, limit)
+    return lendings
 
 
 #Process a book return
@@ -71,9 +139,39 @@ def return_book(lending_id: int, db: Session = Depends(get_db)):
 
 
 #Get all overdue books
-@router.get("/overdue-books/", response_model=List[schemas.LendingWithUserAndBook])
-def read_overdue_books(db: Session = Depends(get_db)):
+@router.get("/overdue-books/", response_model=List[schemas.OverdueLending])
+def read_overdue_books(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    sort: Literal[MOST_OVERDUE, LEAST_OVERDUE] = MOST_OVERDUE,
+    cursor: Optional[str] = None,
+    stream: Optional[StreamFormat] = None,
+    db: Session = Depends(get_db)
+):
     """
-    Get all books that are overdue.
+    Get overdue books, most days overdue first (`sort=days_overdue` for the
+    least overdue first).
+
+    Full pages carry an `X-Next-Cursor` header (and a `Link: rel="next"`);
+    pass it back as `cursor` to fetch the next page. `stream=ndjson` (or
+    `stream=json`) streams every overdue lending after `cursor` instead.
     """
-    return lending.get_overdue_lendings(db)
\ No newline at end of file
+    after = None
+    if cursor:
+        try:
+            due_date, lending_id = decode_sort_cursor(cursor, sort)
+            after = (date.fromisoformat(due_date), lending_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    overdue.ensure_current(db)
+    if stream:
+        statement = overdue.listing_statement(sort=sort, after=after)
+        return stream_rows(db, statement, serializer(schemas.OverdueLending), stream)
+
+    rows = overdue.get_page(db, sort=sort, limit=limit, after=after, projection=OVERDUE_ROWS)
+    if len(rows) == limit:
+        last = rows[-1]
+        link_next_page(request, response, encode_sort_cursor(sort, [last.due_date.isoformat(), last.id]))
+    return json_response(OVERDUE_ROWS.to_dicts(rows), response)
\ No newline at end of file
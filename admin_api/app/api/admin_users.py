@@ -1,19 +1,28 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 
 from .. import crud, schemas
 from ..dependencies import get_db
+from ..pagination import cursor_param, set_next_cursor
 
 router = APIRouter()
 
 #Fetch all users
 @router.get("/", response_model=List[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_users(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[int] = Depends(cursor_param),
+    db: Session = Depends(get_db)
+):
     """
     Fetch all users enrolled in the library.
     """
-    users = crud.user.get_multi(db, skip=skip, limit=limit)
+    users = crud.user.get_multi(db, skip=skip, limit=limit, after=after)
+    set_next_cursor(request, response, users, limit)
     return users
 
 
@@ -1,4 +1,5 @@
 import os
+from typing import Literal
 from pydantic_settings import BaseSettings
 from pydantic import ConfigDict, computed_field
 
@@ -18,12 +19,48 @@ class Settings(BaseSettings):
     POSTGRES_DB: str
     POSTGRES_PORT: int 
     DATABASE_URL: str
+
+    # Connection pool settings, per worker process.
+    # DB_POOL_PRE_PING: "always" checks every checkout, "idle" only connections
+    # unused for DB_POOL_PING_IDLE_SECONDS, "never" relies on DB_POOL_RECYCLE
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: Literal["always", "idle", "never"] = "always"
+    DB_POOL_PING_IDLE_SECONDS: float = 30.0
+
+    # Query instrumentation: QUERY_DEBUG adds X-Query-* response headers and
+    # logs every request's queries; a statement run QUERY_REPEAT_THRESHOLD
+    # times in one request is flagged as a likely N+1
+    QUERY_DEBUG: bool = False
+    QUERY_REPEAT_THRESHOLD: int = 5
     
     # RabbitMQ settings
     RABBITMQ_HOST: str
     RABBITMQ_PORT: int = 5672
     RABBITMQ_USER: str
     RABBITMQ_PASSWORD: str
+
+    # Messaging backend: "pika" (blocking, in threads) or "aio-pika" (asyncio).
+    # "pika" stays the default so each deployment opts in to aio-pika on its own
+    MESSAGING_BACKEND: str = "pika"
+
+    # Async consumer settings, the pika consumer handles one message at a time
+    CONSUMER_PREFETCH_COUNT: int = 50
+    CONSUMER_WORKERS: int = 4
+
+    # Publisher pipeline settings
+    PUBLISHER_QUEUE_SIZE: int = 10000
+    PUBLISHER_BATCH_SIZE: int = 100
+    PUBLISHER_FLUSH_INTERVAL: float = 0.05
+    PUBLISHER_ENQUEUE_TIMEOUT: float = 1.0
+
+    # Bulk import settings
+    BULK_IMPORT_CHUNK_SIZE: int = 1000
+
+    # Rows fetched and serialized per chunk by streaming listings
+    STREAM_BATCH_SIZE: int = 1000
     
     @computed_field
     @property
@@ -8,7 +8,9 @@ import pika
 from sqlalchemy.orm import Session
 
 from .dependencies import SessionLocal
+from .messaging import AsyncMessaging
 from .config import settings
+from .metrics import consumer_message_seconds
 from . import crud, schemas
 
 # Configure logging
@@ -129,12 +131,14 @@ EVENT_HANDLERS = {
     'book_returned': handle_book_returned
 }
 
-def callback(ch, method, properties, body, db: Session):
-    """Process incoming messages from the queue"""
+def apply_message(message: Dict[str, Any], db: Session) -> bool:
+    """
+    Apply a decoded message with its event handler.
+    Returns False when the message should be requeued.
+    """
+    event_type = message.get('event_type')
+    start = time.perf_counter()
     try:
-        # Parse the message
-        message = json.loads(body)
-        event_type = message.get('event_type')
         payload = message.get('payload')
         
         logger.info(f"Received {event_type} event")
@@ -143,17 +147,68 @@ def callback(ch, method, properties, body, db: Session):
         if event_type in EVENT_HANDLERS:
             handler = EVENT_HANDLERS[event_type]
             handler(payload, db)
-            # Acknowledge the message
-            ch.basic_ack(delivery_tag=method.delivery_tag)
         else:
-            logger.warning(f"No handler for event type: {event_type}")
             # Acknowledge the message anyway
-            ch.basic_ack(delivery_tag=method.delivery_tag)
+            logger.warning(f"No handler for event type: {event_type}")
+        outcome = "ok"
+        return True
     except Exception as e:
         logger.error(f"Error processing message: {str(e)}")
+        db.rollback()
+        outcome = "requeued"
+        return False
+    finally:
+        consumer_message_seconds.observe(time.perf_counter() - start, event_type=str(event_type), outcome=outcome)
+
+def callback(ch, method, properties, body, db: Session):
+    """Process incoming messages from the queue"""
+    try:
+        # Parse the message
+        message = json.loads(body)
+    except ValueError as e:
+        logger.error(f"Error processing message: {str(e)}")
+        # Reject the message and requeue it
+        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        return
+
+    if apply_message(message, db):
+        # Acknowledge the message
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+    else:
         # Reject the message and requeue it
         ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
 
+def ordering_key(message: Dict[str, Any]) -> str:
+    """
+    Key that identifies the book or user an event touches. Events with the
+    same key are applied in delivery order, others run concurrently.
+    """
+    payload = message.get('payload') or {}
+    for field in ('book_id', 'email'):
+        if payload.get(field) is not None:
+            return f"{field}:{payload[field]}"
+    return str(message.get('event_type'))
+
+def handle_message(message: Dict[str, Any]) -> bool:
+    """Apply a decoded message in its own session, for the async consumer"""
+    db = SessionLocal()
+    try:
+        return apply_message(message, db)
+    finally:
+        db.close()
+
+def create_async_consumer(connect=None) -> AsyncMessaging:
+    """The aio-pika consumer for this service's queue and events"""
+    return AsyncMessaging(
+        'admin_service_queue',
+        EVENT_HANDLERS.keys(),
+        handle_message,
+        ordering_key=ordering_key,
+        prefetch_count=settings.CONSUMER_PREFETCH_COUNT,
+        workers=settings.CONSUMER_WORKERS,
+        connect=connect
+    )
+
 def start_consumer():
     """Start the event consumer in a background thread"""
     def consume():
@@ -208,4 +263,7 @@ def start_consumer():
     consumer_thread.start()
     logger.info("Consumer thread started")
 
-start_consumer()
\ No newline at end of file
+# Only start the consumer if this script is run directly, main.py starts it
+# for the API depending on MESSAGING_BACKEND
+if __name__ == "__main__":
+    start_consumer()
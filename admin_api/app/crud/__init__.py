@@ -1,6 +1,8 @@
 from .books import book
 from .users import user
 from .lending import lending
+from .overdue import overdue
+from .facets import facets
 
 # For importing all CRUD operations at once
-__all__ = ["book", "user", "lending"]
\ No newline at end of file
+__all__ = ["book", "user", "lending", "overdue", "facets"]
\ No newline at end of file
@@ -3,7 +3,7 @@ from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy import select
+from sqlalchemy import Select, select
 
 from ..models import Base 
 
@@ -43,13 +43,30 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         statement = select(self.model).where(self.model.id == id)
         return db.execute(statement).scalar_one_or_none()
 
+    def paginate(
+        self, statement: Select, *, skip: int = 0, limit: int = 100, after: Optional[int] = None
+    ) -> Select:
+        """
+        Order a select statement by id and apply one page to it.
+
+        When `after` holds the id of the last record of the previous page the
+        next page is found by seeking past it (keyset pagination) instead of
+        using OFFSET, so deep pages cost the same as the first one.
+        """
+        statement = statement.order_by(self.model.id)
+        if after is not None:
+            statement = statement.where(self.model.id > after)
+        else:
+            statement = statement.offset(skip)
+        return statement.limit(limit)
+
     def get_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self, db: Session, *, skip: int = 0, limit: int = 100, after: Optional[int] = None
     ) -> List[ModelType]:
         """
         Get multiple records using select statement.
         """
-        statement = select(self.model).offset(skip).limit(limit)
+        statement = self.paginate(select(self.model), skip=skip, limit=limit, after=after)
         return list(db.execute(statement).scalars().all())
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
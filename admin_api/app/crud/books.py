@@ -1,9 +1,12 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func, distinct
+from sqlalchemy import Select, select, func, insert
+from sqlalchemy.exc import IntegrityError
 
 from .base import CRUDBase
+from .facets import facets
 from .. import models, schemas
+from ..projection import Projection
 
 
 class CRUDBook(CRUDBase[models.Book, schemas.BookCreate, schemas.BookCreate]):
@@ -19,7 +22,8 @@ class CRUDBook(CRUDBase[models.Book, schemas.BookCreate, schemas.BookCreate]):
         return db.execute(statement).scalar_one_or_none()
     
     def get_by_category(
-        self, db: Session, *, category: str, skip: int = 0, limit: int = 100
+        self, db: Session, *, category: str, skip: int = 0, limit: int = 100,
+        after: Optional[int] = None
     ) -> List[models.Book]:
         """
         Get books by category using select statement.
@@ -27,13 +31,13 @@ class CRUDBook(CRUDBase[models.Book, schemas.BookCreate, schemas.BookCreate]):
         statement = (
             select(models.Book)
             .where(models.Book.category == category)
-            .offset(skip)
-            .limit(limit)
         )
+        statement = self.paginate(statement, skip=skip, limit=limit, after=after)
         return list(db.execute(statement).scalars().all())
     
     def get_by_publisher(
-        self, db: Session, *, publisher: str, skip: int = 0, limit: int = 100
+        self, db: Session, *, publisher: str, skip: int = 0, limit: int = 100,
+        after: Optional[int] = None
     ) -> List[models.Book]:
         """
         Get books by publisher using select statement.
@@ -41,38 +45,70 @@ class CRUDBook(CRUDBase[models.Book, schemas.BookCreate, schemas.BookCreate]):
         statement = (
             select(models.Book)
             .where(models.Book.publisher == publisher)
-            .offset(skip)
-            .limit(limit)
         )
+        statement = self.paginate(statement, skip=skip, limit=limit, after=after)
         return list(db.execute(statement).scalars().all())
     
+    def listing_statement(
+        self, *, is_available: Optional[bool] = None, skip: int = 0, limit: int = 100,
+        after: Optional[int] = None, projection: Optional[Projection] = None
+    ) -> Select:
+        """
+        Select one page of books: all of them, or only the available or
+        unavailable ones. With a `projection`, rows of its columns and the
+        book version instead of Book objects.
+        """
+        if projection is not None:
+            statement = projection.select(models.Book.version)
+        else:
+            statement = select(models.Book)
+        if is_available is not None:
+            statement = statement.where(models.Book.is_available == is_available)
+        return self.paginate(statement, skip=skip, limit=limit, after=after)
+
+    def get_listing(self, db: Session, statement: Select) -> List[Any]:
+        """
+        Get the books, or projected rows, a listing statement selects.
+        """
+        result = db.execute(statement)
+        if len(statement.column_descriptions) == 1:
+            return list(result.scalars().all())
+        return list(result.all())
+
+    def get_version(self, db: Session, *, id: int) -> Optional[int]:
+        """
+        Get the row version of a book, or None if there is no such book.
+        """
+        statement = select(models.Book.version).where(models.Book.id == id)
+        return db.execute(statement).scalar_one_or_none()
+
+    def get_versions(self, db: Session, statement: Select) -> List[Tuple[int, int]]:
+        """
+        (id, version) of the books a listing statement selects, without
+        loading the books themselves.
+        """
+        statement = statement.with_only_columns(models.Book.id, models.Book.version)
+        return [(row.id, row.version) for row in db.execute(statement)]
+
     def get_available_books(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self, db: Session, *, skip: int = 0, limit: int = 100,
+        after: Optional[int] = None
     ) -> List[models.Book]:
         """
         Get all available books using select statement.
         """
-        statement = (
-            select(models.Book)
-            .where(models.Book.is_available == True)
-            .offset(skip)
-            .limit(limit)
-        )
-        return list(db.execute(statement).scalars().all())
+        statement = self.listing_statement(is_available=True, skip=skip, limit=limit, after=after)
+        return self.get_listing(db, statement)
 
     def get_unavailable_books(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self, db: Session, *, skip: int = 0, limit: int = 100,
+        after: Optional[int] = None
     ) -> List[models.Book]:
         """
         Get all unavailable books using select statement.
         """
-        statement = (
-            select(models.Book)
-            .where(models.Book.is_available == False)
-            .offset(skip)
-            .limit(limit)
-        )
-        return list(db.execute(statement).scalars().all())
+        statement = self.listing_statement(is_available=False, skip=skip, limit=limit, after=after)
+        return self.get_listing(db, statement)
     
     def create(self, db: Session, *, obj_in: schemas.BookCreate) -> models.Book:
         """
@@ -93,19 +129,71 @@ class CRUDBook(CRUDBase[models.Book, schemas.BookCreate, schemas.BookCreate]):
         db.refresh(db_obj)
         return db_obj
     
+    def bulk_create(
+        self, db: Session, *, objs_in: List[schemas.BookCreate], chunk_size: int = 1000
+    ) -> Tuple[List[Dict[str, Any]], List[Tuple[int, str]]]:
+        """
+        Insert many books using executemany, one statement and commit per chunk.
+        Returns the column values of the created books and a list of
+        (index in objs_in, error) for rows skipped because their ISBN exists.
+        """
+        # RETURNING plain columns gives rows that stay readable after commit
+        statement = insert(models.Book).returning(*models.Book.__table__.columns)
+        created: List[Dict[str, Any]] = []
+        errors: List[Tuple[int, str]] = []
+
+        for start in range(0, len(objs_in), chunk_size):
+            chunk = objs_in[start:start + chunk_size]
+
+            # One lookup per chunk for ISBNs that are already in the catalog
+            isbns = [obj_in.isbn for obj_in in chunk]
+            seen = set(db.execute(
+                select(models.Book.isbn).where(models.Book.isbn.in_(isbns))
+            ).scalars().all())
+
+            rows = []
+            for offset, obj_in in enumerate(chunk):
+                if obj_in.isbn in seen:
+                    errors.append((start + offset, f"Book with ISBN {obj_in.isbn} already exists"))
+                    continue
+                seen.add(obj_in.isbn)
+                rows.append((start + offset, {**obj_in.model_dump(), "is_available": True}))
+
+            if not rows:
+                continue
+
+            chunk_created: List[Dict[str, Any]] = []
+            try:
+                result = db.execute(statement, [row for _, row in rows])
+                chunk_created.extend(row._asdict() for row in result)
+            except IntegrityError:
+                # A concurrent writer inserted one of the ISBNs, retry row by row
+                db.rollback()
+                for index, row in rows:
+                    try:
+                        with db.begin_nested():
+                            chunk_created.append(db.execute(statement, [row]).one()._asdict())
+                    except IntegrityError:
+                        errors.append((index, f"Book with ISBN {row['isbn']} already exists"))
+
+            # Core inserts are not flushed through the ORM, count them here
+            facets.record_rows(db, added=chunk_created)
+            db.commit()
+            created.extend(chunk_created)
+
+        return created, errors
+
     def get_categories(self, db: Session) -> List[str]:
         """
-        Get a list of all unique categories using select statement.
+        Get a list of all unique categories, read from the facet counts.
         """
-        statement = select(distinct(models.Book.category))
-        return list(db.execute(statement).scalars().all())
+        return [row.value for row in facets.get_facet(db, "category")]
     
     def get_publishers(self, db: Session) -> List[str]:
         """
-        Get a list of all unique publishers using select statement.
+        Get a list of all unique publishers, read from the facet counts.
         """
-        statement = select(distinct(models.Book.publisher))
-        return list(db.execute(statement).scalars().all())
+        return [row.value for row in facets.get_facet(db, "publisher")]
 
 
 book = CRUDBook(models.Book)
\ No newline at end of file
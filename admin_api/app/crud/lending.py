@@ -1,10 +1,11 @@
 from typing import List, Optional, Dict, Any
 from datetime import date, datetime, timedelta
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, select
+from sqlalchemy import Row, Select, and_, or_, select
 
 from .base import CRUDBase
 from .. import models, schemas
+from ..projection import Projection
 
 
 class CRUDLending(CRUDBase[models.Lending, schemas.LendingCreate, schemas.LendingCreate]):
@@ -45,27 +46,35 @@ class CRUDLending(CRUDBase[models.Lending, schemas.LendingCreate, schemas.Lendin
         
         return db_obj
     
-    def get_active_lendings(
-        self, db: Session, *, skip: int = 0, limit: int = 100
-    ) -> List[models.Lending]:
+    def active_lendings_statement(self, projection: Optional[Projection] = None) -> Select:
         """
-        Get all active lendings with user and book information.
+        Active lendings with user and book information, unpaginated. With a
+        `projection`, rows of its columns instead of Lending objects.
         """
-        statement = (
-            select(models.Lending)
-            .options(
+        if projection is not None:
+            statement = projection.select()
+        else:
+            statement = select(models.Lending).options(
                 joinedload(models.Lending.user), 
                 joinedload(models.Lending.book)
             )
-            .where(models.Lending.return_date == None)
-            .offset(skip)
-            .limit(limit)
-        )
-        
-        return list(db.execute(statement).scalars().all())
+        return statement.where(models.Lending.return_date == None)
+
+    def get_active_lendings(
+        self, db: Session, *, skip: int = 0, limit: int = 100,
+        after: Optional[int] = None, projection: Optional[Projection] = None
+    ) -> List[Any]:
+        """
+        Get all active lendings with user and book information, as Lending
+        objects or as rows of `projection`.
+        """
+        statement = self.paginate(self.active_lendings_statement(projection), skip=skip, limit=limit, after=after)
+        result = db.execute(statement)
+        return list(result.all() if projection is not None else result.scalars().all())
     
     def get_user_lendings(
-        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
+        self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100,
+        after: Optional[int] = None
     ) -> List[models.Lending]:
         """
         Get all books borrowed by a user.
@@ -74,9 +83,8 @@ class CRUDLending(CRUDBase[models.Lending, schemas.LendingCreate, schemas.Lendin
             select(models.Lending)
             .options(joinedload(models.Lending.book))
             .where(models.Lending.user_id == user_id)
-            .offset(skip)
-            .limit(limit)
         )
+        statement = self.paginate(statement, skip=skip, limit=limit, after=after)
         
         return list(db.execute(statement).scalars().all())
     
@@ -107,30 +115,46 @@ class CRUDLending(CRUDBase[models.Lending, schemas.LendingCreate, schemas.Lendin
         
         return db.execute(statement).scalar_one_or_none()
         
-    def get_unavailable_books(self, db: Session) -> List[Dict[str, Any]]:
+    def unavailable_books_statement(
+        self, *, category: Optional[str] = None, publisher: Optional[str] = None
+    ) -> Select:
         """
-        Get all unavailable books with their due dates.
+        The lent out books and their due dates, as rows holding just the
+        columns of schemas.BookWithDueDate.
         """
+        book = models.Book
         statement = (
-            select(models.Lending)
-            .options(joinedload(models.Lending.book))
+            select(
+                book.id, book.title, book.author, book.isbn, book.publisher, book.category,
+                book.publication_year, book.description, book.is_available,
+                models.Lending.due_date
+            )
+            .join(models.Lending.book)
             .where(models.Lending.return_date == None)
         )
-        
-        lendings = list(db.execute(statement).scalars().all())
-        
-        # Format results
-        results = []
-        for lending in lendings:
-            book_with_due_date = {
-                **lending.book.__dict__,
-                "due_date": lending.due_date
-            }
-            # Remove SQLAlchemy state attributes
-            book_with_due_date.pop('_sa_instance_state', None)
-            results.append(book_with_due_date)
-        
-        return results
+        if category is not None:
+            statement = statement.where(book.category == category)
+        if publisher is not None:
+            statement = statement.where(book.publisher == publisher)
+        # Lending.book_id rather than Book.id: the same value, but it reads
+        # pages off ix_lendings_book_id_return_date instead of sorting
+        return statement.order_by(models.Lending.book_id)
+
+    def get_unavailable_books(
+        self, db: Session, *, skip: int = 0, limit: int = 100, after: Optional[int] = None,
+        category: Optional[str] = None, publisher: Optional[str] = None
+    ) -> List[Row]:
+        """
+        Get unavailable books with their due dates, ordered by book id.
+        A book has at most one active lending, so `after` is a book id.
+        """
+        statement = self.unavailable_books_statement(category=category, publisher=publisher)
+        if after is not None:
+            statement = statement.where(models.Lending.book_id > after)
+        else:
+            statement = statement.offset(skip)
+
+        return list(db.execute(statement.limit(limit)).all())
     
     def mark_as_returned(
         self, db: Session, *, lending_id: int
@@ -161,26 +185,6 @@ class CRUDLending(CRUDBase[models.Lending, schemas.LendingCreate, schemas.Lendin
         db.refresh(lending)
         
         return lending
-    
-    def get_overdue_lendings(self, db: Session) -> List[models.Lending]:
-        """
-        Get all overdue lendings.
-        """
-        today = date.today()
-        
-        statement = (
-            select(models.Lending)
-            .options(
-                joinedload(models.Lending.user), 
-                joinedload(models.Lending.book)
-            )
-            .where(
-                models.Lending.due_date < today,
-                models.Lending.return_date == None
-            )
-        )
-        
-        return list(db.execute(statement).scalars().all())
 
 
 lending = CRUDLending(models.Lending)
\ No newline at end of file
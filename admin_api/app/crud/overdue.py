@@ -0,0 +1,153 @@
+import threading
+from datetime import date
+from itertools import chain
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import Select, and_, delete, event, exists, insert, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, joinedload
+
+from .. import models
+from ..projection import Projection
+
+# Sort orders for overdue pages: most overdue first, or least overdue first
+MOST_OVERDUE = "-days_overdue"
+LEAST_OVERDUE = "days_overdue"
+
+
+class CRUDOverdue:
+    """
+    Materialized set of overdue lendings.
+
+    Borrows and returns keep it current as they are flushed (see
+    `_track_overdue` below). Lendings only become overdue without a write
+    when a day passes, so `ensure_current` adds those once per day, reading
+    just the lendings that fell due since the previous refresh.
+    """
+
+    def __init__(self):
+        self._refreshed_on: Optional[date] = None
+        self._lock = threading.Lock()
+
+    def refresh(self, db: Session, today: Optional[date] = None) -> None:
+        """
+        Add the active lendings that fell due before `today`. The first
+        refresh in a process also drops rows whose lending was returned.
+        """
+        today = today or date.today()
+        already_tracked = exists().where(models.OverdueLending.lending_id == models.Lending.id)
+        newly_overdue = select(models.Lending.id, models.Lending.due_date).where(
+            models.Lending.return_date == None,
+            models.Lending.due_date < today,
+            ~already_tracked
+        )
+        if self._refreshed_on is not None and self._refreshed_on <= today:
+            # Everything due before the last refresh is tracked already
+            newly_overdue = newly_overdue.where(models.Lending.due_date >= self._refreshed_on)
+        else:
+            returned = exists().where(
+                models.Lending.id == models.OverdueLending.lending_id,
+                models.Lending.return_date != None
+            )
+            db.execute(delete(models.OverdueLending).where(returned))
+
+        # PostgreSQL in production, SQLite for local runs and tests
+        dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+        statement = dialect_insert(models.OverdueLending).from_select(["lending_id", "due_date"], newly_overdue)
+        # Lendings another process tracked concurrently are skipped, not lost
+        db.execute(statement.on_conflict_do_nothing(index_elements=["lending_id"]))
+        db.commit()
+        # Only once committed, so a failed refresh is retried on the next call
+        self._refreshed_on = today
+
+    def ensure_current(self, db: Session, today: Optional[date] = None) -> None:
+        """Refresh on the first call of each day"""
+        today = today or date.today()
+        if self._refreshed_on == today:
+            return
+        with self._lock:
+            if self._refreshed_on != today:
+                self.refresh(db, today)
+
+    def listing_statement(
+        self,
+        *,
+        sort: str = MOST_OVERDUE,
+        after: Optional[Tuple[date, int]] = None,
+        projection: Optional[Projection] = None
+    ) -> Select:
+        """
+        Overdue lendings with their user and book, ordered by days overdue.
+        `after` is the (due_date, lending_id) of the last lending already seen.
+        With a `projection`, rows of its columns instead of Lending objects.
+        """
+        overdue = models.OverdueLending
+        if projection is not None:
+            statement = projection.select()
+        else:
+            statement = select(models.Lending).options(
+                joinedload(models.Lending.user),
+                joinedload(models.Lending.book)
+            )
+        statement = (
+            statement
+            .join(overdue, overdue.lending_id == models.Lending.id)
+            .where(models.Lending.return_date == None)
+        )
+        if sort == MOST_OVERDUE:
+            # Most days overdue is the earliest due date
+            statement = statement.order_by(overdue.due_date, overdue.lending_id)
+            if after is not None:
+                statement = statement.where(or_(
+                    overdue.due_date > after[0],
+                    and_(overdue.due_date == after[0], overdue.lending_id > after[1])
+                ))
+        else:
+            statement = statement.order_by(overdue.due_date.desc(), overdue.lending_id.desc())
+            if after is not None:
+                statement = statement.where(or_(
+                    overdue.due_date < after[0],
+                    and_(overdue.due_date == after[0], overdue.lending_id < after[1])
+                ))
+        return statement
+
+    def get_page(
+        self,
+        db: Session,
+        *,
+        sort: str = MOST_OVERDUE,
+        limit: int = 100,
+        after: Optional[Tuple[date, int]] = None,
+        projection: Optional[Projection] = None
+    ) -> List[Any]:
+        """One page of overdue lendings, see listing_statement"""
+        statement = self.listing_statement(sort=sort, after=after, projection=projection).limit(limit)
+        result = db.execute(statement)
+        return list(result.all() if projection is not None else result.scalars().all())
+
+
+overdue = CRUDOverdue()
+
+
+@event.listens_for(Session, "after_flush")
+def _track_overdue(session: Session, flush_context):
+    """
+    Mirror borrows, returns and due date changes into overdue_lendings in
+    the same transaction as the lending itself.
+    """
+    changed = [obj for obj in chain(session.new, session.dirty) if isinstance(obj, models.Lending)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, models.Lending)]
+    if not changed and not deleted:
+        return
+
+    today = date.today()
+    overdue_rows = [
+        {"lending_id": obj.id, "due_date": obj.due_date}
+        for obj in changed
+        if obj.return_date is None and isinstance(obj.due_date, date) and obj.due_date < today
+    ]
+    connection = session.connection()
+    lending_ids = [obj.id for obj in chain(changed, deleted)]
+    connection.execute(delete(models.OverdueLending).where(models.OverdueLending.lending_id.in_(lending_ids)))
+    if overdue_rows:
+        connection.execute(insert(models.OverdueLending), overdue_rows)
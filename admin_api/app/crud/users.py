@@ -50,7 +50,8 @@ class CRUDUser(CRUDBase[models.User, schemas.UserCreate, schemas.UserCreate]):
         return db_obj
     
     def get_active_users(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self, db: Session, *, skip: int = 0, limit: int = 100,
+        after: Optional[int] = None
     ) -> List[models.User]:
         """
         Get all active users using select statement.
@@ -58,9 +59,8 @@ class CRUDUser(CRUDBase[models.User, schemas.UserCreate, schemas.UserCreate]):
         statement = (
             select(models.User)
             .where(models.User.is_active == True)
-            .offset(skip)
-            .limit(limit)
         )
+        statement = self.paginate(statement, skip=skip, limit=limit, after=after)
         return list(db.execute(statement).scalars().all())
 
 
@@ -0,0 +1,134 @@
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Statements issued while serving one request, or inside count_queries()"""
+
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        # SQL text -> executions; bound parameters are not part of the text,
+        # so the same query for different rows shows up as one entry
+        self.statements: Dict[str, int] = {}
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.seconds += elapsed
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def merge(self, other: "QueryStats"):
+        self.count += other.count
+        self.seconds += other.seconds
+        for statement, executions in other.statements.items():
+            self.statements[statement] = self.statements.get(statement, 0) + executions
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Statements executed at least `threshold` times, the shape of an N+1"""
+        return {statement: n for statement, n in self.statements.items() if n >= threshold}
+
+
+# Threadpool workers run in a copy of the request's context, so queries
+# from sync routes and dependencies land in the request's QueryStats
+_query_stats: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+
+_observers: List[Callable[[QueryStats], None]] = []
+_observers_lock = threading.Lock()
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _query_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _query_stats.get() is not None:
+        context._query_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _query_stats.get()
+    started = getattr(context, "_query_started", None)
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+def instrument_engine(engine):
+    """Count and time statements against the QueryStats being collected"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextlib.contextmanager
+def collect_queries(stats: Optional[QueryStats] = None) -> Iterator[QueryStats]:
+    """Collect the statements issued in this context, e.g. one request"""
+    stats = stats if stats is not None else QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+        with _observers_lock:
+            observers = list(_observers)
+        for observer in observers:
+            observer(stats)
+
+
+@contextlib.contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """
+    Total statements issued inside the block, both directly and by requests
+    that complete meanwhile (a TestClient serves them on another thread).
+    """
+    total = QueryStats()
+    with _observers_lock:
+        _observers.append(total.merge)
+    try:
+        with _query_stats_scope(total):
+            yield total
+    finally:
+        with _observers_lock:
+            _observers.remove(total.merge)
+
+
+@contextlib.contextmanager
+def _query_stats_scope(stats: QueryStats) -> Iterator[None]:
+    # Like collect_queries(), without reporting the block to the observers
+    token = _query_stats.set(stats)
+    try:
+        yield
+    finally:
+        _query_stats.reset(token)
+
+
+@contextlib.contextmanager
+def assert_max_queries(max_queries: int) -> Iterator[QueryStats]:
+    """Fail if the block issues more than `max_queries` statements"""
+    with count_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        statements = "\n".join(f"  {n} x {statement}" for statement, n in stats.statements.items())
+        raise AssertionError(f"Expected at most {max_queries} queries, {stats.count} were issued:\n{statements}")
+
+
+def debug_headers(stats: QueryStats, threshold: int) -> List[Tuple[bytes, bytes]]:
+    """Response headers describing a request's queries, for debug mode"""
+    return [
+        (b"x-query-count", str(stats.count).encode()),
+        (b"x-query-time-ms", f"{stats.seconds * 1000:.2f}".encode()),
+        (b"x-query-repeated", str(len(stats.repeated(threshold))).encode()),
+    ]
+
+
+def log_queries(method: str, route: str, stats: QueryStats, repeated: Dict[str, int]):
+    """Log a request's query count and any statements it repeated"""
+    logger.info(f"{method} {route}: {stats.count} queries in {stats.seconds * 1000:.2f} ms")
+    for statement, executions in repeated.items():
+        logger.warning(f"Possible N+1 in {method} {route}, statement executed {executions} times: {statement}")
@@ -1,17 +1,28 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from .consumer import start_consumer
+from .consumer import create_async_consumer, start_consumer
+from .messaging import start_messaging, stop_messaging
+from .publisher import start_publisher, stop_publisher
 from .routers import api_router
+from .metrics import MetricsMiddleware, registry
 from .config import settings
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup logic
     try:
-        # Start the message consumer
-        start_consumer()
+        if settings.MESSAGING_BACKEND == "aio-pika":
+            # Consume and publish on the event loop, publishes wait for broker confirms
+            await start_messaging(create_async_consumer())
+        else:
+            # Start the message consumer
+            start_consumer()
+
+            # Start the background event publisher
+            start_publisher()
         print("Message consumer started successfully")
         
         yield
@@ -19,7 +30,9 @@ async def lifespan(app: FastAPI):
         print(f"Error during startup: {e}")
         raise
     finally:
-        # Optional: Add any cleanup logic if needed
+        # Let in-flight messages finish, flush queued events before the process exits
+        await stop_messaging()
+        stop_publisher()
         print("Application shutdown initiated")
 
 # Create FastAPI app with lifespan
@@ -40,9 +53,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency, in-flight requests and queries per request
+app.add_middleware(MetricsMiddleware)
+
 # Include API router
 app.include_router(api_router)
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,283 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .config import settings
+from .instrumentation import QueryStats, collect_queries, debug_headers, log_queries
+
+# Seconds; suits both pool waits and request latencies
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _key(labelnames: Tuple[str, ...], labels: Dict[str, str]) -> Tuple:
+    return tuple(map(labels.get, labelnames))
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{"" if value is None else value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter, one value per label combination"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_key(self.labelnames, labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Gauge:
+    """
+    Value that goes up and down. Either set with inc / dec, or read from a
+    `collect` callback when the metrics are rendered.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        collect: Optional[Callable[[], Iterable[Tuple[Dict[str, str], float]]]] = None,
+        labelnames: Sequence[str] = ()
+    ):
+        self.name = name
+        self.help = help
+        self.collect = collect
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(_key(self.labelnames, labels), 0.0)
+
+    def samples(self) -> List[str]:
+        if self.collect is None:
+            with self._lock:
+                items = list(self._values.items())
+            return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+        lines = []
+        for labels, value in self.collect():
+            lines.append(f"{self.name}{_format_labels(list(labels), list(labels.values()))} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative bucket histogram, one set of buckets per label combination"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket..., +Inf bucket count, sum]
+        self._values: Dict[Tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _key(self.labelnames, labels)
+        # Only the first bucket holding the value is counted here,
+        # samples() accumulates them
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def count(self, **labels) -> int:
+        counts = self._values.get(_key(self.labelnames, labels))
+        return sum(counts[:-1]) if counts else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts)) for key, counts in self._values.items()]
+        lines = []
+        for key, counts in items:
+            total = 0
+            for bound, count in zip(self.buckets, counts):
+                total += count
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {total}")
+            total += counts[len(self.buckets)]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {counts[-1]}")
+        return lines
+
+
+class Registry:
+    """Collects metrics and renders them in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[object]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Connection pools, labelled by engine
+_pools: Dict[str, object] = {}
+
+def _pool_status(reading: str) -> Callable[[], Iterable[Tuple[Dict[str, str], float]]]:
+    def collect():
+        for engine_name, pool in list(_pools.items()):
+            value = getattr(pool, reading, None)
+            if value is not None:
+                yield {"engine": engine_name}, value()
+    return collect
+
+registry.register(Gauge("db_pool_size", "Configured number of persistent connections", _pool_status("size")))
+registry.register(Gauge("db_pool_checked_out", "Connections currently checked out", _pool_status("checkedout")))
+registry.register(Gauge("db_pool_checked_in", "Idle connections in the pool", _pool_status("checkedin")))
+registry.register(Gauge("db_pool_overflow", "Connections open beyond pool_size", _pool_status("overflow")))
+pool_wait_seconds = registry.register(Histogram(
+    "db_pool_wait_seconds", "Time spent waiting to check out a connection", ["engine"]
+))
+pool_timeouts_total = registry.register(Counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after pool_timeout", ["engine"]
+))
+pool_idle_pings_total = registry.register(Counter(
+    "db_pool_idle_pings_total", "Liveness pings issued on checkout of an idle connection", ["engine"]
+))
+
+def track_pool(engine_name: str, pool):
+    """Expose a connection pool's status under the given engine label"""
+    _pools[engine_name] = pool
+
+
+# Request telemetry
+
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests currently being served"
+))
+http_request_duration_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency by route template", ["method", "route", "status"]
+))
+http_request_db_queries = registry.register(Histogram(
+    "http_request_db_queries", "Database queries issued per request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100)
+))
+http_request_db_seconds = registry.register(Histogram(
+    "http_request_db_seconds", "Time spent in database queries per request", ["route"]
+))
+db_repeated_statements_total = registry.register(Counter(
+    "db_repeated_statements_total", "Requests that repeated one statement QUERY_REPEAT_THRESHOLD times or more", ["route"]
+))
+consumer_message_seconds = registry.register(Histogram(
+    "consumer_message_seconds", "Time to apply a consumed message", ["event_type", "outcome"]
+))
+
+
+def _route_template(scope) -> str:
+    # Routes of included routers keep their own path and report the
+    # prefixed one through the effective route context
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    if context is not None:
+        return context.path
+    return getattr(scope.get("route"), "path", None) or "<unmatched>"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, in-flight requests and database
+    usage per request. Routes are labelled by their path template, e.g.
+    /books/{book_id}, so the number of series stays bounded. With
+    QUERY_DEBUG set, each response also carries its query count and the
+    request is logged along with any repeated statements.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if settings.QUERY_DEBUG:
+                    headers = debug_headers(stats, settings.QUERY_REPEAT_THRESHOLD)
+                    message["headers"] = list(message.get("headers", [])) + headers
+            await send(message)
+
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            with collect_queries(stats):
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec()
+
+            route = _route_template(scope)
+            http_request_duration_seconds.observe(
+                elapsed, method=scope["method"], route=route, status=str(status_code)
+            )
+            http_request_db_queries.observe(stats.count, route=route)
+            http_request_db_seconds.observe(stats.seconds, route=route)
+
+            repeated = stats.repeated(settings.QUERY_REPEAT_THRESHOLD)
+            if repeated:
+                db_repeated_statements_total.inc(route=route)
+            if settings.QUERY_DEBUG:
+                log_queries(scope["method"], route, stats, repeated)
@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, ForeignKey, Date, func
 from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date
-from sqlalchemy.orm import relationship
+from sqlalchemy import Index, event, text
+from sqlalchemy.orm import object_session, relationship
 from sqlalchemy.orm import declarative_base
 from datetime import datetime, timedelta
 
@@ -20,9 +21,18 @@ class Book(Base):
     publication_year = Column(Integer)
     description = Column(String)
     is_available = Column(Boolean, default=True)
+    # Bumped by every write to the row, the ETag of its representation
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
     lendings = relationship("Lending", back_populates="book")
 
 
+@event.listens_for(Book, "before_update")
+def _bump_version(mapper, connection, target):
+    # ORM updates only; Core UPDATEs of books set version themselves
+    if object_session(target).is_modified(target, include_collections=False):
+        target.version = Book.version + 1
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -43,6 +53,53 @@ class Lending(Base):
     borrow_date = Column(Date, default=func.current_date())
     due_date = Column(Date)
     return_date = Column(Date, nullable=True)
+
+    __table_args__ = (
+        # Active lending of a book, and the book's history
+        Index("ix_lendings_book_id_return_date", "book_id", "return_date"),
+        # A user's lendings in id order (keyset pages), active ones among them
+        Index("ix_lendings_user_id_id", "user_id", "id"),
+        # Partial indexes over the small set of lendings still out
+        Index(
+            "ix_lendings_active_due_date", "due_date",
+            postgresql_where=text("return_date IS NULL"), sqlite_where=text("return_date IS NULL")
+        ),
+        Index(
+            "ix_lendings_active_id", "id",
+            postgresql_where=text("return_date IS NULL"), sqlite_where=text("return_date IS NULL")
+        ),
+    )
     
     user = relationship("User", back_populates="lendings")
-    book = relationship("Book", back_populates="lendings")
\ No newline at end of file
+    book = relationship("Book", back_populates="lendings")
+
+class OverdueLending(Base):
+    """
+    Lendings past their due date and not yet returned, kept current by
+    crud.overdue so overdue pages never scan the active lendings.
+    """
+    __tablename__ = "overdue_lendings"
+
+    lending_id = Column(Integer, ForeignKey("lendings.id", ondelete="CASCADE"), primary_key=True)
+    due_date = Column(Date, nullable=False)
+
+    lending = relationship("Lending")
+
+    __table_args__ = (
+        # Pages ordered by days overdue, with the lending id as tie-breaker
+        Index("ix_overdue_lendings_due_date_lending_id", "due_date", "lending_id"),
+    )
+
+
+class BookFacet(Base):
+    """
+    Number of books, and of available books, per category and per
+    publisher, kept current by crud.facets so navigation menus never scan
+    the books table.
+    """
+    __tablename__ = "book_facets"
+
+    facet = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    available = Column(Integer, nullable=False, default=0)
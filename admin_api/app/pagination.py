@@ -0,0 +1,106 @@
+import base64
+import json
+from datetime import date
+from typing import Any, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, Response
+
+
+def _is_id(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value > 0
+
+
+def _is_date(value: Any) -> bool:
+    try:
+        date.fromisoformat(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+# Shape of the sort key each order puts in its cursors
+KEY_TYPES = {
+    "days_overdue": (_is_date, _is_id),
+    "-days_overdue": (_is_date, _is_id),
+}
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Build an opaque continuation token from the id of the last row of a page.
+    """
+    raw = json.dumps({"k": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> int:
+    """
+    Decode a continuation token. Raises ValueError if the token is malformed.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))["k"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+    if not _is_id(last_id):
+        raise ValueError("Invalid cursor: expected a positive integer key")
+    return last_id
+
+
+def encode_sort_cursor(sort: str, key: Sequence[Any]) -> str:
+    """
+    Build a continuation token from the sort key of the last row of a page,
+    for listings ordered by something other than id.
+    """
+    raw = json.dumps({"s": sort, "k": list(key)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_sort_cursor(token: str, sort: str) -> Tuple:
+    """
+    Decode a sort-key continuation token. Raises ValueError if the token is
+    malformed, was issued for a different sort order or its key does not
+    have the shape that order uses.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = tuple(data["k"])
+        token_sort = data["s"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+    if token_sort != sort:
+        raise ValueError(f"Cursor was issued for sort={token_sort}, not sort={sort}")
+    checks = KEY_TYPES.get(sort)
+    if checks is not None and (len(key) != len(checks) or not all(check(value) for check, value in zip(checks, key))):
+        raise ValueError(f"Invalid cursor key for sort={sort}")
+    return key
+
+
+def cursor_param(cursor: Optional[str] = None) -> Optional[int]:
+    """
+    Dependency turning the `cursor` query parameter into the id to seek past.
+    """
+    if not cursor:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def set_next_cursor(request: Request, response: Response, items: List[Any], limit: int):
+    """
+    When a page is full, expose the next page's cursor in an X-Next-Cursor
+    header and an RFC 8288 Link header. The JSON body is left unchanged.
+    """
+    if not items or len(items) < limit:
+        return
+    link_next_page(request, response, encode_cursor(items[-1].id))
+
+
+def link_next_page(request: Request, response: Response, token: str):
+    """Expose the next page's cursor in the X-Next-Cursor and Link headers"""
+    next_url = request.url.remove_query_params("skip").include_query_params(cursor=token)
+    response.headers["X-Next-Cursor"] = token
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
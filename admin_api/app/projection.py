@@ -0,0 +1,82 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import Select, select
+
+
+class Projection:
+    """
+    A response schema as plain columns of a model, for listings too large
+    to load as ORM objects and validate row by row.
+
+    Every schema field is selected as a labelled column; a field holding a
+    nested schema follows the model relationship of the same name. Rows
+    are turned back into (nested) dicts that orjson dumps directly. The
+    schema stays the route's response_model, which then only documents the
+    response. Computed fields are produced by the `computed` functions,
+    which receive the dict built so far.
+    """
+
+    def __init__(
+        self,
+        schema: type[BaseModel],
+        model: Any,
+        computed: Optional[Dict[str, Callable[[Dict[str, Any]], Any]]] = None
+    ):
+        self.model = model
+        self.computed = computed or {}
+        self._names: List[str] = []
+        self._nested: List[Tuple[str, List[str]]] = []
+        self.relationships = []
+        for name, field in schema.model_fields.items():
+            if isinstance(field.annotation, type) and issubclass(field.annotation, BaseModel):
+                self._nested.append((name, list(field.annotation.model_fields)))
+                self.relationships.append(getattr(model, name))
+            else:
+                self._names.append(name)
+
+        # The model's own columns first, then each related model's
+        self.columns = [getattr(model, name).label(name) for name in self._names]
+        for (name, names), relationship in zip(self._nested, self.relationships):
+            related = relationship.property.mapper.class_
+            self.columns.extend(getattr(related, column).label(f"{name}__{column}") for column in names)
+
+    def select(self, *extra) -> Select:
+        """
+        Select the projected columns, joined through the nested schemas'
+        relationships. `extra` columns are added after them, left out of the
+        dicts but readable on the rows (e.g. a version for an ETag).
+        """
+        statement = select(*self.columns, *extra).select_from(self.model)
+        for relationship in self.relationships:
+            statement = statement.join(relationship)
+        return statement
+
+    def to_dicts(self, rows: Iterable[Any]) -> List[Dict[str, Any]]:
+        """The rows of a `select()` statement as response dicts"""
+        names = self._names
+        own = len(names)
+        items = []
+        for row in rows:
+            item = dict(zip(names, row))
+            start = own
+            for name, nested_names in self._nested:
+                item[name] = dict(zip(nested_names, row[start:start + len(nested_names)]))
+                start += len(nested_names)
+            for name, compute in self.computed.items():
+                item[name] = compute(item)
+            items.append(item)
+        return items
+
+
+def json_response(content: Any, response: Response) -> Response:
+    """
+    Dump `content` to a JSON response with orjson, skipping response_model
+    validation, and carry over the headers already set on the route's
+    `response` (cursors, ETag).
+    """
+    fast = Response(orjson.dumps(content), media_type="application/json")
+    fast.headers.update(response.headers)
+    return fast
@@ -1,10 +1,16 @@
-import json
+import queue
+import threading
 import pika
 import logging
+from typing import List, Optional, Tuple
+
 from .config import settings
+from . import messaging
 
 logger = logging.getLogger(__name__)
 
+EXCHANGE_NAME = 'library_events'
+
 def get_connection():
     """Establish a connection to RabbitMQ"""
     credentials = pika.PlainCredentials(
@@ -20,39 +26,250 @@ def get_connection():
     return pika.BlockingConnection(parameters)
 
 
-def publish_event(event_type: str, payload: dict):
-    """Publish an event to RabbitMQ"""
+class PublisherBackpressureError(RuntimeError):
+    """Raised when the local event queue stays full past the enqueue timeout"""
+
+
+_PROPERTIES = pika.BasicProperties(
+    delivery_mode=2,  # make message persistent
+    content_type='application/json'
+)
+
+
+class EventPipeline:
+    """
+    Background publishing pipeline.
+
+    HTTP handlers enqueue events into a bounded in-process queue and return
+    immediately. A single worker thread drains the queue in batches over one
+    long-lived channel in publisher-confirm mode, so an event only leaves the
+    pipeline once the broker has confirmed it. Unconfirmed events are retried
+    after a reconnect.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = 10000,
+        batch_size: int = 100,
+        flush_interval: float = 0.05,
+        enqueue_timeout: float = 1.0,
+        retry_delay: float = 1.0
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.retry_delay = retry_delay
+        self._queue: "queue.Queue[Tuple[str, str]]" = queue.Queue(maxsize=max_queue)
+        self._pending = 0
+        self._pending_cond = threading.Condition()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._connection = None
+        self._channel = None
+
+    @property
+    def pending(self) -> int:
+        """Number of events enqueued but not yet confirmed by the broker"""
+        with self._pending_cond:
+            return self._pending
+
+    def start(self):
+        """Start the background worker thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="event-publisher", daemon=True)
+        self._thread.start()
+        logger.info("Publisher pipeline started")
+
+    def stop(self, timeout: Optional[float] = 10.0):
+        """Flush outstanding events and stop the worker thread"""
+        if not self.flush(timeout):
+            logger.warning(f"Stopping publisher with {self.pending} unconfirmed events")
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self._close_channel()
+
+    def enqueue(self, event_type: str, payload: dict):
+        """Queue an event for publication, blocking while the queue is full"""
+        message = messaging.build_message(event_type, payload)
+        with self._pending_cond:
+            self._pending += 1
+        try:
+            self._queue.put((event_type, message), timeout=self.enqueue_timeout)
+        except queue.Full:
+            self._mark_done(1)
+            raise PublisherBackpressureError(
+                f"Event queue full ({self._queue.maxsize} events), {event_type} not published"
+            )
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued event is confirmed. Returns False on timeout."""
+        with self._pending_cond:
+            return self._pending_cond.wait_for(lambda: self._pending == 0, timeout)
+
+    def _mark_done(self, count: int):
+        with self._pending_cond:
+            self._pending -= count
+            if self._pending == 0:
+                self._pending_cond.notify_all()
+
+    def _next_batch(self) -> List[Tuple[str, str]]:
+        """Block briefly for the first event, then take whatever else is ready"""
+        try:
+            batch = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _open_channel(self):
+        if self._channel is not None and self._channel.is_open:
+            return self._channel
+        self._close_channel()
+        self._connection = get_connection()
+        channel = self._connection.channel()
+        channel.exchange_declare(
+            exchange=EXCHANGE_NAME,
+            exchange_type='topic',
+            durable=True
+        )
+        # Every basic_publish now returns only once the broker confirmed it
+        channel.confirm_delivery()
+        self._channel = channel
+        return channel
+
+    def _close_channel(self):
+        try:
+            if self._connection is not None and self._connection.is_open:
+                self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+        self._channel = None
+
+    def _publish_batch(self, batch: List[Tuple[str, str]]) -> int:
+        """Publish a batch, removing events from its head as they are confirmed"""
+        channel = self._open_channel()
+        confirmed = 0
+        try:
+            for event_type, message in batch:
+                channel.basic_publish(
+                    exchange=EXCHANGE_NAME,
+                    routing_key=event_type,
+                    body=message,
+                    properties=_PROPERTIES
+                )
+                confirmed += 1
+        finally:
+            del batch[:confirmed]
+            self._mark_done(confirmed)
+        return confirmed
+
+    def _run(self):
+        backoff = self.retry_delay
+        batch: List[Tuple[str, str]] = []
+        while not (self._stopping.is_set() and not batch and self._queue.empty()):
+            if not batch:
+                batch = self._next_batch()
+                if not batch:
+                    continue
+            try:
+                confirmed = self._publish_batch(batch)
+                logger.info(f"Published batch of {confirmed} events")
+                backoff = self.retry_delay
+            except pika.exceptions.NackError as e:
+                # The broker refused the event at the head of the batch, drop it
+                logger.error(f"Broker rejected {batch[0][0]} event: {str(e)}")
+                del batch[0]
+                self._mark_done(1)
+            except Exception as e:
+                logger.warning(f"Error publishing batch, retrying in {backoff:.1f}s: {str(e)}")
+                self._close_channel()
+                if self._stopping.wait(backoff):
+                    break
+                backoff = min(backoff * 2, 30.0)
+
+        if batch:
+            logger.error(f"Publisher stopped with {len(batch)} unconfirmed events")
+
+
+_pipeline: Optional[EventPipeline] = None
+
+def start_publisher() -> EventPipeline:
+    """Start the background publishing pipeline"""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = EventPipeline(
+            max_queue=settings.PUBLISHER_QUEUE_SIZE,
+            batch_size=settings.PUBLISHER_BATCH_SIZE,
+            flush_interval=settings.PUBLISHER_FLUSH_INTERVAL,
+            enqueue_timeout=settings.PUBLISHER_ENQUEUE_TIMEOUT
+        )
+    _pipeline.start()
+    return _pipeline
+
+def stop_publisher(timeout: Optional[float] = 10.0):
+    """Drain and stop the publishing pipeline"""
+    global _pipeline
+    if _pipeline is not None:
+        _pipeline.stop(timeout)
+        _pipeline = None
+
+def flush_events(timeout: Optional[float] = None) -> bool:
+    """Wait until every queued event is confirmed by the broker"""
+    if _pipeline is None:
+        return True
+    return _pipeline.flush(timeout)
+
+
+def publish_events(event_type: str, payloads: List[dict]):
+    """Publish many events of one type, e.g. after a bulk import"""
+    # With the aio-pika backend, publish over the event loop's connection
+    async_messaging = messaging.get_messaging()
+    if async_messaging is not None:
+        async_messaging.publish_threadsafe(event_type, payloads)
+        return
+
+    # Hand the events to the background pipeline when it is running
+    if _pipeline is not None:
+        for payload in payloads:
+            _pipeline.enqueue(event_type, payload)
+        return
+
     try:
         connection = get_connection()
         channel = connection.channel()
-        
+
         # Ensure the exchange exists
         channel.exchange_declare(
-            exchange='library_events',
+            exchange=EXCHANGE_NAME,
             exchange_type='topic',
             durable=True
         )
-        
-        # Prepare the message
-        message = {
-            "event_type": event_type,
-            "payload": payload
-        }
-        
-        # Publish the message
-        channel.basic_publish(
-            exchange='library_events',
-            routing_key=event_type,
-            body=json.dumps(message),
-            properties=pika.BasicProperties(
-                delivery_mode=2,  # make message persistent
-                content_type='application/json'
+
+        # Publish every message over the same channel
+        for payload in payloads:
+            channel.basic_publish(
+                exchange=EXCHANGE_NAME,
+                routing_key=event_type,
+                body=messaging.build_message(event_type, payload),
+                properties=_PROPERTIES
             )
-        )
-        
-        logger.info(f"Published {event_type} event: {payload}")
+            logger.info(f"Published {event_type} event: {payload}")
+
         connection.close()
     except Exception as e:
         logger.error(f"Error publishing event: {str(e)}")
         raise
 
+
+def publish_event(event_type: str, payload: dict):
+    """Publish an event to RabbitMQ"""
+    publish_events(event_type, [payload])
@@ -1,6 +1,6 @@
 from typing import Optional, List
 from datetime import date
-from pydantic import BaseModel, Field, EmailStr, ConfigDict
+from pydantic import BaseModel, Field, EmailStr, ConfigDict, computed_field
 
 # Book schemas
 class BookBase(BaseModel):
@@ -86,8 +86,44 @@ class LendingWithUserAndBook(Lending):
     model_config = ConfigDict(from_attributes=True)  
 
 
+# Overdue lending, days_overdue is counted from today
+class OverdueLending(LendingWithUserAndBook):
+    @computed_field
+    @property
+    def days_overdue(self) -> int:
+        return (date.today() - self.due_date).days
+
+
 #Book with due date
 class BookWithDueDate(Book):
     due_date: date
     
     model_config = ConfigDict(from_attributes=True)  
+
+
+# Facet counts for catalog navigation
+class FacetCount(BaseModel):
+    value: str
+    total: int
+    available: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BookFacets(BaseModel):
+    categories: List[FacetCount]
+    publishers: List[FacetCount]
+
+
+# Bulk import result
+class BulkImportError(BaseModel):
+    row: int
+    isbn: Optional[str] = None
+    detail: str
+
+
+class BulkImportResult(BaseModel):
+    created: int
+    errors: List[BulkImportError]
+    # Rows that were created but whose book_created event was not published
+    unpublished: List[BulkImportError] = []
@@ -0,0 +1,69 @@
+from typing import Any, Callable, Iterator, Literal, Optional
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+
+from .config import settings
+
+# Query parameter values that switch a listing endpoint to streaming
+StreamFormat = Literal["json", "ndjson"]
+
+
+def _encode(rows, serialize: Callable[[Any], str], stream: StreamFormat, first: bool) -> bytes:
+    if stream == "ndjson":
+        return "".join(serialize(row) + "\n" for row in rows).encode()
+    chunk = ",".join(serialize(row) for row in rows)
+    return (chunk if first else "," + chunk).encode()
+
+
+def iter_rows(
+    db: Session,
+    statement: Select,
+    serialize: Callable[[Any], str],
+    stream: StreamFormat,
+    batch_size: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Run `statement` and yield the serialized rows in chunks of `batch_size`,
+    as NDJSON lines or as the pieces of one JSON array. Rows are fetched with
+    yield_per, so only one batch of ORM objects or rows is alive at a time.
+    """
+    batch_size = batch_size or settings.STREAM_BATCH_SIZE
+    result = db.execute(statement.execution_options(yield_per=batch_size))
+    first = True
+    if stream == "json":
+        yield b"["
+    # Entity statements stream their objects, projections their rows
+    if len(statement.column_descriptions) == 1:
+        result = result.scalars()
+    for partition in result.partitions():
+        yield _encode(partition, serialize, stream, first)
+        # The identity map holds unmodified objects weakly, so each batch
+        # is freed once it has been serialized
+        first = False
+    if stream == "json":
+        yield b"]"
+
+
+def stream_rows(
+    db: Session,
+    statement: Select,
+    serialize: Callable[[Any], str],
+    stream: StreamFormat
+) -> StreamingResponse:
+    """
+    Stream a listing instead of building the whole response in memory.
+    `db` comes from the get_db dependency; FastAPI 0.118+ keeps it open
+    until the body has been sent, older versions close it beforehand.
+    """
+    media_type = "application/x-ndjson" if stream == "ndjson" else "application/json"
+    return StreamingResponse(iter_rows(db, statement, serialize, stream), media_type=media_type)
+
+
+def serializer(schema: type[BaseModel]) -> Callable[[Any], str]:
+    """Validate one ORM object with `schema` and dump it as JSON"""
+    def serialize(obj: Any) -> str:
+        return schema.model_validate(obj).model_dump_json()
+    return serialize
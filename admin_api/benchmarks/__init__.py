@@ -0,0 +1,20 @@
+"""
+Standalone micro-benchmarks, run from the service directory, e.g.
+
+    python -m benchmarks.bench_bulk_import
+
+They use a local SQLite database, so no PostgreSQL server is required.
+"""
+import os
+
+# Same environment the test-suite uses, unless overridden by the caller
+os.environ.setdefault("POSTGRES_SERVER", "localhost")
+os.environ.setdefault("POSTGRES_USER", "bench_user")
+os.environ.setdefault("POSTGRES_PASSWORD", "bench_password")
+os.environ.setdefault("POSTGRES_DB", "bench_db")
+os.environ.setdefault("POSTGRES_PORT", "5432")
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("RABBITMQ_HOST", "localhost")
+os.environ.setdefault("RABBITMQ_PORT", "5672")
+os.environ.setdefault("RABBITMQ_USER", "guest")
+os.environ.setdefault("RABBITMQ_PASSWORD", "guest")
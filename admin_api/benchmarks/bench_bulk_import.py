@@ -0,0 +1,59 @@
+"""
+Catalog import throughput: one create per row versus CRUDBook.bulk_create.
+
+    python -m benchmarks.bench_bulk_import [rows]
+
+Runs against the SQLite benchmark database; event publishing is excluded.
+"""
+import sys
+import time
+
+from app.crud import books
+from app.dependencies import SessionLocal, engine
+from app.models import Base
+from app.schemas import BookCreate
+
+
+def make_rows(rows: int, prefix: str):
+    return [
+        BookCreate(
+            title=f"Imported Book {i}",
+            author=f"Author {i % 500}",
+            isbn=f"{prefix}{i:08d}",
+            publisher=f"Publisher {i % 50}",
+            category=f"Category {i % 20}",
+            publication_year=1950 + i % 70,
+            description="Imported by the bulk benchmark"
+        )
+        for i in range(rows)
+    ]
+
+
+def run(label: str, rows, import_rows):
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        import_rows(db, rows)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    print(f"{label:<28} {len(rows) / elapsed:>10.0f} rows/s  ({elapsed:.2f}s)")
+
+
+def single_row(db, rows):
+    for book_in in rows:
+        books.book.create(db, obj_in=book_in)
+
+
+def bulk(db, rows):
+    books.book.bulk_create(db, objs_in=rows, chunk_size=1000)
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+    # The single-row path is slow, so it runs on a tenth of the rows
+    run("create() per row", make_rows(max(1, rows // 10), "SINGLE"), single_row)
+    run("bulk_create()", make_rows(rows, "BULK"), bulk)
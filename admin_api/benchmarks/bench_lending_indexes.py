@@ -0,0 +1,133 @@
+"""
+Lending hot queries on a large lendings table, before and after the
+indexes from migration a3f1c9d27b64: SQLite query plan and latency.
+
+    python -m benchmarks.bench_lending_indexes [rows]
+
+The most recent 1% of the lendings are still out, as in a real library
+where almost every lending has been returned.
+"""
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import event, insert, select, text
+from sqlalchemy.orm import joinedload
+
+from app.crud import lending
+from app.dependencies import SessionLocal, engine
+from app.models import Base, Lending
+
+BOOKS = 200_000
+USERS = 100_000
+NEW_INDEXES = [
+    "ix_lendings_book_id_return_date",
+    "ix_lendings_user_id_id",
+    "ix_lendings_active_due_date",
+    "ix_lendings_active_id",
+]
+
+
+def seed(rows: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    active_from = rows - rows // 100
+    first_day = date.today() - timedelta(days=3650)
+    with engine.begin() as conn:
+        for start in range(0, rows, 50_000):
+            batch = []
+            for i in range(start, min(start + 50_000, rows)):
+                borrow_date = first_day + timedelta(days=i * 3650 // rows)
+                batch.append({
+                    "user_id": i % USERS,
+                    "book_id": i % BOOKS,
+                    "borrow_date": borrow_date,
+                    "due_date": borrow_date + timedelta(days=14),
+                    "return_date": None if i >= active_from else borrow_date + timedelta(days=7),
+                })
+            conn.execute(insert(Lending), batch)
+    return active_from
+
+
+def set_indexes(enabled: bool):
+    lendings = Base.metadata.tables["lendings"]
+    with engine.begin() as conn:
+        for index in lendings.indexes:
+            if index.name in NEW_INDEXES:
+                if enabled:
+                    index.create(conn, checkfirst=True)
+                else:
+                    index.drop(conn, checkfirst=True)
+        conn.execute(text("ANALYZE"))
+
+
+def all_overdue_lendings(db):
+    """
+    The unpaginated overdue query the overdue endpoint used to run, kept
+    here as the baseline for the materialized overdue set.
+    """
+    statement = (
+        select(Lending)
+        .options(joinedload(Lending.user), joinedload(Lending.book))
+        .where(Lending.due_date < date.today(), Lending.return_date == None)
+    )
+    return list(db.execute(statement).scalars().all())
+
+
+def queries(rows: int, active_from: int):
+    def active_book():
+        return (rows - 1 - random.randrange(rows - active_from)) % BOOKS
+
+    return [
+        ("active lending by book", lambda db: lending.get_active_lending_by_book(db, book_id=active_book())),
+        ("user active lendings", lambda db: lending.get_user_active_lendings(db, user_id=random.randrange(USERS))),
+        ("user lendings page", lambda db: lending.get_user_lendings(db, user_id=random.randrange(USERS), limit=20)),
+        ("active lendings page", lambda db: lending.get_active_lendings(db, limit=100)),
+        ("overdue lendings", all_overdue_lendings),
+    ]
+
+
+def measure(label: str, run, repeat: int):
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    db = SessionLocal()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        run(db)
+        statement, parameters = captured[-1]
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(db)
+        timings.append((time.perf_counter() - start) * 1000)
+        db.expunge_all()
+    plan = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    db.close()
+
+    print(f"  {label:<24} {statistics.median(timings):>9.2f} ms")
+    for row in plan:
+        print(f"      {row[-1]}")
+
+
+def main(rows: int):
+    print(f"Seeding {rows} lendings...")
+    active_from = seed(rows)
+    for enabled in (False, True):
+        set_indexes(enabled)
+        print("With the new indexes:" if enabled else "Without the new indexes:")
+        for label, run in queries(rows, active_from):
+            random.seed(0)
+            # Full scans are slow enough that a few runs give a stable median
+            measure(label, run, repeat=20 if enabled else 3)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
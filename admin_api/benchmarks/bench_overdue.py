@@ -0,0 +1,50 @@
+"""
+Overdue listing cost: loading every overdue lending (the old endpoint)
+versus one page of the materialized overdue set, plus the cost of the
+backfill and of a day-rollover refresh.
+
+    python -m benchmarks.bench_overdue [rows]
+
+Uses the lendings table from bench_lending_indexes: 1% of the lendings
+are still out and a little over half of those are overdue.
+"""
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+
+from app.crud.overdue import CRUDOverdue
+from app.dependencies import SessionLocal
+
+from .bench_lending_indexes import all_overdue_lendings, seed
+
+
+def timed(label: str, run, repeat: int = 10):
+    timings = []
+    for _ in range(repeat):
+        db = SessionLocal()
+        start = time.perf_counter()
+        result = run(db)
+        timings.append((time.perf_counter() - start) * 1000)
+        db.close()
+    print(f"  {label:<40} {statistics.median(timings):>9.2f} ms")
+    return result
+
+
+def main(rows: int):
+    print(f"Seeding {rows} lendings...")
+    seed(rows)
+    today = date.today()
+    overdue = CRUDOverdue()
+
+    timed("backfill (first refresh)", lambda db: overdue.refresh(db, today), repeat=1)
+    overdue_count = timed("all overdue lendings", lambda db: len(all_overdue_lendings(db)), repeat=3)
+    print(f"  ({overdue_count} overdue lendings)")
+    first = timed("first page of 100", lambda db: overdue.get_page(db, limit=100))
+    last = first[-1]
+    timed("next page of 100 (cursor)", lambda db: overdue.get_page(db, limit=100, after=(last.due_date, last.id)))
+    timed("day rollover refresh", lambda db: overdue.refresh(db, today + timedelta(days=1)), repeat=1)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
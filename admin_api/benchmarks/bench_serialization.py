@@ -0,0 +1,107 @@
+"""
+Response serialization for 10k-row listings: ORM objects validated through
+the response schema, as FastAPI does for a response_model, against column
+projections dumped with orjson. Query and serialization time are reported
+separately, for the books, borrowed books and overdue books listings.
+
+    python -m benchmarks.bench_serialization [rows]
+"""
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import insert
+
+from app import schemas
+from app.api.admin_books import BOOK_ROWS
+from app.api.admin_lending import ACTIVE_LENDING_ROWS, OVERDUE_ROWS
+from app.crud import books, lending, overdue
+from app.dependencies import SessionLocal, engine
+from app.models import Base, Book, Lending, User
+
+
+def seed(rows: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    today = date.today()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "email": f"reader{i}@example.com", "first_name": "Reader", "last_name": f"No. {i}", "is_active": True}
+            for i in range(1, 1001)
+        ])
+        conn.execute(insert(Book), [{
+            "id": i,
+            "title": f"Book {i}",
+            "author": f"Author {i % 1000}",
+            "isbn": f"ISBN{i:010d}",
+            "publisher": f"Publisher {i % 20}",
+            "category": f"Category {i % 50}",
+            "publication_year": 1950 + i % 70,
+            "description": "A book description of moderate length, as most catalog entries have.",
+            "is_available": False,
+        } for i in range(1, rows + 1)])
+        # Every lending is active and overdue, so each listing has `rows` rows
+        conn.execute(insert(Lending), [{
+            "user_id": i % 1000 + 1,
+            "book_id": i,
+            "borrow_date": today - timedelta(days=30 + i % 60),
+            "due_date": today - timedelta(days=16 + i % 60),
+        } for i in range(1, rows + 1)])
+
+
+def measure(label: str, query, serialize, repeat: int = 5):
+    query_ms, serialize_ms = [], []
+    for _ in range(repeat):
+        db = SessionLocal()
+        start = time.perf_counter()
+        items = query(db)
+        middle = time.perf_counter()
+        body = serialize(items)
+        end = time.perf_counter()
+        db.close()
+        query_ms.append((middle - start) * 1000)
+        serialize_ms.append((end - middle) * 1000)
+    print(f"  {label:<34} query {statistics.median(query_ms):8.1f} ms"
+          f"   serialize {statistics.median(serialize_ms):8.1f} ms   {len(body) / 2**20:5.1f} MiB")
+
+
+def validated(schema):
+    # What FastAPI does with a response_model: validate, then dump to JSON
+    adapter = TypeAdapter(List[schema])
+    return lambda objs: adapter.dump_json(adapter.validate_python(objs, from_attributes=True))
+
+
+def projected(projection):
+    # What json_response does with the rows
+    return lambda rows: orjson.dumps(projection.to_dicts(rows))
+
+
+def main(rows: int):
+    print(f"Seeding {rows} books, lent and overdue...")
+    seed(rows)
+    overdue.refresh(SessionLocal())
+
+    print("books")
+    measure("ORM + response_model", lambda db: books.book.get_listing(
+        db, books.book.listing_statement(limit=rows)), validated(schemas.Book))
+    measure("projection + orjson", lambda db: books.book.get_listing(
+        db, books.book.listing_statement(limit=rows, projection=BOOK_ROWS)), projected(BOOK_ROWS))
+
+    print("borrowed books")
+    measure("ORM + response_model", lambda db: lending.get_active_lendings(db, limit=rows),
+            validated(schemas.LendingWithUserAndBook))
+    measure("projection + orjson", lambda db: lending.get_active_lendings(
+        db, limit=rows, projection=ACTIVE_LENDING_ROWS), projected(ACTIVE_LENDING_ROWS))
+
+    print("overdue books")
+    measure("ORM + response_model", lambda db: overdue.get_page(db, limit=rows), validated(schemas.OverdueLending))
+    measure("projection + orjson", lambda db: overdue.get_page(
+        db, limit=rows, projection=OVERDUE_ROWS), projected(OVERDUE_ROWS))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
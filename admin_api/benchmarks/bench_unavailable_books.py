@@ -0,0 +1,96 @@
+"""
+Unavailable books listing: the previous implementation (full Lending and
+Book entities copied through __dict__) versus the column projection, for
+the whole listing and for one filtered page. Latency and peak memory.
+
+    python -m benchmarks.bench_unavailable_books [lent_books]
+"""
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import joinedload
+
+from app.crud import lending
+from app.dependencies import SessionLocal, engine
+from app.models import Base, Book, Lending
+
+CATEGORIES = 50
+
+
+def seed(lent_books: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    today = date.today()
+    with engine.begin() as conn:
+        for start in range(0, lent_books, 50_000):
+            ids = range(start + 1, min(start + 50_000, lent_books) + 1)
+            conn.execute(insert(Book), [{
+                "id": i,
+                "title": f"Book {i}",
+                "author": f"Author {i % 1000}",
+                "isbn": f"ISBN{i:010d}",
+                "publisher": f"Publisher {i % 20}",
+                "category": f"Category {i % CATEGORIES}",
+                "publication_year": 1950 + i % 70,
+                "description": "A book description of moderate length, as most catalog entries have.",
+                "is_available": False,
+            } for i in ids])
+            conn.execute(insert(Lending), [{
+                "user_id": i,
+                "book_id": i,
+                "borrow_date": today,
+                "due_date": today + timedelta(days=14),
+            } for i in ids])
+
+
+def legacy_unavailable_books(db):
+    statement = (
+        select(Lending)
+        .options(joinedload(Lending.book))
+        .where(Lending.return_date == None)
+    )
+    results = []
+    for item in db.execute(statement).scalars().all():
+        book_with_due_date = {**item.book.__dict__, "due_date": item.due_date}
+        book_with_due_date.pop('_sa_instance_state', None)
+        results.append(book_with_due_date)
+    return results
+
+
+def measure(label: str, run, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        db = SessionLocal()
+        start = time.perf_counter()
+        run(db)
+        timings.append((time.perf_counter() - start) * 1000)
+        db.close()
+
+    db = SessionLocal()
+    tracemalloc.start()
+    run(db)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    db.close()
+    print(f"  {label:<40} {statistics.median(timings):>9.2f} ms {peak / 2**20:>9.1f} MiB peak")
+
+
+def main(lent_books: int):
+    print(f"Seeding {lent_books} lent books...")
+    seed(lent_books)
+    category = "Category 7"
+    measure("__dict__ copies, all", legacy_unavailable_books, repeat=3)
+    measure("projection, all", lambda db: lending.get_unavailable_books(db, limit=lent_books), repeat=3)
+    measure(
+        "projection, one category",
+        lambda db: lending.get_unavailable_books(db, limit=lent_books, category=category), repeat=10
+    )
+    measure("projection, page of 100", lambda db: lending.get_unavailable_books(db, limit=100), repeat=50)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
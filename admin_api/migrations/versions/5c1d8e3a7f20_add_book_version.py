@@ -0,0 +1,27 @@
+"""Add book version
+
+Revision ID: 5c1d8e3a7f20
+Revises: e7c2a95b1f38
+Create Date: 2026-10-18 16:02:41.118205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1d8e3a7f20'
+down_revision: Union[str, None] = 'e7c2a95b1f38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A constant default, so PostgreSQL adds the column without rewriting books
+    op.add_column('books', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('books', 'version')
@@ -0,0 +1,42 @@
+"""Add lending indexes
+
+Revision ID: a3f1c9d27b64
+Revises: 252bb872d9fd
+Create Date: 2026-10-18 10:05:12.604318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c9d27b64'
+down_revision: Union[str, None] = '252bb872d9fd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE = sa.text('return_date IS NULL')
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps lendings writable while the indexes build on
+    # PostgreSQL; it cannot run inside the migration's transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_lendings_book_id_return_date', 'lendings', ['book_id', 'return_date'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_lendings_user_id_id', 'lendings', ['user_id', 'id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_lendings_active_due_date', 'lendings', ['due_date'], unique=False,
+                        postgresql_where=ACTIVE, sqlite_where=ACTIVE, postgresql_concurrently=True)
+        op.create_index('ix_lendings_active_id', 'lendings', ['id'], unique=False,
+                        postgresql_where=ACTIVE, sqlite_where=ACTIVE, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_lendings_active_id', table_name='lendings', postgresql_concurrently=True)
+        op.drop_index('ix_lendings_active_due_date', table_name='lendings', postgresql_concurrently=True)
+        op.drop_index('ix_lendings_user_id_id', table_name='lendings', postgresql_concurrently=True)
+        op.drop_index('ix_lendings_book_id_return_date', table_name='lendings', postgresql_concurrently=True)
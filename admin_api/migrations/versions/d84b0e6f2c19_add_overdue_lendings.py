@@ -0,0 +1,38 @@
+"""Add overdue lendings
+
+Revision ID: d84b0e6f2c19
+Revises: a3f1c9d27b64
+Create Date: 2026-10-18 11:42:09.517240
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd84b0e6f2c19'
+down_revision: Union[str, None] = 'a3f1c9d27b64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('overdue_lendings',
+    sa.Column('lending_id', sa.Integer(), nullable=False),
+    sa.Column('due_date', sa.Date(), nullable=False),
+    sa.ForeignKeyConstraint(['lending_id'], ['lendings.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('lending_id')
+    )
+    op.create_index('ix_overdue_lendings_due_date_lending_id', 'overdue_lendings', ['due_date', 'lending_id'], unique=False)
+    # Backfill; the API keeps the set current from here on
+    op.execute(
+        "INSERT INTO overdue_lendings (lending_id, due_date) "
+        "SELECT id, due_date FROM lendings WHERE return_date IS NULL AND due_date < CURRENT_DATE"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_overdue_lendings_due_date_lending_id', table_name='overdue_lendings')
+    op.drop_table('overdue_lendings')
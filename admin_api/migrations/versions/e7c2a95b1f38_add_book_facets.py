@@ -0,0 +1,39 @@
+"""Add book facets
+
+Revision ID: e7c2a95b1f38
+Revises: d84b0e6f2c19
+Create Date: 2026-10-18 15:08:52.381604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c2a95b1f38'
+down_revision: Union[str, None] = 'd84b0e6f2c19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('book_facets',
+    sa.Column('facet', sa.String(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('available', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('facet', 'value')
+    )
+    # Backfill; the API keeps the counts current from here on
+    for facet in ('category', 'publisher'):
+        op.execute(
+            "INSERT INTO book_facets (facet, value, total, available) "
+            f"SELECT '{facet}', {facet}, COUNT(*), SUM(CASE WHEN is_available THEN 1 ELSE 0 END) "
+            f"FROM books WHERE {facet} IS NOT NULL GROUP BY {facet}"
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('book_facets')
@@ -29,11 +29,13 @@ from fastapi.testclient import TestClient
 import unittest.mock as mock
 from unittest.mock import patch, MagicMock
 
-# Mock RabbitMQ consumer to avoid connecting to actual RabbitMQ during tests
-with mock.patch('app.consumer.start_consumer'):
+# Mock RabbitMQ consumer and publisher pipeline to avoid connecting to actual RabbitMQ during tests
+with mock.patch('app.consumer.start_consumer'), \
+     mock.patch('app.publisher.start_publisher'):
     from app.main import app
     from app.models import Base
     from app.dependencies import get_db
+    from app.instrumentation import instrument_engine
 
     
 
@@ -42,6 +44,8 @@ def engine():
     # Create a test database engine
     engine = create_engine(TEST_DATABASE_URL)
     Base.metadata.create_all(bind=engine)
+    # Count queries like the application's own engine
+    instrument_engine(engine)
     yield engine
     Base.metadata.drop_all(bind=engine)
 
@@ -0,0 +1,112 @@
+import asyncio
+from typing import Dict, List, Optional
+
+
+class LocalBroker:
+    """
+    In-process stand-in for RabbitMQ implementing the part of the aio-pika
+    API that AsyncMessaging uses.
+    """
+
+    def __init__(self):
+        self.queues: Dict[str, "_LocalQueue"] = {}
+        self.bindings: Dict[str, List[str]] = {}
+
+    async def connect(self) -> "_LocalConnection":
+        return _LocalConnection(self)
+
+    def route(self, routing_key: str, body: bytes):
+        for queue_name in self.bindings.get(routing_key, []):
+            self.queues[queue_name].put(body)
+
+
+class _LocalMessage:
+    def __init__(self, queue: "_LocalQueue", body: bytes):
+        self.queue = queue
+        self.body = body
+
+    async def ack(self):
+        self.queue.settle(self, "ack")
+
+    async def nack(self, requeue: bool = True):
+        self.queue.settle(self, "nack")
+        if requeue:
+            self.queue.put(self.body)
+
+    async def reject(self, requeue: bool = False):
+        self.queue.settle(self, "reject")
+        if requeue:
+            self.queue.put(self.body)
+
+
+class _LocalQueue:
+    def __init__(self, name: str):
+        self.name = name
+        self.prefetch_count = 1
+        self.settled: List[tuple] = []
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._window: Optional[asyncio.Semaphore] = None
+        self._consumer: Optional[asyncio.Task] = None
+
+    def put(self, body: bytes):
+        self._ready.put_nowait(body)
+
+    def settle(self, message: _LocalMessage, outcome: str):
+        self.settled.append((outcome, message.body))
+        self._window.release()
+
+    async def bind(self, exchange, routing_key: str):
+        exchange.broker.bindings.setdefault(routing_key, []).append(self.name)
+
+    async def consume(self, callback) -> str:
+        self._window = asyncio.Semaphore(self.prefetch_count)
+
+        async def deliver():
+            while True:
+                await self._window.acquire()
+                body = await self._ready.get()
+                asyncio.ensure_future(callback(_LocalMessage(self, body)))
+
+        self._consumer = asyncio.ensure_future(deliver())
+        return self.name
+
+    async def cancel(self, consumer_tag: str):
+        if self._consumer is not None:
+            self._consumer.cancel()
+            self._consumer = None
+
+
+class _LocalExchange:
+    def __init__(self, broker: LocalBroker):
+        self.broker = broker
+
+    async def publish(self, message, routing_key: str):
+        self.broker.route(routing_key, message.body)
+
+
+class _LocalChannel:
+    def __init__(self, broker: LocalBroker):
+        self.broker = broker
+        self.prefetch_count = 1
+
+    async def set_qos(self, prefetch_count: int):
+        self.prefetch_count = prefetch_count
+
+    async def declare_exchange(self, name: str, type: str, durable: bool = True) -> _LocalExchange:
+        return _LocalExchange(self.broker)
+
+    async def declare_queue(self, name: str, durable: bool = True) -> _LocalQueue:
+        queue = self.broker.queues.setdefault(name, _LocalQueue(name))
+        queue.prefetch_count = self.prefetch_count
+        return queue
+
+
+class _LocalConnection:
+    def __init__(self, broker: LocalBroker):
+        self.broker = broker
+
+    async def channel(self, publisher_confirms: bool = False) -> _LocalChannel:
+        return _LocalChannel(self.broker)
+
+    async def close(self):
+        pass
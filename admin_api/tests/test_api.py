@@ -1,6 +1,11 @@
+import json
+
 import pytest
 from fastapi.testclient import TestClient
-from app.models import User, Book
+from datetime import date, timedelta
+
+from app.config import settings
+from app.models import User, Book, Lending
 
 def test_list_books(client):
     response = client.get("/admin/books/")
@@ -98,4 +103,228 @@ def test_unavailable_books(client, db_session):
     
     # Check unavailable books
     response = client.get("/admin/lending/unavailable-books/")
-    assert response.status_code == 200
\ No newline at end of file
+    assert response.status_code == 200
+
+def test_bulk_import_json(client, monkeypatch):
+    published = []
+    monkeypatch.setattr("app.api.admin_books.publish_events", lambda event_type, payloads: published.extend(payloads))
+
+    rows = [
+        {"title": f"Bulk Book {i}", "author": "Bulk Author", "isbn": f"BULKJSON{i}",
+         "publisher": "Bulk Publisher", "category": "Bulk", "publication_year": 2020}
+        for i in range(3)
+    ]
+    rows.append(dict(rows[0]))  # duplicate ISBN
+    rows.append({"title": "Missing fields", "isbn": "BULKJSON9"})
+
+    response = client.post("/books/bulk", json=rows)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 3
+    assert [(e["row"], e["isbn"]) for e in result["errors"]] == [(4, "BULKJSON0"), (5, "BULKJSON9")]
+    assert [p["isbn"] for p in published] == ["BULKJSON0", "BULKJSON1", "BULKJSON2"]
+
+
+def test_bulk_import_ndjson_and_csv(client, monkeypatch):
+    monkeypatch.setattr("app.api.admin_books.publish_events", lambda *args, **kwargs: None)
+
+    ndjson = "\n".join([
+        '{"title": "NDJSON Book", "author": "A", "isbn": "BULKND1", "publisher": "P", "category": "C", "publication_year": 2021}',
+        'not json',
+    ])
+    response = client.post("/books/bulk", content=ndjson, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
+    assert response.json()["errors"][0]["row"] == 2
+
+    csv_body = (
+        "title,author,isbn,publisher,category,publication_year,description\n"
+        "CSV Book,A,BULKCSV1,P,C,2022,\n"
+        "\"Quoted, Title\",A,BULKCSV2,P,C,2022,\"Two\nlines\"\n"
+    )
+    response = client.post("/books/bulk", content=csv_body, headers={"Content-Type": "text/csv"})
+    assert response.status_code == 200
+    assert response.json() == {"created": 2, "errors": [], "unpublished": []}
+
+
+def test_bulk_import_reports_unpublished_chunks(client, monkeypatch):
+    from app.publisher import PublisherBackpressureError
+
+    calls = []
+
+    def publish_events(event_type, payloads):
+        calls.append([p["isbn"] for p in payloads])
+        if len(calls) == 2:
+            raise PublisherBackpressureError("Event queue full")
+
+    monkeypatch.setattr("app.api.admin_books.publish_events", publish_events)
+    monkeypatch.setattr(settings, "BULK_IMPORT_CHUNK_SIZE", 2)
+
+    rows = [
+        {"title": f"Unpublished Book {i}", "author": "Bulk Author", "isbn": f"BULKPUB{i}",
+         "publisher": "Bulk Publisher", "category": "Bulk", "publication_year": 2020}
+        for i in range(5)
+    ]
+    response = client.post("/books/bulk", json=rows)
+
+    # Every chunk was committed and published except the second one's events
+    assert response.status_code == 200
+    result = response.json()
+    assert result["created"] == 5
+    assert calls == [["BULKPUB0", "BULKPUB1"], ["BULKPUB2", "BULKPUB3"], ["BULKPUB4"]]
+    assert [(e["row"], e["isbn"]) for e in result["unpublished"]] == [(3, "BULKPUB2"), (4, "BULKPUB3")]
+    assert "Event queue full" in result["unpublished"][0]["detail"]
+
+
+def test_cursor_pagination(client, db_session):
+    for i in range(5):
+        db_session.add(Book(
+            title=f"Cursor Book {i}",
+            author="Cursor Author",
+            isbn=f"ADMINCURSOR{i}",
+            publisher="Cursor Publisher",
+            category="Cursor",
+            publication_year=2023,
+            is_available=True
+        ))
+    db_session.commit()
+
+    seen = []
+    response = client.get("/admin/books/available/", params={"limit": 2})
+    while True:
+        assert response.status_code == 200
+        seen.extend(book["isbn"] for book in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        assert 'rel="next"' in response.headers["Link"]
+        response = client.get("/admin/books/available/", params={"limit": 2, "cursor": next_cursor})
+
+    # Every book is listed exactly once, in id order
+    ids = [book["id"] for book in client.get("/admin/books/available/", params={"limit": 1000}).json()]
+    assert len(seen) == len(set(seen)) == len(ids)
+    assert [f"ADMINCURSOR{i}" for i in range(5)] == [isbn for isbn in seen if isbn.startswith("ADMINCURSOR")]
+
+    bad = client.get("/admin/users/", params={"cursor": "not-a-cursor"})
+    assert bad.status_code == 400
+
+
+def test_overdue_books_paginated_by_days_overdue(client, db_session):
+    today = date.today()
+    user = User(email="overdue.api@example.com", first_name="Over", last_name="Due")
+    lendings = []
+    for days in (3, 10, 7):
+        book = Book(title=f"Overdue {days}", author="Author", isbn=f"OVERAPI{days}", publisher="Publisher",
+                    category="Overdue", publication_year=2023, is_available=False)
+        lendings.append(Lending(user=user, book=book, borrow_date=today - timedelta(days=days + 14),
+                                due_date=today - timedelta(days=days)))
+    db_session.add_all(lendings)
+    db_session.commit()
+    ours = {item.id for item in lendings}
+
+    for sort, expected in (("-days_overdue", [10, 7, 3]), ("days_overdue", [3, 7, 10])):
+        seen = []
+        response = client.get("/lending/overdue-books/", params={"limit": 2, "sort": sort})
+        while True:
+            assert response.status_code == 200
+            assert len(response.json()) <= 2
+            seen.extend(item["days_overdue"] for item in response.json() if item["id"] in ours)
+            next_cursor = response.headers.get("X-Next-Cursor")
+            if not next_cursor:
+                break
+            response = client.get("/lending/overdue-books/", params={"limit": 2, "sort": sort, "cursor": next_cursor})
+        assert seen == expected
+
+    response = client.get("/lending/overdue-books/", params={"sort": "days_overdue", "cursor": next_cursor or "bad"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("path, cursor", [
+    ("/admin/users/", ("id", True)),
+    ("/admin/users/", ("id", -3)),
+    ("/admin/users/", ("id", "7")),
+    ("/lending/overdue-books/", ("-days_overdue", [])),
+    ("/lending/overdue-books/", ("-days_overdue", ["2026-01-01"])),
+    ("/lending/overdue-books/", ("-days_overdue", ["2026-01-01", True])),
+    ("/lending/overdue-books/", ("-days_overdue", ["2026-01-01", -1])),
+    ("/lending/overdue-books/", ("-days_overdue", [20260101, 5])),
+    ("/lending/overdue-books/", ("-days_overdue", ["2026-01-01", 5, 6])),
+])
+def test_tampered_cursor_is_rejected(client, path, cursor):
+    from app.pagination import encode_cursor, encode_sort_cursor
+
+    sort, key = cursor
+    token = encode_cursor(key) if sort == "id" else encode_sort_cursor(sort, key)
+    assert client.get(path, params={"cursor": token}).status_code == 400
+
+
+def test_overdue_books_streamed(client, db_session):
+    today = date.today()
+    user = User(email="overdue.stream@example.com", first_name="Over", last_name="Due")
+    lendings = []
+    for days in (4, 9):
+        book = Book(title=f"Streamed {days}", author="Author", isbn=f"OVERSTREAM{days}", publisher="Publisher",
+                    category="Overdue", publication_year=2023, is_available=False)
+        lendings.append(Lending(user=user, book=book, borrow_date=today - timedelta(days=days + 14),
+                                due_date=today - timedelta(days=days)))
+    db_session.add_all(lendings)
+    db_session.commit()
+    ours = {item.id for item in lendings}
+
+    response = client.get("/lending/overdue-books/", params={"stream": "ndjson", "sort": "-days_overdue"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["days_overdue"] for row in rows if row["id"] in ours] == [9, 4]
+
+    response = client.get("/lending/overdue-books/", params={"stream": "json", "sort": "-days_overdue"})
+    assert response.status_code == 200
+    assert response.json() == rows
+
+    response = client.get("/admin/lending/unavailable-books/", params={"stream": "json"})
+    assert response.status_code == 200
+    assert {"Streamed 4", "Streamed 9"} <= {book["title"] for book in response.json()}
+
+    response = client.get("/admin/lending/borrowed-books/", params={"stream": "ndjson"})
+    assert response.status_code == 200
+    assert ours <= {json.loads(line)["id"] for line in response.text.splitlines()}
+
+
+def test_book_facets(client):
+    for i, category in enumerate(["Facet API Poetry", "Facet API Poetry", "Facet API Drama"]):
+        response = client.post("/books/", json={
+            "title": f"Facet API {i}", "author": "Author", "isbn": f"FACETAPI{i}", "publisher": "Facet API Press",
+            "category": category, "publication_year": 2023
+        })
+        assert response.status_code == 200
+
+    response = client.get("/books/facets")
+    assert response.status_code == 200
+    categories = {item["value"]: item for item in response.json()["categories"]}
+    assert categories["Facet API Poetry"] == {"value": "Facet API Poetry", "total": 2, "available": 2}
+    assert categories["Facet API Drama"]["total"] == 1
+    publishers = {item["value"]: item["total"] for item in response.json()["publishers"]}
+    assert publishers["Facet API Press"] == 3
+
+
+def test_book_etags(client):
+    book = {"title": "ETag API", "author": "Author", "isbn": "ETAGAPI1", "publisher": "ETag Press",
+            "category": "ETag", "publication_year": 2023}
+    book_id = client.post("/books/", json=book).json()["id"]
+
+    detail = client.get(f"/books/{book_id}")
+    assert detail.headers["etag"] == f'"{book_id}-1"'
+    not_modified = client.get(f"/books/{book_id}", headers={"If-None-Match": detail.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    listing = client.get("/books/available/")
+    assert client.get("/books/available/", headers={"If-None-Match": listing.headers["etag"]}).status_code == 304
+    assert client.get("/books/available/", headers={"If-None-Match": '"other"'}).status_code == 200
+
+    # An update makes a new version of the book and of every page it is on
+    assert client.put(f"/books/{book_id}", json={**book, "title": "ETag API, 2nd edition"}).status_code == 200
+    detail = client.get(f"/books/{book_id}", headers={"If-None-Match": detail.headers["etag"]})
+    assert detail.status_code == 200
+    assert detail.headers["etag"] == f'"{book_id}-2"'
+    assert client.get("/books/available/", headers={"If-None-Match": listing.headers["etag"]}).status_code == 200
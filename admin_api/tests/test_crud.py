@@ -1,9 +1,11 @@
 import pytest
 from datetime import date, timedelta
+from sqlalchemy import select, text
 
-from app.models import Book, User, Lending
+from app.models import Book, User, Lending, OverdueLending
 from app.crud import books, users, lending
-from app.schemas import BookCreate, UserCreate, LendingCreate
+from app.crud.overdue import CRUDOverdue
+from app.schemas import BookCreate, BookWithDueDate, UserCreate, LendingCreate
 
 def test_create_book(db_session):
     # Test creating a book
@@ -82,4 +84,163 @@ def test_handle_book_borrowed(db_session):
     db_session.commit()
     
     db_session.refresh(test_book)
-    assert test_book.is_available is False
\ No newline at end of file
+    assert test_book.is_available is False
+
+def test_bulk_create_books(db_session):
+    objs_in = [
+        BookCreate(title=f"Chunked {i}", author="Author", isbn=f"CHUNK{i % 4}",
+                   publisher="Test", category="Test", publication_year=2023)
+        for i in range(6)
+    ]
+    created, errors = books.book.bulk_create(db_session, objs_in=objs_in, chunk_size=3)
+
+    assert [row["isbn"] for row in created] == ["CHUNK0", "CHUNK1", "CHUNK2", "CHUNK3"]
+    assert all(row["id"] and row["is_available"] for row in created)
+    # Rows 4 and 5 repeat ISBNs inserted by the first chunk
+    assert [index for index, _ in errors] == [4, 5]
+
+
+def test_lending_hot_queries_use_indexes(db_session):
+    plans = {}
+    for name, statement in {
+        "by_book": select(Lending).where(Lending.book_id == 1, Lending.return_date == None),
+        "by_user": select(Lending).where(Lending.user_id == 1).order_by(Lending.id),
+        "overdue": select(Lending).where(Lending.due_date < date.today(), Lending.return_date == None),
+    }.items():
+        compiled = statement.compile(dialect=db_session.bind.dialect, compile_kwargs={"literal_binds": True})
+        plan = db_session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        plans[name] = " ".join(row[-1] for row in plan)
+
+    assert "ix_lendings_book_id_return_date" in plans["by_book"]
+    assert "ix_lendings_user_id_id" in plans["by_user"]
+    assert "ix_lendings_active_due_date" in plans["overdue"]
+
+
+def test_overdue_set_follows_borrows_returns_and_rollover(db_session):
+    today = date.today()
+    user = User(email="overdue.crud@example.com", first_name="Over", last_name="Due")
+    late_book = Book(title="Late Book", author="Author", isbn="OVERDUE001", publisher="Publisher",
+                     category="Overdue", publication_year=2023, is_available=False)
+    upcoming_book = Book(title="Upcoming Book", author="Author", isbn="OVERDUE002", publisher="Publisher",
+                         category="Overdue", publication_year=2023, is_available=False)
+    late = Lending(user=user, book=late_book, borrow_date=today - timedelta(days=30),
+                   due_date=today - timedelta(days=5))
+    upcoming = Lending(user=user, book=upcoming_book, borrow_date=today, due_date=today + timedelta(days=1))
+    db_session.add_all([late, upcoming])
+    db_session.commit()
+
+    def tracked():
+        return set(db_session.execute(select(OverdueLending.lending_id)).scalars())
+
+    # Borrowing an already late lending tracks it straight away
+    assert late.id in tracked()
+    assert upcoming.id not in tracked()
+
+    # Two days later the other lending has fallen due as well
+    CRUDOverdue().refresh(db_session, today=today + timedelta(days=2))
+    assert upcoming.id in tracked()
+
+    lending.mark_as_returned(db_session, lending_id=late.id)
+    assert late.id not in tracked()
+
+
+def test_failed_overdue_refresh_is_retried(db_session, monkeypatch):
+    from sqlalchemy.exc import IntegrityError
+
+    today = date.today()
+    user = User(email="overdue.retry@example.com", first_name="Over", last_name="Due")
+    book = Book(title="Retry Book", author="Author", isbn="OVERDUE003", publisher="Publisher",
+                category="Overdue", publication_year=2023, is_available=False)
+    late = Lending(user=user, book=book, borrow_date=today, due_date=today + timedelta(days=1))
+    db_session.add(late)
+    db_session.commit()
+
+    def conflicting_commit():
+        raise IntegrityError("COMMIT", {}, Exception("duplicate key value violates unique constraint"))
+
+    overdue = CRUDOverdue()
+    with monkeypatch.context() as patched:
+        patched.setattr(db_session, "commit", conflicting_commit)
+        with pytest.raises(IntegrityError):
+            overdue.refresh(db_session, today=today + timedelta(days=2))
+    db_session.rollback()
+
+    # The day is not marked refreshed, so the next call adds the lending
+    overdue.ensure_current(db_session, today=today + timedelta(days=2))
+    assert db_session.get(OverdueLending, late.id) is not None
+
+
+def test_get_unavailable_books_filters_and_pages(db_session):
+    today = date.today()
+    user = User(email="unavailable.crud@example.com", first_name="Un", last_name="Available")
+    lent = []
+    for n, (category, publisher) in enumerate([("Atlas", "North"), ("Atlas", "South"), ("Poetry", "North")]):
+        book = Book(title=f"Lent {n}", author="Author", isbn=f"UNAVAILCRUD{n}", publisher=publisher,
+                    category=category, publication_year=2023, is_available=False)
+        lent.append(Lending(user=user, book=book, borrow_date=today, due_date=today + timedelta(days=n + 1)))
+    returned = Lending(user=user, book=Book(title="Back", author="Author", isbn="UNAVAILCRUD9", publisher="North",
+                                            category="Atlas", publication_year=2023),
+                       borrow_date=today, due_date=today, return_date=today)
+    db_session.add_all(lent + [returned])
+    db_session.commit()
+
+    # Ordered by book id, which need not follow the order they were added in
+    atlas_titles = [item.book.title for item in sorted(lent[:2], key=lambda item: item.book.id)]
+    atlas = lending.get_unavailable_books(db_session, category="Atlas")
+    assert [row.title for row in atlas] == atlas_titles
+    assert {row.title: row.due_date for row in atlas}["Lent 1"] == today + timedelta(days=2)
+    assert set(atlas[0]._fields) == set(BookWithDueDate.model_fields)
+
+    north = lending.get_unavailable_books(db_session, category="Atlas", publisher="North")
+    assert [row.title for row in north] == ["Lent 0"]
+
+    first_page = lending.get_unavailable_books(db_session, limit=1, category="Atlas")
+    next_page = lending.get_unavailable_books(db_session, limit=1, after=first_page[-1].id, category="Atlas")
+    assert [row.title for row in first_page + next_page] == atlas_titles
+
+
+def test_facets_follow_book_writes(db_session):
+    from app.crud import facets
+    from app.models import BookFacet
+
+    def counts(facet, value):
+        row = db_session.execute(
+            select(BookFacet.total, BookFacet.available).where(BookFacet.facet == facet, BookFacet.value == value)
+        ).first()
+        return tuple(row) if row else (0, 0)
+
+    def book_in(isbn, category):
+        return BookCreate(title="Facet Book", author="Author", isbn=isbn, publisher="Facet Press",
+                          category=category, publication_year=2023)
+
+    first = books.book.create(db_session, obj_in=book_in("FACET001", "Facet Maps"))
+    books.book.bulk_create(db_session, objs_in=[book_in("FACET002", "Facet Maps"), book_in("FACET003", "Facet Maps")])
+    assert counts("category", "Facet Maps") == (3, 3)
+    assert counts("publisher", "Facet Press") == (3, 3)
+
+    # Moving an expired book between categories needs its previous value
+    first.category = "Facet Atlases"
+    db_session.commit()
+    assert counts("category", "Facet Maps") == (2, 2)
+    assert counts("category", "Facet Atlases") == (1, 1)
+
+    user = User(email="facets@example.com", first_name="Facet", last_name="Reader")
+    db_session.add(user)
+    db_session.commit()
+    lent = lending.create_lending(db_session, user_id=user.id, book_id=first.id, duration_days=7)
+    assert counts("category", "Facet Atlases") == (1, 0)
+    assert counts("publisher", "Facet Press") == (3, 2)
+    lending.mark_as_returned(db_session, lending_id=lent.id)
+    assert counts("publisher", "Facet Press") == (3, 3)
+
+    db_session.delete(lent)
+    books.book.remove(db_session, id=first.id)
+    assert counts("category", "Facet Atlases") == (0, 0)
+    assert "Facet Atlases" not in books.book.get_categories(db_session)
+    assert "Facet Maps" in books.book.get_categories(db_session)
+
+    # A full recount agrees with the incremental one
+    before = {(row.facet, row.value): (row.total, row.available) for row in db_session.execute(select(BookFacet)).scalars()}
+    facets.rebuild(db_session)
+    db_session.commit()
+    assert {(row.facet, row.value): (row.total, row.available) for row in db_session.execute(select(BookFacet)).scalars()} == before
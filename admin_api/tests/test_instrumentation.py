@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app.config import settings
+from app.instrumentation import assert_max_queries, count_queries
+from app.models import Book, Lending, User
+
+
+def test_user_borrowings_query_budget(client, db_session):
+    user = User(email="budget@example.com", first_name="Query", last_name="Budget")
+    db_session.add(user)
+    for i in range(3):
+        book = Book(title=f"Budget Book {i}", author="Author", isbn=f"BUDGET00{i}", publisher="Publisher",
+                    category="Budget", publication_year=2023, is_available=False)
+        db_session.add(Lending(user=user, book=book, borrow_date=date.today(),
+                               due_date=date.today() + timedelta(days=7)))
+    db_session.commit()
+    user_id = user.id
+
+    # User lookup and one joined query for the lendings, however many there are
+    with assert_max_queries(2):
+        response = client.get(f"/lending/user-borrowings/{user_id}")
+    assert response.status_code == 200
+    assert len(response.json()) == 3
+
+
+def test_repeated_statements_are_flagged(db_session):
+    with count_queries() as stats:
+        for book_id in range(3):
+            db_session.execute(select(Book).where(Book.id == book_id)).scalar_one_or_none()
+    assert stats.count == 3
+    assert list(stats.repeated(3).values()) == [3]
+
+    with pytest.raises(AssertionError, match="at most 2 queries"):
+        with assert_max_queries(2):
+            for book_id in range(3):
+                db_session.execute(select(Book).where(Book.id == book_id)).scalar_one_or_none()
+
+
+def test_debug_headers(client, monkeypatch):
+    assert "x-query-count" not in client.get("/books/").headers
+
+    monkeypatch.setattr(settings, "QUERY_DEBUG", True)
+    response = client.get("/books/")
+    assert int(response.headers["x-query-count"]) >= 1
+    assert response.headers["x-query-repeated"] == "0"
@@ -0,0 +1,31 @@
+import asyncio
+import time
+
+from app.consumer import create_async_consumer
+from app.crud import user
+from tests.local_broker import LocalBroker
+
+
+def test_async_consumer_applies_events(db_session):
+    broker = LocalBroker()
+
+    async def scenario():
+        messaging = create_async_consumer(connect=broker.connect)
+        await messaging.start()
+        for i in range(3):
+            await messaging.publish("user_created", {
+                "email": f"aio{i}@example.com", "first_name": "Aio", "last_name": f"User {i}"
+            })
+        await messaging.publish("user_created", {"email": "aio0@example.com", "first_name": "Aio", "last_name": "Again"})
+
+        queue = broker.queues["admin_service_queue"]
+        deadline = time.monotonic() + 5
+        while len(queue.settled) < 4 and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await messaging.stop()
+        return queue.settled
+
+    assert [outcome for outcome, _ in asyncio.run(scenario())] == ["ack"] * 4
+    for i in range(3):
+        assert user.get_by_email(db_session, email=f"aio{i}@example.com") is not None
+    assert user.get_by_email(db_session, email="aio0@example.com").last_name == "User 0"
@@ -0,0 +1,34 @@
+from datetime import date, timedelta
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from app import schemas
+from app.api.admin_books import BOOK_ROWS
+from app.api.admin_lending import ACTIVE_LENDING_ROWS, OVERDUE_ROWS
+from app.models import Book, Lending, User
+
+
+def test_projections_match_schema_serialization(db_session):
+    today = date.today()
+    user = User(email="projection@example.com", first_name="Pro", last_name="Jection")
+    book = Book(title="Projected", author="Author", isbn="PROJECT1", publisher="Publisher",
+                category="Projection", publication_year=2023, is_available=False)
+    lending = Lending(user=user, book=book, borrow_date=today - timedelta(days=20), due_date=today - timedelta(days=6))
+    db_session.add(lending)
+    db_session.commit()
+
+    cases = [
+        (BOOK_ROWS, schemas.Book, Book, Book.id == book.id),
+        (ACTIVE_LENDING_ROWS, schemas.LendingWithUserAndBook, Lending, Lending.id == lending.id),
+        (OVERDUE_ROWS, schemas.OverdueLending, Lending, Lending.id == lending.id),
+    ]
+    for projection, schema, model, condition in cases:
+        rows = db_session.execute(projection.select().where(condition)).all()
+        statement = select(model).where(condition)
+        if model is Lending:
+            statement = statement.options(joinedload(Lending.user), joinedload(Lending.book))
+        validated = [schema.model_validate(obj).model_dump(mode="json") for obj in db_session.execute(statement).scalars()]
+        # Same JSON as response_model validation gives, key order included
+        assert orjson.dumps(projection.to_dicts(rows)) == orjson.dumps(validated)
@@ -0,0 +1,52 @@
+import pytest
+import pika
+from unittest.mock import patch, MagicMock
+
+from app.publisher import EventPipeline, PublisherBackpressureError
+
+
+def test_pipeline_publishes_batches_with_confirms():
+    mock_connection = MagicMock()
+    channel = mock_connection.channel.return_value
+
+    with patch('app.publisher.get_connection', return_value=mock_connection) as get_connection:
+        pipeline = EventPipeline(batch_size=10, flush_interval=0.01)
+        for i in range(25):
+            pipeline.enqueue("book_created", {"id": i})
+        assert pipeline.pending == 25
+
+        pipeline.start()
+        assert pipeline.flush(timeout=5)
+        pipeline.stop()
+
+    # One connection in confirm mode for every event
+    get_connection.assert_called_once()
+    channel.confirm_delivery.assert_called_once()
+    assert channel.basic_publish.call_count == 25
+    assert pipeline.pending == 0
+
+
+def test_pipeline_retries_after_connection_error():
+    broken_connection = MagicMock()
+    broken_connection.channel.return_value.basic_publish.side_effect = \
+        pika.exceptions.AMQPConnectionError("connection refused")
+    healthy_connection = MagicMock()
+
+    with patch('app.publisher.get_connection', side_effect=[broken_connection, healthy_connection]):
+        pipeline = EventPipeline(flush_interval=0.01, retry_delay=0.01)
+        pipeline.start()
+        pipeline.enqueue("book_deleted", {"id": 1})
+        assert pipeline.flush(timeout=5)
+        pipeline.stop()
+
+    healthy_connection.channel.return_value.basic_publish.assert_called_once()
+
+
+def test_pipeline_backpressure():
+    pipeline = EventPipeline(max_queue=1, enqueue_timeout=0.01)
+    pipeline.enqueue("book_updated", {"id": 1})
+
+    with pytest.raises(PublisherBackpressureError):
+        pipeline.enqueue("book_updated", {"id": 2})
+    assert pipeline.pending == 1
+    assert not pipeline.flush(timeout=0.01)
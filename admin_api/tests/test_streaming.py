@@ -0,0 +1,54 @@
+import os
+import tracemalloc
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app import schemas
+from app.models import Base, Lending
+from app.streaming import iter_rows, serializer
+
+# Rows for the memory profile. The default keeps the suite quick; set
+# STREAM_PROFILE_ROWS=500000 for the full profile (about a minute)
+PROFILE_ROWS = int(os.environ.get("STREAM_PROFILE_ROWS", 30_000))
+
+
+def test_iter_rows_formats(db_session):
+    statement = select(Lending).where(Lending.id < 0)
+    assert b"".join(iter_rows(db_session, statement, serializer(schemas.Lending), "json")) == b"[]"
+    assert b"".join(iter_rows(db_session, statement, serializer(schemas.Lending), "ndjson")) == b""
+
+
+def test_stream_memory_is_flat(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'stream.db'}")
+    Base.metadata.create_all(bind=engine)
+    due_date = date.today() + timedelta(days=14)
+    with engine.begin() as conn:
+        for start in range(0, PROFILE_ROWS, 50_000):
+            conn.execute(insert(Lending), [
+                {"user_id": i, "book_id": i, "borrow_date": date.today(), "due_date": due_date}
+                for i in range(start, min(start + 50_000, PROFILE_ROWS))
+            ])
+
+    db = sessionmaker(bind=engine)()
+    statement = select(Lending).order_by(Lending.id)
+    chunks = iter_rows(db, statement, serializer(schemas.Lending), "json", batch_size=1000)
+    tracemalloc.start()
+    try:
+        rows = 0
+        first_chunks_peak = None
+        for number, chunk in enumerate(chunks):
+            rows += chunk.count(b'"id"')
+            if number == 20:
+                first_chunks_peak = tracemalloc.get_traced_memory()[1]
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        db.close()
+        engine.dispose()
+
+    assert rows == PROFILE_ROWS
+    # One batch of rows is alive at a time, so streaming all of them peaks
+    # about where the first 20 batches did
+    assert peak < first_chunks_peak * 1.5
@@ -0,0 +1,39 @@
+"""Add book facets
+
+Revision ID: 9b3e6d1c4a72
+Revises: f4b81d3a6c95
+Create Date: 2026-10-18 15:09:14.927310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b3e6d1c4a72'
+down_revision: Union[str, None] = 'f4b81d3a6c95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('book_facets',
+    sa.Column('facet', sa.String(), nullable=False),
+    sa.Column('value', sa.String(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('available', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('facet', 'value')
+    )
+    # Backfill; the API and the consumer keep the counts current from here on
+    for facet in ('category', 'publisher'):
+        op.execute(
+            "INSERT INTO book_facets (facet, value, total, available) "
+            f"SELECT '{facet}', {facet}, COUNT(*), SUM(CASE WHEN is_available THEN 1 ELSE 0 END) "
+            f"FROM books WHERE {facet} IS NOT NULL GROUP BY {facet}"
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('book_facets')
@@ -0,0 +1,27 @@
+"""Add book version
+
+Revision ID: b6a4f0c2e917
+Revises: 9b3e6d1c4a72
+Create Date: 2026-10-18 16:03:05.540931
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6a4f0c2e917'
+down_revision: Union[str, None] = '9b3e6d1c4a72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A constant default, so PostgreSQL adds the column without rewriting books
+    op.add_column('books', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('books', 'version')
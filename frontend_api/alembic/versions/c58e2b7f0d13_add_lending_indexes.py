@@ -0,0 +1,34 @@
+"""Add lending indexes
+
+Revision ID: c58e2b7f0d13
+Revises: e962be86a090
+Create Date: 2026-10-18 10:07:40.118925
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c58e2b7f0d13'
+down_revision: Union[str, None] = 'e962be86a090'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps lendings writable while the indexes build on
+    # PostgreSQL; it cannot run inside the migration's transaction
+    with op.get_context().autocommit_block():
+        op.create_index('ix_lendings_book_id_return_date', 'lendings', ['book_id', 'return_date'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_lendings_user_id_id', 'lendings', ['user_id', 'id'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_lendings_user_id_id', table_name='lendings', postgresql_concurrently=True)
+        op.drop_index('ix_lendings_book_id_return_date', table_name='lendings', postgresql_concurrently=True)
@@ -0,0 +1,49 @@
+"""Add book search index
+
+Revision ID: f4b81d3a6c95
+Revises: c58e2b7f0d13
+Create Date: 2026-10-18 14:21:37.604182
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b81d3a6c95'
+down_revision: Union[str, None] = 'c58e2b7f0d13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Must match models.book_search_vector() for searches to use the index
+SEARCH_VECTOR = (
+    "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(author, '') || ' ' || coalesce(description, ''))"
+)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        # CONCURRENTLY keeps books writable while the index builds
+        with op.get_context().autocommit_block():
+            op.create_index('ix_books_search', 'books', [sa.text(SEARCH_VECTOR)], unique=False,
+                            postgresql_using='gin', postgresql_concurrently=True)
+    elif op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts "
+            "USING fts5(title, author, description, tokenize='porter unicode61')"
+        )
+        # Backfill; the consumer keeps the table current from here on
+        op.execute(
+            "INSERT INTO books_fts (rowid, title, author, description) "
+            "SELECT id, title, author, description FROM books"
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_books_search', table_name='books', postgresql_concurrently=True)
+    elif op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS books_fts")
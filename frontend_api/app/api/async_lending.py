@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import schemas
+from ..crud.lending import BookNotFoundError, BookUnavailableError, async_lending
+from ..crud.users import async_user
+from ..dependencies import get_async_db
+
+router = APIRouter()
+
+
+@router.post("/borrow/", response_model=schemas.Lending)
+async def borrow_book(
+    lending_in: schemas.LendingCreate,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Borrow a book for a specific user.
+    """
+    if not await async_user.get(db, id=lending_in.user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+
+    try:
+        return await async_lending.borrow_book(db, obj_in=lending_in)
+    except BookNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BookUnavailableError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/return/{lending_id}", response_model=schemas.Lending)
+async def return_book(lending_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Return a previously borrowed book.
+    """
+    lending_record = await async_lending.get(db, id=lending_id)
+    if not lending_record:
+        raise HTTPException(status_code=404, detail="Lending record not found")
+    if lending_record.return_date is not None:
+        raise HTTPException(status_code=400, detail="Book already returned")
+
+    try:
+        return await async_lending.return_book(db, lending_id=lending_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import schemas
+from ..crud.users import async_user
+from ..dependencies import get_async_db
+
+router = APIRouter()
+
+@router.post("/", response_model=schemas.User)
+async def create_user(user_in: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await async_user.get_by_email(db, email=user_in.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    # Create the user; the user_created event is published via the outbox
+    return await async_user.create(db, obj_in=user_in)
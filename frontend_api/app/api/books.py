@@ -1,47 +1,187 @@
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 
 from .. import models, schemas
-from ..crud import books
+from ..cache import get_cache
+from ..crud import books, facets
 from ..dependencies import get_db
+from ..etag import book_etag, etag_matches, not_modified, page_etag
+from ..pagination import decode_cursor, encode_cursor, set_next_cursor
+from ..projection import Projection, json_response
 from ..publisher import publish_event
 
 router = APIRouter()
 
+# Listing pages are read as these columns and dumped without validation
+BOOK_ROWS = Projection(schemas.Book, models.Book)
+
 
 @router.get("/", response_model=List[schemas.Book])
 def read_books(
+    request: Request,
+    response: Response,
     skip: int = 0, 
     limit: int = 100,
     publisher: Optional[str] = None,
     category: Optional[str] = None,
+    sort: Literal["id", "title"] = "id",
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
     Get books list with optional publisher and category filters.
+
+    Full pages carry an `X-Next-Cursor` header (and a `Link: rel="next"`);
+    pass it back as `cursor` to fetch the next page without OFFSET.
     """
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, sort)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    book_list = books.book.get_all(
-        db, 
-        skip=skip, 
-        limit=limit,
-        publisher=publisher,
-        category=category
-    )
-    return book_list
+    cache = get_cache()
+    params = {
+        "skip": skip if after is None else 0,
+        "limit": limit,
+        "publisher": publisher,
+        "category": category,
+        "sort": sort,
+        "after": after
+    }
+    generation = cache.generation() if cache else None
+    cached = cache.get_listing(params, generation) if cache else None
+    if cached is None and request.headers.get("if-none-match"):
+        # Compare the page's (id, version) pairs before loading any book
+        etag = page_etag(books.book.get_versions(db, **params))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    if cached is None:
+        rows = books.book.get_all(
+            db, 
+            skip=skip, 
+            limit=limit,
+            publisher=publisher,
+            category=category,
+            sort=sort,
+            after=after,
+            projection=BOOK_ROWS
+        )
+        next_cursor = None
+        if rows and len(rows) == limit:
+            next_cursor = encode_cursor(sort, books.book.sort_key(rows[-1], sort))
+        cached = {
+            "books": BOOK_ROWS.to_dicts(rows),
+            "next_cursor": next_cursor,
+            "etag": page_etag((row.id, row.version) for row in rows)
+        }
+        if cache:
+            cache.set_listing(params, cached, generation)
 
+    if etag_matches(request, cached["etag"]):
+        return not_modified(cached["etag"])
+    set_next_cursor(request, response, cached["next_cursor"])
+    response.headers["ETag"] = cached["etag"]
+    return json_response(cached["books"], response)
 
-@router.get("/{book_id}", response_model=schemas.Book)
 
-def read_book(book_id: int, db: Session = Depends(get_db)):
+@router.get("/batch", response_model=schemas.BookBatch)
+def read_books_batch(batch: schemas.BookBatchRequest = Query(), db: Session = Depends(get_db)):
+    """
+    Retrieve many books by ID in one query, e.g. `?ids=12,7,30`.
+
+    Books come back in the requested order, with their availability; ids
+    that match no book are listed in `missing`.
+    """
+    found, missing = books.book.get_many(db, batch.ids)
+    return {"books": found, "missing": missing}
+
+
+@router.post("/batch", response_model=schemas.BookBatch)
+def read_books_batch_body(batch: schemas.BookBatchRequest, db: Session = Depends(get_db)):
+    """
+    Retrieve many books by ID, like GET /books/batch, with the ids in a
+    JSON body instead of the query string.
+    """
+    found, missing = books.book.get_many(db, batch.ids)
+    return {"books": found, "missing": missing}
+
+
+@router.get("/facets", response_model=schemas.BookFacets)
+def read_book_facets(db: Session = Depends(get_db)):
+    """
+    Number of books, and of available books, per category and per publisher,
+    for catalog navigation.
+    """
+    counts = facets.get_all(db)
+    return {"categories": counts["category"], "publishers": counts["publisher"]}
+
+
+@router.get("/search", response_model=List[schemas.Book])
+def search_books(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Search the catalog by title, author and description, best matches first.
+
+    Full pages carry an `X-Next-Cursor` header (and a `Link: rel="next"`);
+    pass it back as `cursor`, with the same `q`, to fetch the next page.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, books.SEARCH_SORT)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    results = books.book.search(db, q, limit=limit, after=after)
+    next_cursor = None
+    if len(results) == limit:
+        last_book, score = results[-1]
+        next_cursor = encode_cursor(books.SEARCH_SORT, (score, last_book.id))
+    set_next_cursor(request, response, next_cursor)
+    return [found for found, _ in results]
+
+
+@router.get("/{book_id}", response_model=schemas.Book)
+def read_book(
+    book_id: int, request: Request, response: Response, db: Session = Depends(get_db)
+):
     """
     Retrieve a specific book by its ID.
+
+    Responses carry an `ETag`; send it back in `If-None-Match` to get a
+    304 without a body while the book is unchanged.
     """
-    db_book = books.book.get(db, id=book_id)
-    if db_book is None:
-        raise HTTPException(status_code=404, detail="Book not found")
-    return db_book
+    cache = get_cache()
+    generation = cache.generation() if cache else None
+    cached = cache.get_book(book_id) if cache else None
+    if cached is None and request.headers.get("if-none-match"):
+        version = books.book.get_version(db, id=book_id)
+        if version is not None and etag_matches(request, book_etag(book_id, version)):
+            return not_modified(book_etag(book_id, version))
+    if cached is None:
+        db_book = books.book.get(db, id=book_id)
+        if db_book is None:
+            raise HTTPException(status_code=404, detail="Book not found")
+
+        cached = {
+            "book": schemas.Book.model_validate(db_book, from_attributes=True).model_dump(mode="json"),
+            "etag": book_etag(db_book.id, db_book.version)
+        }
+        if cache:
+            cache.set_book(book_id, cached, generation)
 
+    if etag_matches(request, cached["etag"]):
+        return not_modified(cached["etag"])
+    response.headers["ETag"] = cached["etag"]
+    return cached["book"]
@@ -7,8 +7,8 @@ from sqlalchemy import select
 
 from .. import models, schemas
 from ..crud import books, users, lending
+from ..crud.lending import BookNotFoundError, BookUnavailableError
 from ..dependencies import get_db
-from ..publisher import publish_event
 
 router = APIRouter()
 
@@ -21,15 +21,6 @@ def borrow_book(
     """
     Borrow a book for a specific user.
     """
-    # Check if book exists and is available
-    book_stmt = select(models.Book).where(models.Book.id == lending_in.book_id)
-    book = db.execute(book_stmt).scalar_one_or_none()
-    
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
-    if not book.is_available:
-        raise HTTPException(status_code=400, detail="Book is not available for borrowing")
-        
     # Check if user exists
     user_stmt = select(models.User).where(models.User.id == lending_in.user_id)
     user = db.execute(user_stmt).scalar_one_or_none()
@@ -37,25 +28,17 @@ def borrow_book(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
         
-    # Create lending record
-    lending_record = lending.borrow_book(
-        db=db,
-        obj_in=lending_in
-    )
-    
-    # Convert lending object to dictionary for event publishing
-    lending_data = {
-        column.name: getattr(lending_record, column.name) 
-        for column in lending_record.__table__.columns
-    }
-    
-    # Serialize date objects
-    lending_data['borrow_date'] = lending_data['borrow_date'].isoformat()
-    lending_data['due_date'] = lending_data['due_date'].isoformat()
-    if lending_data.get('return_date'):
-        lending_data['return_date'] = lending_data['return_date'].isoformat()
-    
-    publish_event("book_borrowed", lending_data)
+    # Claim the book and create the lending record; the book_borrowed event is
+    # written to the outbox in the same transaction and published by the relay
+    try:
+        lending_record = lending.borrow_book(
+            db=db,
+            obj_in=lending_in
+        )
+    except BookNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BookUnavailableError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     return lending_record
 
@@ -77,28 +60,9 @@ def return_book(lending_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Book already returned")
     
     try:
-        # Return the book
+        # Return the book; the book_returned event goes through the outbox
         returned_lending = lending.return_book(db=db, lending_id=lending_id)
         
-        # Convert lending object to dictionary for event publishing
-        lending_data = {
-            column.name: getattr(returned_lending, column.name) 
-            for column in returned_lending.__table__.columns
-        }
-        
-        # Make sure date objects are serializable
-        lending_data['borrow_date'] = lending_data['borrow_date'].isoformat()
-        lending_data['due_date'] = lending_data['due_date'].isoformat()
-        if lending_data.get('return_date'):
-            lending_data['return_date'] = lending_data['return_date'].isoformat()
-        
-        # Publish event to notify admin service
-        publish_event("book_returned", {
-            **lending_data,
-            "book_id": returned_lending.book_id,  # Ensure book_id is included
-            "is_available": True  # Explicitly set availability to True
-        })
-        
         return returned_lending
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -7,7 +7,6 @@ from sqlalchemy.orm import Session
 from .. import models, schemas
 from ..crud import books, users, lending
 from ..dependencies import get_db
-from ..publisher import publish_event
 
 router = APIRouter()
 
@@ -18,14 +17,8 @@ def create_user(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    # Create the user
+    # Create the user; the user_created event is published via the outbox
     new_user = users.user.create(db=db, obj_in=user_in)
     
-    # Convert user object to dictionary for event publishing
-    user_data = {column.name: getattr(new_user, column.name) for column in new_user.__table__.columns}
-    
-    # Publish event to notify admin service
-    publish_event("user_created", user_data)
-    
     return new_user
 
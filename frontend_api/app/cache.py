@@ -0,0 +1,252 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LocalBackend:
+    """
+    In-process store with a TTL per entry and LRU eviction once
+    `max_entries` is reached. Also stands in for Redis in tests and
+    single-process deployments.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 30.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._store(key, value)
+
+    def set_if_generation(self, key: str, value: Any, generation: int):
+        """Store `value` only if the generation is still `generation`"""
+        with self._lock:
+            # bump_generation takes the same lock, so it cannot slip in between
+            if self._generation == generation:
+                self._store(key, value)
+
+    def _store(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def generation(self) -> int:
+        return self._generation
+
+    def bump_generation(self):
+        with self._lock:
+            self._generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Store shared by every API process. Needs the optional `redis` package.
+    """
+
+    GENERATION_KEY = "books:generation"
+
+    # Compare the generation and write in one step on the server
+    SET_IF_GENERATION = """
+    if tonumber(redis.call('GET', KEYS[1]) or '0') == tonumber(ARGV[1]) then
+        redis.call('SET', KEYS[2], ARGV[2], 'PX', ARGV[3])
+        return 1
+    end
+    return 0
+    """
+
+    def __init__(self, url: str, ttl: float = 30.0):
+        import redis
+
+        self.ttl = ttl
+        self.evictions = 0
+        self._client = redis.Redis.from_url(url)
+        self._set_if_generation = self._client.register_script(self.SET_IF_GENERATION)
+
+    def get(self, key: str) -> Optional[Any]:
+        raw = self._client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any):
+        self._client.set(key, json.dumps(value), px=int(self.ttl * 1000))
+
+    def set_if_generation(self, key: str, value: Any, generation: int):
+        self._set_if_generation(
+            keys=[self.GENERATION_KEY, key],
+            args=[generation, json.dumps(value), int(self.ttl * 1000)]
+        )
+
+    def delete(self, *keys: str):
+        if keys:
+            self._client.delete(*keys)
+
+    def generation(self) -> int:
+        return int(self._client.get(self.GENERATION_KEY) or 0)
+
+    def bump_generation(self):
+        self._client.incr(self.GENERATION_KEY)
+
+    def clear(self):
+        # Entries expire on their own, a new generation hides the listings
+        self.bump_generation()
+
+    def size(self) -> int:
+        return self._client.dbsize()
+
+
+class BookCache:
+    """
+    Read-through cache for serialized book details and listing pages.
+
+    Detail entries are dropped by id when a book changes. Listing keys embed
+    a generation number, so one increment invalidates every cached page and
+    the stale pages simply age out. Callers read the generation before
+    querying the database and pass it back when storing, so a row read
+    before a concurrent invalidation is never cached after it.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _count(self, value: Optional[Any]) -> Optional[Any]:
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def generation(self) -> int:
+        return self.backend.generation()
+
+    def get_book(self, book_id: int) -> Optional[Dict[str, Any]]:
+        return self._count(self.backend.get(f"books:{book_id}"))
+
+    def set_book(self, book_id: int, data: Dict[str, Any], generation: int):
+        # Detail keys carry no generation, so the check and the write must
+        # be one atomic step or an invalidation could land between them
+        self.backend.set_if_generation(f"books:{book_id}", data, generation)
+
+    def _listing_key(self, params: Dict[str, Any], generation: int) -> str:
+        query = json.dumps(params, sort_keys=True, separators=(",", ":"))
+        return f"books:list:{generation}:{query}"
+
+    def get_listing(self, params: Dict[str, Any], generation: int) -> Optional[Any]:
+        return self._count(self.backend.get(self._listing_key(params, generation)))
+
+    def set_listing(self, params: Dict[str, Any], data: Any, generation: int):
+        if self.backend.generation() == generation:
+            self.backend.set(self._listing_key(params, generation), data)
+
+    def invalidate(self, book_ids: Iterable[int]):
+        """Drop the given books and every listing page"""
+        self.backend.delete(*(f"books:{book_id}" for book_id in book_ids))
+        self.backend.bump_generation()
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / total if total else 0.0,
+            "evictions": self.backend.evictions
+        }
+
+
+_cache: Optional[BookCache] = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> Optional[BookCache]:
+    """The process-wide book cache, or None when caching is disabled"""
+    global _cache
+    if not settings.CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            if settings.CACHE_URL:
+                backend = RedisBackend(settings.CACHE_URL, ttl=settings.CACHE_TTL_SECONDS)
+            else:
+                backend = LocalBackend(max_entries=settings.CACHE_MAX_ENTRIES, ttl=settings.CACHE_TTL_SECONDS)
+            _cache = BookCache(backend)
+        return _cache
+
+
+def invalidate_book(db: Session, book_id: Optional[int] = None):
+    """
+    Schedule a book (and all listing pages) for invalidation once the
+    caller's transaction commits. Invalidating earlier would let a
+    concurrent read cache the old row again before the commit.
+    """
+    pending = db.info.setdefault('cache_invalidate', set())
+    if book_id is not None:
+        pending.add(book_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session: Session):
+    book_ids = session.info.pop('cache_invalidate', None)
+    cache = get_cache()
+    if book_ids is None or cache is None:
+        return
+    try:
+        cache.invalidate(book_ids)
+    except Exception as e:
+        # Entries still expire after CACHE_TTL_SECONDS
+        logger.error(f"Error invalidating book cache: {str(e)}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_invalidations(session: Session):
+    session.info.pop('cache_invalidate', None)
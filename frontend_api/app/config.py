@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Literal, Optional
 from pydantic import ConfigDict, computed_field
 
 class Settings(BaseSettings):
@@ -17,12 +18,60 @@ class Settings(BaseSettings):
    POSTGRES_DB: str
    POSTGRES_PORT: int 
    DATABASE_URL: str
+
+   # Connection pool settings, per engine and per worker process.
+   # DB_POOL_PRE_PING: "always" checks every checkout, "idle" only connections
+   # unused for DB_POOL_PING_IDLE_SECONDS, "never" relies on DB_POOL_RECYCLE
+   DB_POOL_SIZE: int = 5
+   DB_MAX_OVERFLOW: int = 10
+   DB_POOL_TIMEOUT: float = 30.0
+   DB_POOL_RECYCLE: int = -1
+   DB_POOL_PRE_PING: Literal["always", "idle", "never"] = "always"
+   DB_POOL_PING_IDLE_SECONDS: float = 30.0
+
+   # Query instrumentation: QUERY_DEBUG adds X-Query-* response headers and
+   # logs every request's queries; a statement run QUERY_REPEAT_THRESHOLD
+   # times in one request is flagged as a likely N+1
+   QUERY_DEBUG: bool = False
+   QUERY_REPEAT_THRESHOLD: int = 5
+
+   # Serve the routes with async handlers on an AsyncSession
+   ASYNC_DB: bool = False
+
+   # Most ids one GET or POST /books/batch lookup accepts
+   BOOK_BATCH_MAX_IDS: int = 200
    
    # RabbitMQ settings
    RABBITMQ_HOST: str
    RABBITMQ_PORT: int = 5672
    RABBITMQ_USER: str
    RABBITMQ_PASSWORD: str
+
+   # Messaging backend: "pika" (blocking, in threads) or "aio-pika" (asyncio).
+   # "pika" stays the default so each deployment opts in to aio-pika on its own
+   MESSAGING_BACKEND: str = "pika"
+
+   # Publisher settings
+   PUBLISHER_POOL_SIZE: int = 4
+   PUBLISHER_ACQUIRE_TIMEOUT: float = 5.0
+
+   # Outbox relay settings
+   OUTBOX_BATCH_SIZE: int = 500
+   OUTBOX_POLL_INTERVAL: float = 1.0
+   OUTBOX_MAX_ATTEMPTS: int = 10
+   OUTBOX_MAX_BACKOFF: float = 30.0
+
+   # Consumer settings
+   CONSUMER_PREFETCH_COUNT: int = 50
+   CONSUMER_WORKERS: int = 4
+   CONSUMER_BATCH_SIZE: int = 1
+   CONSUMER_BATCH_MAX_WAIT_MS: int = 50
+
+   # Book cache settings, CACHE_URL (redis://...) shares it between processes
+   CACHE_ENABLED: bool = True
+   CACHE_TTL_SECONDS: float = 30.0
+   CACHE_MAX_ENTRIES: int = 10000
+   CACHE_URL: Optional[str] = None
    
    @computed_field
    @property
@@ -31,4 +80,14 @@ class Settings(BaseSettings):
            return self.DATABASE_URL
        return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}/{self.POSTGRES_DB}"
 
+   @computed_field
+   @property
+   def SQLALCHEMY_ASYNC_DATABASE_URI(self) -> str:
+       # Same database through the asyncpg / aiosqlite drivers
+       uri = self.SQLALCHEMY_DATABASE_URI
+       for prefix, driver in (("postgresql://", "postgresql+asyncpg://"), ("sqlite://", "sqlite+aiosqlite://")):
+           if uri.startswith(prefix):
+               return driver + uri[len(prefix):]
+       return uri
+
 settings = Settings()
\ No newline at end of file
@@ -1,18 +1,25 @@
+import functools
 import json
 import logging
 import threading
 import time
-from typing import Dict, Any
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
 
 import pika
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 
 from .dependencies import SessionLocal
+from .messaging import AsyncMessaging
 from .config import settings
 from .schemas import BookCreate
 from .crud import books
+from .cache import invalidate_book
+from .crud.books import UPSERT_FIELDS
 from .models import Lending, Book
+from .metrics import consumer_message_seconds
 
 
 # Configure logging
@@ -22,6 +29,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Book columns the admin events carry but this service keeps for itself:
+# the row version counts writes to the local row
+LOCAL_BOOK_FIELDS = ("version",)
+
 def get_connection():
     """Establish a connection to RabbitMQ"""
     credentials = pika.PlainCredentials(
@@ -51,11 +62,12 @@ def handle_book_created(data: Dict[str, Any], db: Session):
             logger.info(f"Book with ISBN {data['isbn']} already exists, updating")
             # Update existing book
             for key, value in data.items():
-                if hasattr(existing_book, key):
+                if hasattr(existing_book, key) and key not in LOCAL_BOOK_FIELDS:
                     setattr(existing_book, key, value)
             db.add(existing_book)
-            db.commit()
-            db.refresh(existing_book)
+            db.flush()
+            invalidate_book(db, existing_book.id)
+            books.reindex_search(db, [existing_book.id])
             return
     
     # Create new book in frontend database
@@ -68,7 +80,8 @@ def handle_book_created(data: Dict[str, Any], db: Session):
         publication_year=data['publication_year'],
         description=data.get('description')
     )
-    books.book.create(db=db, obj_in=book_data)
+    books.book.create(db=db, obj_in=book_data, commit=False)
+    invalidate_book(db)
 
 def handle_book_updated(data: Dict[str, Any], db: Session):
     """Handle book_updated events from admin service"""
@@ -92,11 +105,12 @@ def handle_book_updated(data: Dict[str, Any], db: Session):
     if existing_book:
         # Update the book
         for key, value in data.items():
-            if hasattr(existing_book, key):
+            if hasattr(existing_book, key) and key not in LOCAL_BOOK_FIELDS:
                 setattr(existing_book, key, value)
         db.add(existing_book)
-        db.commit()
-        db.refresh(existing_book)
+        db.flush()
+        invalidate_book(db, existing_book.id)
+        books.reindex_search(db, [existing_book.id])
     else:
         logger.error(f"Book with ID {book_id} and ISBN {data.get('isbn')} not found, cannot update")
 
@@ -116,7 +130,7 @@ def handle_book_borrowed(data: Dict[str, Any], db: Session):
                 if hasattr(existing_lending, key):
                     setattr(existing_lending, key, value)
             db.add(existing_lending)
-            db.commit()
+            db.flush()
             return
     
     # Create new lending record
@@ -130,7 +144,7 @@ def handle_book_borrowed(data: Dict[str, Any], db: Session):
     )
     
     db.add(new_lending)
-    db.commit()
+    db.flush()
 
 def handle_book_returned(data: Dict[str, Any], db: Session):
     """Handle book_returned events from admin service"""
@@ -147,8 +161,8 @@ def handle_book_returned(data: Dict[str, Any], db: Session):
         # Update book availability
         book.is_available = True
         db.add(book)
-        db.commit()
-        db.refresh(book)
+        db.flush()
+        invalidate_book(db, book.id)
     else:
         logger.error(f"Book with ID {book_id} not found for updating availability")
 
@@ -168,7 +182,9 @@ def handle_book_deleted(data: Dict[str, Any], db: Session):
     
     if existing_book:
         db.delete(existing_book)
-        db.commit()
+        db.flush()
+        invalidate_book(db, book_id)
+        books.reindex_search(db, [book_id])
     else:
         logger.warning(f"Book with ID {book_id} not found for deletion")
 
@@ -181,35 +197,325 @@ EVENT_HANDLERS = {
     'book_returned': handle_book_returned
 }
 
+def _dispatch(message: Dict[str, Any], db: Session):
+    """Run the handler for a decoded message without committing"""
+    event_type = message.get('event_type')
+    payload = message.get('payload')
+
+    logger.info(f"Received {event_type} event")
+
+    # Process the event if we have a handler for it
+    if event_type in EVENT_HANDLERS:
+        handler = EVENT_HANDLERS[event_type]
+        handler(payload, db)
+    else:
+        logger.warning(f"No handler for event type: {event_type}")
+
+def _has_fields(payload: Optional[Dict[str, Any]], fields) -> bool:
+    return bool(payload) and bool(payload.get('isbn')) and all(field in payload for field in fields)
+
+def apply_batch(messages: List[Dict[str, Any]], db: Session):
+    """
+    Dispatch messages in order without committing. Consecutive book_created
+    and full-row book_updated events are folded into one upsert by ISBN.
+    A book_updated whose id currently belongs to a different ISBN changes
+    the ISBN itself, so it goes through its handler instead; an update for a
+    book not mirrored yet creates it.
+    """
+    update_ids = [
+        m['payload']['id'] for m in messages
+        if m.get('event_type') == 'book_updated' and (m.get('payload') or {}).get('id')
+    ]
+    current_isbns = dict(db.execute(select(Book.id, Book.isbn).where(Book.id.in_(update_ids))).all()) if update_ids else {}
+
+    pending: List[Dict[str, Any]] = []
+    for message in messages:
+        event_type = message.get('event_type')
+        payload = message.get('payload')
+        if event_type == 'book_created':
+            # Same fields handle_book_created requires, description is optional
+            foldable = _has_fields(payload, [f for f in UPSERT_FIELDS if f != 'description'])
+        elif event_type == 'book_updated':
+            # Only full rows, a partial update must not blank other columns
+            foldable = _has_fields(payload, UPSERT_FIELDS) and \
+                current_isbns.get(payload.get('id'), payload['isbn']) == payload['isbn']
+        else:
+            foldable = False
+        if foldable:
+            pending.append(payload)
+            continue
+        if pending:
+            books.book.upsert_many(db, objs_in=pending, commit=False)
+            pending = []
+        _dispatch(message, db)
+
+    if pending:
+        books.book.upsert_many(db, objs_in=pending, commit=False)
+
+def apply_message(message: Dict[str, Any], db: Session) -> bool:
+    """
+    Apply a decoded message with its event handler and commit it.
+    Returns False when the message should be requeued.
+    """
+    start = time.perf_counter()
+    try:
+        _dispatch(message, db)
+        db.commit()
+        outcome = "ok"
+        return True
+    except Exception as e:
+        logger.error(f"Error processing message: {str(e)}")
+        db.rollback()
+        outcome = "requeued"
+        return False
+    finally:
+        consumer_message_seconds.observe(
+            time.perf_counter() - start, event_type=str(message.get('event_type')), outcome=outcome
+        )
+
 def callback(ch, method, properties, body, db: Session):
     """Process incoming messages from the queue"""
     try:
         # Parse the message
         message = json.loads(body)
-        event_type = message.get('event_type')
-        payload = message.get('payload')
-        
-        logger.info(f"Received {event_type} event")
-        
-        # Process the event if we have a handler for it
-        if event_type in EVENT_HANDLERS:
-            handler = EVENT_HANDLERS[event_type]
-            handler(payload, db)
-            # Acknowledge the message
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-        else:
-            logger.warning(f"No handler for event type: {event_type}")
-            # Acknowledge the message anyway
-            ch.basic_ack(delivery_tag=method.delivery_tag)
-            
-    except Exception as e:
+    except ValueError as e:
         logger.error(f"Error processing message: {str(e)}")
         # Reject the message and requeue it
         ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        return
+
+    if apply_message(message, db):
+        # Acknowledge the message
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+    else:
+        # Reject the message and requeue it
+        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+
+# Lending events name the book in book_id, their own id is the lending's
+LENDING_EVENTS = ('book_borrowed', 'book_returned')
+
+def ordering_key(message: Dict[str, Any]) -> str:
+    """
+    Key that identifies the book an event touches. Events with the same key
+    must be applied in delivery order; everything else can run in parallel.
+    Book and lending events for one book share the key `book:<id>`.
+    """
+    event_type = str(message.get('event_type'))
+    payload = message.get('payload') or {}
+    if event_type.startswith('book_'):
+        book_id = payload.get('book_id') if event_type in LENDING_EVENTS else payload.get('id')
+        if book_id is not None:
+            return f"book:{book_id}"
+        if payload.get('isbn') is not None:
+            return f"isbn:{payload['isbn']}"
+    return event_type
+
+
+class OrderedWorkerPool:
+    """
+    Fixed set of single-threaded worker lanes. A message is always routed to
+    the lane chosen by its ordering key, so per-book ordering is preserved
+    while independent books are handled concurrently. Each lane keeps one
+    database session for its lifetime instead of opening one per message.
+    """
+
+    def __init__(self, workers: int, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self._lanes = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"consumer-lane-{i}")
+            for i in range(max(1, workers))
+        ]
+        self._local = threading.local()
+
+    def _session(self) -> Session:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = self.session_factory()
+        return db
+
+    def lane(self, key: str) -> ThreadPoolExecutor:
+        """The lane every message with this ordering key is applied on"""
+        return self._lanes[zlib.crc32(key.encode()) % len(self._lanes)]
+
+    def submit(self, key: str, message: Dict[str, Any], on_done):
+        """Apply the message on its lane and report the outcome to `on_done`"""
+        lane = self.lane(key)
+
+        def work():
+            on_done(apply_message(message, self._session()))
+
+        return lane.submit(work)
+
+    def shutdown(self, wait: bool = True):
+        for lane in self._lanes:
+            lane.shutdown(wait=wait)
+
+
+class ConcurrentDispatcher:
+    """
+    pika on_message_callback that hands messages to an OrderedWorkerPool.
+    Acks and nacks are scheduled back onto the connection thread, since pika
+    channels must only be used from the thread that owns the connection.
+    """
+
+    def __init__(self, connection, pool: OrderedWorkerPool):
+        self.connection = connection
+        self.pool = pool
+
+    def _settle(self, ch, delivery_tag: int, success: bool):
+        if success:
+            settle = functools.partial(ch.basic_ack, delivery_tag=delivery_tag)
+        else:
+            settle = functools.partial(ch.basic_nack, delivery_tag=delivery_tag, requeue=True)
+        try:
+            self.connection.add_callback_threadsafe(settle)
+        except Exception as e:
+            # The connection is gone, the broker will redeliver the message
+            logger.warning(f"Could not settle message {delivery_tag}: {str(e)}")
+
+    def on_message(self, ch, method, properties, body):
+        try:
+            message = json.loads(body)
+        except ValueError as e:
+            logger.error(f"Discarding malformed message: {str(e)}")
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            return
+
+        delivery_tag = method.delivery_tag
+        self.pool.submit(
+            ordering_key(message),
+            message,
+            lambda success: self._settle(ch, delivery_tag, success)
+        )
+
+class BatchingDispatcher:
+    """
+    pika on_message_callback that groups messages into micro-batches.
+
+    Messages accumulate on the connection thread until `batch_size` have
+    arrived or `max_wait` seconds have passed since the first one. The batch
+    is then applied on a worker thread in one session with a single commit
+    (runs of book create/update events become one bulk upsert), and
+    acknowledged with one basic_ack(multiple=True). If any message in the
+    batch fails, the batch is rolled back and replayed message by message so
+    only the failing ones are requeued.
+    """
+
+    def __init__(self, batch_size: int, max_wait: float, session_factory=SessionLocal):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.session_factory = session_factory
+        self.connection = None
+        self._channel = None
+        self._batch: List[Tuple[int, Dict[str, Any]]] = []
+        self._timer = None
+        # A single worker applies batches in delivery order
+        self._worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="consumer-batch")
+        self._db: Optional[Session] = None
+
+    def attach(self, connection):
+        """Bind to a (re)established connection, dropping unsettled deliveries"""
+        self.connection = connection
+        self._batch = []
+        self._timer = None
+
+    def on_message(self, ch, method, properties, body):
+        try:
+            message = json.loads(body)
+        except ValueError as e:
+            logger.error(f"Discarding malformed message: {str(e)}")
+            ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+            return
+
+        self._channel = ch
+        self._batch.append((method.delivery_tag, message))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = self.connection.call_later(self.max_wait, self._on_timer)
+
+    def _on_timer(self):
+        self._timer = None
+        self.flush()
+
+    def flush(self):
+        """Hand the accumulated messages to the worker thread"""
+        if self._timer is not None:
+            self.connection.remove_timeout(self._timer)
+            self._timer = None
+        batch, self._batch = self._batch, []
+        if batch:
+            return self._worker.submit(self._apply, self.connection, self._channel, batch)
+
+    def _session(self) -> Session:
+        if self._db is None:
+            self._db = self.session_factory()
+        return self._db
+
+    def _apply(self, connection, ch, batch: List[Tuple[int, Dict[str, Any]]]):
+        db = self._session()
+        start = time.perf_counter()
+        try:
+            apply_batch([message for _, message in batch], db)
+            db.commit()
+            settlements = [functools.partial(ch.basic_ack, delivery_tag=batch[-1][0], multiple=True)]
+            # Messages in a batch share its time
+            share = (time.perf_counter() - start) / len(batch)
+            for _, message in batch:
+                consumer_message_seconds.observe(share, event_type=str(message.get('event_type')), outcome="ok")
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Batch of {len(batch)} messages failed ({str(e)}), applying one by one")
+            settlements = []
+            for delivery_tag, message in batch:
+                if apply_message(message, db):
+                    settlements.append(functools.partial(ch.basic_ack, delivery_tag=delivery_tag))
+                else:
+                    settlements.append(functools.partial(ch.basic_nack, delivery_tag=delivery_tag, requeue=True))
+
+        for settle in settlements:
+            try:
+                connection.add_callback_threadsafe(settle)
+            except Exception as e:
+                # The connection is gone, the broker will redeliver the batch
+                logger.warning(f"Could not settle batch: {str(e)}")
+                break
+
+def handle_message(message: Dict[str, Any]) -> bool:
+    """Apply a decoded message in its own session, for the async consumer"""
+    db = SessionLocal()
+    try:
+        return apply_message(message, db)
+    finally:
+        db.close()
+
+def create_async_consumer(connect=None) -> AsyncMessaging:
+    """The aio-pika consumer for this service's queue and events"""
+    return AsyncMessaging(
+        'frontend_service_queue',
+        EVENT_HANDLERS.keys(),
+        handle_message,
+        ordering_key=ordering_key,
+        prefetch_count=settings.CONSUMER_PREFETCH_COUNT,
+        workers=settings.CONSUMER_WORKERS,
+        connect=connect
+    )
 
 def start_consumer():
     """Start the event consumer in a background thread"""
     def consume():
+        batching = settings.CONSUMER_BATCH_SIZE > 1
+        if batching:
+            batcher = BatchingDispatcher(
+                settings.CONSUMER_BATCH_SIZE,
+                settings.CONSUMER_BATCH_MAX_WAIT_MS / 1000
+            )
+            # The window must hold at least one full batch plus the next one
+            prefetch_count = max(settings.CONSUMER_PREFETCH_COUNT, 2 * settings.CONSUMER_BATCH_SIZE)
+        else:
+            pool = OrderedWorkerPool(settings.CONSUMER_WORKERS)
+            prefetch_count = settings.CONSUMER_PREFETCH_COUNT
+
         # Retry connection until RabbitMQ is available
         while True:
             try:
@@ -232,19 +538,19 @@ def start_consumer():
                         routing_key=event_type
                     )
                 
-                # Set up the callback with a database session
-                def process_message(ch, method, properties, body):
-                    db = SessionLocal()
-                    try:
-                        callback(ch, method, properties, body, db)
-                    finally:
-                        db.close()
+                # Hand messages to the batcher or the worker lanes,
+                # acks come back on this thread
+                if batching:
+                    batcher.attach(connection)
+                    on_message = batcher.on_message
+                else:
+                    on_message = ConcurrentDispatcher(connection, pool).on_message
                 
-                # Configure consumer
-                channel.basic_qos(prefetch_count=1)
+                # Configure consumer; the prefetch window keeps the workers busy
+                channel.basic_qos(prefetch_count=prefetch_count)
                 channel.basic_consume(
                     queue=queue_name,
-                    on_message_callback=process_message
+                    on_message_callback=on_message
                 )
                 
                 logger.info("Frontend service consumer started. Waiting for messages...")
@@ -1,6 +1,7 @@
 from .books import book
 from .users import user
 from .lending import lending
+from .facets import facets
 
 # For importing all CRUD operations at once
-__all__ = ["book", "user", "lending"]
\ No newline at end of file
+__all__ = ["book", "user", "lending", "facets"]
\ No newline at end of file
@@ -1,11 +1,139 @@
+import re
 from datetime import date, datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import Iterable, List, Optional, Dict, Any, Tuple
 
-from sqlalchemy import and_, select
+from sqlalchemy import Double, and_, cast, column, delete, false, func, insert, literal_column, or_, select, table, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from ..models import Lending, Book, User
+from ..models import Lending, Book, User, book_search_vector
 from ..schemas import BookCreate, BookUpdate
+from ..cache import invalidate_book
+from ..projection import Projection
+from .facets import facets
+
+
+# Columns written by upsert_many; availability is owned by the lending flow
+UPSERT_FIELDS = ("title", "author", "isbn", "publisher", "category", "publication_year", "description")
+
+
+def _listing_statement(
+    skip: int = 0,
+    limit: int = 100,
+    publisher: Optional[str] = None,
+    category: Optional[str] = None,
+    sort: str = "id",
+    after: Optional[Tuple] = None,
+    projection: Optional[Projection] = None
+):
+    """
+    Select one page of available books, shared by the sync and async CRUD.
+    With a `projection`, rows of its columns and the book version instead.
+    """
+    # Start with base query for available books
+    base = projection.select(Book.version) if projection is not None else select(Book)
+    statement = base.where(Book.is_available == True)
+    
+    # Add optional filters
+    if publisher:
+        statement = statement.where(Book.publisher == publisher)
+    if category:
+        statement = statement.where(Book.category == category)
+    
+    # Order by a unique key so pages are stable
+    if sort == "title":
+        statement = statement.order_by(Book.title, Book.id)
+        if after is not None:
+            statement = statement.where(tuple_(Book.title, Book.id) > tuple_(*after))
+    else:
+        statement = statement.order_by(Book.id)
+        if after is not None:
+            statement = statement.where(Book.id > after[0])
+    
+    # Add pagination
+    if after is None:
+        statement = statement.offset(skip)
+    return statement.limit(limit)
+
+
+# Cursor sort name of search pages, whose key is (score, id)
+SEARCH_SORT = "rank"
+
+# SQLite's stand-in for the PostgreSQL search index, see models.py
+books_fts = table("books_fts", column("rowid"), column("title"), column("author"), column("description"))
+
+
+def _fts5_query(q: str) -> str:
+    # Quote every word so FTS5 syntax and punctuation in the input are
+    # taken literally; the words must all match, like websearch_to_tsquery
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", q))
+
+
+def _search_statement(dialect: str, q: str, limit: int = 20, after: Optional[Tuple] = None):
+    """
+    Select one page of (Book, score) rows matching `q`, best match first,
+    shared by the sync and async CRUD. `after` is the (score, id) of the
+    last book of the previous page.
+    """
+    if dialect == "postgresql":
+        query = func.websearch_to_tsquery(text("'english'"), q)
+        vector = book_search_vector()
+        # ts_rank is a float4; as float8 the score handed out in cursors is
+        # exactly the value compared against on the next page
+        score = cast(func.ts_rank(vector, query), Double)
+        statement = select(Book, score).where(vector.bool_op("@@")(query))
+    else:
+        # bm25() is lower for better matches
+        score = -func.bm25(literal_column("books_fts"))
+        statement = select(Book, score).join(books_fts, books_fts.c.rowid == Book.id)
+        terms = _fts5_query(q)
+        if terms:
+            statement = statement.where(literal_column("books_fts").match(terms))
+        else:
+            statement = statement.where(false())
+
+    if after is not None:
+        statement = statement.where(or_(score < after[0], and_(score == after[0], Book.id > after[1])))
+    return statement.order_by(score.desc(), Book.id).limit(limit)
+
+
+def reindex_search(db: Session, book_ids: Iterable[int]):
+    """
+    Bring the SQLite full-text table in step with books that were created,
+    updated or deleted in the caller's transaction. PostgreSQL indexes the
+    books table itself, so there is nothing to do there.
+    """
+    ids = list(book_ids)
+    if not ids or db.get_bind().dialect.name != "sqlite":
+        return
+    db.flush()
+    db.execute(delete(books_fts).where(books_fts.c.rowid.in_(ids)))
+    db.execute(insert(books_fts).from_select(
+        ["rowid", "title", "author", "description"],
+        select(Book.id, Book.title, Book.author, Book.description).where(Book.id.in_(ids))
+    ))
+
+
+def _batch_statements(ids: List[int], chunk_size: int):
+    """
+    SELECTs for the books with the given ids, one per `chunk_size` ids so
+    the IN-lists stay within the database's bound-parameter limits, shared
+    by the sync and async CRUD.
+    """
+    for start in range(0, len(ids), chunk_size):
+        yield select(Book).where(Book.id.in_(ids[start:start + chunk_size]))
+
+
+def _in_requested_order(ids: List[int], found: Dict[int, Book]) -> Tuple[List[Book], List[int]]:
+    return [found[id] for id in ids if id in found], [id for id in ids if id not in found]
+
+
+def sort_key(book: Book, sort: str = "id") -> Tuple:
+    """
+    Sort key of a book for the given order, used to build page cursors.
+    """
+    return (book.title, book.id) if sort == "title" else (book.id,)
 
 
 # Book operations
@@ -24,35 +152,90 @@ class BookCRUD:
         statement = select(Book).where(Book.isbn == isbn)
         return db.execute(statement).scalar_one_or_none()
 
+    def get_many(
+        self, db: Session, ids: Iterable[int], chunk_size: int = 500
+    ) -> Tuple[List[Book], List[int]]:
+        """
+        Get many books by ID, one query per `chunk_size` ids. Returns the
+        books found, in the order their ids were requested (repeated ids
+        once), and the requested ids that match no book.
+        """
+        requested = list(dict.fromkeys(ids))
+        found: Dict[int, Book] = {}
+        for statement in _batch_statements(requested, chunk_size):
+            found.update((book.id, book) for book in db.execute(statement).scalars())
+        return _in_requested_order(requested, found)
+
     def get_all(
         self, 
         db: Session, 
         skip: int = 0, 
         limit: int = 100,
         publisher: Optional[str] = None,
-        category: Optional[str] = None
-    ) -> List[Book]:
+        category: Optional[str] = None,
+        sort: str = "id",
+        after: Optional[Tuple] = None,
+        projection: Optional[Projection] = None
+    ) -> List[Any]:
         """
         Get all available books with optional filtering.
+
+        Books are ordered by `id` or by `(title, id)`. When `after` holds the
+        sort key of the last book of the previous page, the next page is found
+        by seeking past it (keyset pagination) instead of using OFFSET, so deep
+        pages cost the same as the first one. With a `projection` the page is
+        returned as rows of its columns instead of Book objects.
+        """
+        statement = _listing_statement(skip, limit, publisher, category, sort, after, projection)
+        result = db.execute(statement)
+        return list(result.all() if projection is not None else result.scalars().all())
+
+    def get_version(self, db: Session, id: int) -> Optional[int]:
+        """
+        Get the row version of a book, or None if there is no such book.
+        """
+        statement = select(Book.version).where(Book.id == id)
+        return db.execute(statement).scalar_one_or_none()
+
+    def get_versions(
+        self,
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        publisher: Optional[str] = None,
+        category: Optional[str] = None,
+        sort: str = "id",
+        after: Optional[Tuple] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        (id, version) of the books get_all would return with the same
+        arguments, without loading the books themselves.
+        """
+        statement = _listing_statement(skip, limit, publisher, category, sort, after)
+        statement = statement.with_only_columns(Book.id, Book.version)
+        return [(row.id, row.version) for row in db.execute(statement)]
+
+    def sort_key(self, book: Book, sort: str = "id") -> Tuple:
+        """
+        Sort key of a book for the given order, used to build page cursors.
+        """
+        return sort_key(book, sort)
+
+    def search(
+        self, db: Session, q: str, limit: int = 20, after: Optional[Tuple] = None
+    ) -> List[Tuple[Book, float]]:
+        """
+        Search the whole catalog by title, author and description. Returns
+        (book, score) pairs, best match first; pass the (score, id) of the
+        last pair as `after` for the next page.
         """
-        # Start with base query for available books
-        statement = select(Book).where(Book.is_available == True)
-        
-        # Add optional filters
-        if publisher:
-            statement = statement.where(Book.publisher == publisher)
-        if category:
-            statement = statement.where(Book.category == category)
-        
-        # Add pagination
-        statement = statement.offset(skip).limit(limit)
-        
-        # Execute and return results
-        return list(db.execute(statement).scalars().all())
-
-    def create(self, db: Session, *, obj_in: BookCreate) -> Book:
-        """
-        Create a new book.
+        statement = _search_statement(db.get_bind().dialect.name, q, limit, after)
+        return [(row[0], row[1]) for row in db.execute(statement)]
+
+    def create(self, db: Session, *, obj_in: BookCreate, commit: bool = True) -> Book:
+        """
+        Create a new book. With commit=False the row is only flushed so the
+        caller can commit it together with other changes.
         """
         db_obj = Book(
             title=obj_in.title,
@@ -65,10 +248,80 @@ class BookCRUD:
             is_available=True
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        db.flush()
+        reindex_search(db, [db_obj.id])
+        if commit:
+            db.commit()
+            db.refresh(db_obj)
         return db_obj
 
+    def upsert_many(
+        self,
+        db: Session,
+        *,
+        objs_in: List[Dict[str, Any]],
+        chunk_size: int = 1000,
+        commit: bool = True
+    ) -> int:
+        """
+        Insert or update many books with INSERT ... ON CONFLICT (isbn) DO UPDATE.
+        Only the columns a payload carries are written, so a partial payload
+        leaves the others as they are; payloads with the same columns share
+        a statement per chunk. When an ISBN appears more than once its
+        payloads are merged, later ones winning. Returns the number of
+        distinct books written.
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        for obj in objs_in:
+            rows.setdefault(obj["isbn"], {}).update(
+                {field: obj[field] for field in UPSERT_FIELDS if field in obj}
+            )
+        if not rows:
+            return 0
+
+        # PostgreSQL in production, SQLite for local runs and tests
+        dialect = db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+
+        values = list(rows.values())
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            # The upsert bypasses the ORM; count the books it moves between facets
+            previous = {
+                row.isbn: row._asdict() for row in db.execute(
+                    select(Book.isbn, Book.category, Book.publisher, Book.is_available)
+                    .where(Book.isbn.in_([row["isbn"] for row in chunk]))
+                )
+            }
+            facets.record_rows(db, removed=previous.values(), added=[
+                {**previous.get(row["isbn"], {"is_available": True}), **row}
+                for row in chunk
+            ])
+
+            by_fields: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+            for row in chunk:
+                by_fields.setdefault(tuple(field for field in UPSERT_FIELDS if field in row), []).append(row)
+
+            for fields, group in by_fields.items():
+                statement = insert(Book).values(
+                    [{**row, "is_available": True} for row in group]
+                )
+                statement = statement.on_conflict_do_update(
+                    index_elements=[Book.isbn],
+                    set_={
+                        **{field: statement.excluded[field] for field in fields if field != "isbn"},
+                        "version": Book.version + 1
+                    }
+                ).returning(Book.id)
+                book_ids = list(db.execute(statement).scalars())
+                for book_id in book_ids:
+                    invalidate_book(db, book_id)
+                reindex_search(db, book_ids)
+
+        if commit:
+            db.commit()
+        return len(values)
+
     def update(self, db: Session, *, db_obj: Book, obj_in: BookUpdate) -> Book:
         """
         Update an existing book.
@@ -78,6 +331,8 @@ class BookCRUD:
         for field in update_data:
             setattr(db_obj, field, update_data[field])
         db.add(db_obj)
+        invalidate_book(db, db_obj.id)
+        reindex_search(db, [db_obj.id])
         db.commit()
         db.refresh(db_obj)
         return db_obj
@@ -91,8 +346,90 @@ class BookCRUD:
         if obj is None:
             raise ValueError(f"Book with id {id} not found")
         db.delete(obj)
+        invalidate_book(db, id)
+        reindex_search(db, [id])
         db.commit()
         return obj
 
 
-book = BookCRUD()
\ No newline at end of file
+class AsyncBookCRUD:
+    """
+    Read operations used by the async routes, on an AsyncSession.
+    """
+
+    async def get(self, db: AsyncSession, id: int) -> Optional[Book]:
+        """
+        Get a book by its ID using select statement.
+        """
+        statement = select(Book).where(Book.id == id)
+        return (await db.execute(statement)).scalar_one_or_none()
+
+    async def get_many(
+        self, db: AsyncSession, ids: Iterable[int], chunk_size: int = 500
+    ) -> Tuple[List[Book], List[int]]:
+        """
+        Get many books by ID, see BookCRUD.get_many.
+        """
+        requested = list(dict.fromkeys(ids))
+        found: Dict[int, Book] = {}
+        for statement in _batch_statements(requested, chunk_size):
+            found.update((book.id, book) for book in (await db.execute(statement)).scalars())
+        return _in_requested_order(requested, found)
+
+    async def get_all(
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        publisher: Optional[str] = None,
+        category: Optional[str] = None,
+        sort: str = "id",
+        after: Optional[Tuple] = None,
+        projection: Optional[Projection] = None
+    ) -> List[Any]:
+        """
+        Get all available books with optional filtering, see BookCRUD.get_all.
+        """
+        statement = _listing_statement(skip, limit, publisher, category, sort, after, projection)
+        result = await db.execute(statement)
+        return list(result.all() if projection is not None else result.scalars().all())
+
+    async def get_version(self, db: AsyncSession, id: int) -> Optional[int]:
+        """
+        Get the row version of a book, or None if there is no such book.
+        """
+        statement = select(Book.version).where(Book.id == id)
+        return (await db.execute(statement)).scalar_one_or_none()
+
+    async def get_versions(
+        self,
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        publisher: Optional[str] = None,
+        category: Optional[str] = None,
+        sort: str = "id",
+        after: Optional[Tuple] = None
+    ) -> List[Tuple[int, int]]:
+        """
+        (id, version) of a listing page, see BookCRUD.get_versions.
+        """
+        statement = _listing_statement(skip, limit, publisher, category, sort, after)
+        statement = statement.with_only_columns(Book.id, Book.version)
+        return [(row.id, row.version) for row in await db.execute(statement)]
+
+    def sort_key(self, book: Book, sort: str = "id") -> Tuple:
+        return sort_key(book, sort)
+
+    async def search(
+        self, db: AsyncSession, q: str, limit: int = 20, after: Optional[Tuple] = None
+    ) -> List[Tuple[Book, float]]:
+        """
+        Search the whole catalog, see BookCRUD.search.
+        """
+        statement = _search_statement(db.bind.dialect.name, q, limit, after)
+        return [(row[0], row[1]) for row in await db.execute(statement)]
+
+
+book = BookCRUD()
+async_book = AsyncBookCRUD()
\ No newline at end of file
@@ -0,0 +1,187 @@
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+from sqlalchemy import Update, and_, case, delete, event, func, insert, inspect, literal, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .. import models
+
+# Book columns summarized in book_facets, by facet name
+FACETS = {"category": models.Book.category, "publisher": models.Book.publisher}
+
+# (facet, value) -> [change in total, change in available]
+Deltas = Dict[Tuple[str, str], List[int]]
+
+
+def _count(deltas: Deltas, book: Mapping[str, Any], sign: int):
+    available = sign if book.get("is_available") else 0
+    for facet in FACETS:
+        value = book.get(facet)
+        if value is None:
+            continue
+        delta = deltas.setdefault((facet, value), [0, 0])
+        delta[0] += sign
+        delta[1] += available
+
+
+def _group(rows: Iterable[models.BookFacet]) -> Dict[str, List[models.BookFacet]]:
+    facets: Dict[str, List[models.BookFacet]] = {facet: [] for facet in FACETS}
+    for row in rows:
+        facets.setdefault(row.facet, []).append(row)
+    return facets
+
+
+class FacetCRUD:
+    """
+    Per-category and per-publisher totals and available counts.
+
+    ORM writes to books are counted as they are flushed (see `_track_facets`
+    below). Writes that bypass the ORM, such as bulk inserts and conditional
+    UPDATEs, report their changes through `record_rows` or
+    `availability_change` in the same transaction.
+    """
+
+    def get_facet(self, db: Session, facet: str) -> List[models.BookFacet]:
+        """Values of one facet with their counts, ordered by value"""
+        statement = (
+            select(models.BookFacet)
+            .where(models.BookFacet.facet == facet)
+            .order_by(models.BookFacet.value)
+        )
+        return list(db.execute(statement).scalars().all())
+
+    def get_all(self, db: Session) -> Dict[str, List[models.BookFacet]]:
+        """Every facet, keyed by facet name, in one query"""
+        statement = select(models.BookFacet).order_by(models.BookFacet.value)
+        return _group(db.execute(statement).scalars())
+
+    def record_rows(
+        self, db: Session, *, removed: Iterable[Mapping[str, Any]] = (), added: Iterable[Mapping[str, Any]] = ()
+    ):
+        """
+        Count books written without the ORM: `removed` holds the column
+        values they had before, `added` the values they have now.
+        """
+        deltas: Deltas = {}
+        for book in removed:
+            _count(deltas, book, -1)
+        for book in added:
+            _count(deltas, book, 1)
+        apply_deltas(db, deltas)
+
+    def availability_change(self, book_id: int, change: int) -> Update:
+        """
+        Statement moving one book in or out of its facets' available counts,
+        for callers that flip is_available with a Core UPDATE. Execute it in
+        the same transaction.
+        """
+        return (
+            update(models.BookFacet)
+            .where(or_(*(
+                and_(
+                    models.BookFacet.facet == facet,
+                    models.BookFacet.value == select(column).where(models.Book.id == book_id).scalar_subquery()
+                )
+                for facet, column in FACETS.items()
+            )))
+            .values(available=models.BookFacet.available + change)
+        )
+
+    def rebuild(self, db: Session):
+        """Recount every facet from the books table"""
+        db.execute(delete(models.BookFacet))
+        for facet, column in FACETS.items():
+            db.execute(insert(models.BookFacet).from_select(
+                ["facet", "value", "total", "available"],
+                select(
+                    literal(facet), column, func.count(),
+                    func.coalesce(func.sum(case((models.Book.is_available == True, 1), else_=0)), 0)
+                ).where(column != None).group_by(column)
+            ))
+
+
+class AsyncFacetCRUD:
+    """
+    Read operations used by the async routes, on an AsyncSession.
+    """
+
+    async def get_all(self, db: AsyncSession) -> Dict[str, List[models.BookFacet]]:
+        """Every facet, keyed by facet name, see FacetCRUD.get_all"""
+        statement = select(models.BookFacet).order_by(models.BookFacet.value)
+        return _group((await db.execute(statement)).scalars())
+
+
+facets = FacetCRUD()
+async_facets = AsyncFacetCRUD()
+
+
+def apply_deltas(db: Session, deltas: Deltas):
+    """Add `deltas` to book_facets with one upsert, dropping emptied values"""
+    # Sorted, so concurrent transactions lock facet rows in the same order
+    rows = [
+        {"facet": facet, "value": value, "total": total, "available": available}
+        for (facet, value), (total, available) in sorted(deltas.items())
+        if total or available
+    ]
+    if not rows:
+        return
+
+    # PostgreSQL in production, SQLite for local runs and tests
+    dialect = db.get_bind().dialect.name
+    upsert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = upsert(models.BookFacet).values(rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=[models.BookFacet.facet, models.BookFacet.value],
+        set_={
+            "total": models.BookFacet.total + statement.excluded.total,
+            "available": models.BookFacet.available + statement.excluded.available
+        }
+    )
+    connection = db.connection()
+    connection.execute(statement)
+    connection.execute(delete(models.BookFacet).where(models.BookFacet.total <= 0))
+
+
+def _facet_values(book: models.Book, previous: bool = False) -> Dict[str, Any]:
+    state = inspect(book)
+    values = {}
+    for name in (*FACETS, "is_available"):
+        history = state.attrs[name].history
+        values[name] = history.deleted[0] if previous and history.deleted else getattr(book, name)
+    return values
+
+
+@event.listens_for(Session, "before_flush")
+def _track_facets(session: Session, flush_context, instances):
+    """
+    Count books created, deleted or moved between facets by this flush,
+    in the same transaction as the books themselves.
+    """
+    deltas: Deltas = {}
+    for obj in session.new:
+        if isinstance(obj, models.Book):
+            values = _facet_values(obj)
+            # Unset means the column default
+            values["is_available"] = values["is_available"] is not False
+            _count(deltas, values, 1)
+    for obj in session.deleted:
+        if isinstance(obj, models.Book):
+            _count(deltas, _facet_values(obj, previous=True), -1)
+    for obj in session.dirty:
+        if isinstance(obj, models.Book) and obj not in session.deleted:
+            before, after = _facet_values(obj, previous=True), _facet_values(obj)
+            if before != after:
+                _count(deltas, before, -1)
+                _count(deltas, after, 1)
+    apply_deltas(session, deltas)
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Setting a facet column on an expired book loads its old value first, so
+# the flush knows which facet the book leaves
+for _column in (*FACETS.values(), models.Book.is_available):
+    event.listen(_column, "set", _load_previous_value, active_history=True)
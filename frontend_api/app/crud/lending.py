@@ -1,11 +1,66 @@
 from datetime import date, datetime, timedelta
 from typing import List, Optional, Dict, Any
 
-from sqlalchemy import select
+from sqlalchemy import insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..models import Lending, Book, User
 from ..schemas import LendingCreate
+from .. import outbox
+from ..cache import invalidate_book
+from .facets import facets
+
+
+def _lending_payload(lending: Lending) -> Dict[str, Any]:
+    """
+    Column values of a lending record, used as the event payload.
+    """
+    return {column.name: getattr(lending, column.name) for column in lending.__table__.columns}
+
+
+class BookNotFoundError(ValueError):
+    """Raised when borrowing a book that does not exist"""
+
+
+class BookUnavailableError(ValueError):
+    """Raised when borrowing a book that is already checked out"""
+
+
+def _claim_statement(obj_in: LendingCreate):
+    """
+    Conditionally mark a book as borrowed, returning its id only if it was available.
+    """
+    return (
+        update(Book)
+        .where(Book.id == obj_in.book_id, Book.is_available == True)
+        .values(is_available=False, version=Book.version + 1)
+        .returning(Book.id)
+    )
+
+
+def _borrow_statements(obj_in: LendingCreate, dialect: str):
+    """
+    Statements claiming a book and inserting its lending record. On
+    PostgreSQL this is one statement with the claim in a data-modifying
+    CTE; SQLite has none, so it gets the claim and the insert separately.
+    """
+    borrow_date = date.today()
+    due_date = borrow_date + timedelta(days=obj_in.duration_days)
+
+    if dialect == "postgresql":
+        claimed = _claim_statement(obj_in).cte("claimed")
+        return None, insert(Lending).from_select(
+            ["user_id", "book_id", "borrow_date", "due_date"],
+            select(literal(obj_in.user_id), claimed.c.id, literal(borrow_date), literal(due_date))
+        ).returning(Lending)
+
+    return _claim_statement(obj_in), insert(Lending).values(
+        user_id=obj_in.user_id,
+        book_id=obj_in.book_id,
+        borrow_date=borrow_date,
+        due_date=due_date
+    ).returning(Lending)
 
 
 # Lending operations
@@ -13,34 +68,31 @@ class LendingCRUD:
     def borrow_book(self, db: Session, *, obj_in: LendingCreate) -> Lending:
         """
         Borrow a book and create a lending record.
+
+        The book is claimed with a conditional UPDATE ... WHERE is_available
+        so of any number of concurrent borrows exactly one succeeds. On
+        PostgreSQL the claim and the lending insert are a single statement.
         """
-        # Check if book is available using select statement
-        book_stmt = select(Book).where(Book.id == obj_in.book_id)
-        book = db.execute(book_stmt).scalar_one_or_none()
-        
-        if not book or not book.is_available:
-            raise ValueError("Book is not available for borrowing")
-        
-        # Create lending record
-        borrow_date = date.today()
-        due_date = borrow_date + timedelta(days=obj_in.duration_days)
-        
-        db_obj = Lending(
-            user_id=obj_in.user_id,
-            book_id=obj_in.book_id,
-            borrow_date=borrow_date,
-            due_date=due_date,
-            return_date=None
-        )
-        
-        # Mark book as unavailable
-        book.is_available = False
-        
-        db.add(db_obj)
-        db.add(book)
+        claim, statement = _borrow_statements(obj_in, db.get_bind().dialect.name)
+        db_obj = None
+        if claim is None or db.execute(claim).scalar_one_or_none() is not None:
+            db_obj = db.execute(statement).scalar_one_or_none()
+
+        if db_obj is None:
+            db.rollback()
+            if db.execute(select(Book.id).where(Book.id == obj_in.book_id)).first() is None:
+                raise BookNotFoundError("Book not found")
+            raise BookUnavailableError("Book is not available for borrowing")
+
+        # The claim is a Core UPDATE, so the facet counts are moved here
+        db.execute(facets.availability_change(obj_in.book_id, -1))
+
+        # Record the event in the same transaction
+        outbox.add_event(db, "book_borrowed", _lending_payload(db_obj))
+        invalidate_book(db, obj_in.book_id)
+
         db.commit()
-        db.refresh(db_obj)
-        
+
         return db_obj
     
     def return_book(self, db: Session, *, lending_id: int) -> Optional[Lending]:
@@ -68,12 +120,84 @@ class LendingCRUD:
         if book:
             book.is_available = True  
             db.add(book)
+            invalidate_book(db, book.id)
         
         db.add(lending)
+
+        # Record the event in the same transaction to notify admin service
+        outbox.add_event(db, "book_returned", {
+            **_lending_payload(lending),
+            "book_id": lending.book_id,
+            "is_available": True
+        })
+
         db.commit()
         db.refresh(lending)
         
         return lending
 
 
-lending = LendingCRUD()
\ No newline at end of file
+class AsyncLendingCRUD:
+    """
+    Lending operations used by the async routes, on an AsyncSession.
+    """
+
+    async def get(self, db: AsyncSession, id: int) -> Optional[Lending]:
+        """
+        Get a lending record by ID using select statement.
+        """
+        statement = select(Lending).where(Lending.id == id)
+        return (await db.execute(statement)).scalar_one_or_none()
+
+    async def borrow_book(self, db: AsyncSession, *, obj_in: LendingCreate) -> Lending:
+        """
+        Borrow a book with the same conditional claim as LendingCRUD.borrow_book.
+        """
+        claim, statement = _borrow_statements(obj_in, db.get_bind().dialect.name)
+        db_obj = None
+        if claim is None or (await db.execute(claim)).scalar_one_or_none() is not None:
+            db_obj = (await db.execute(statement)).scalar_one_or_none()
+
+        if db_obj is None:
+            await db.rollback()
+            if (await db.execute(select(Book.id).where(Book.id == obj_in.book_id))).first() is None:
+                raise BookNotFoundError("Book not found")
+            raise BookUnavailableError("Book is not available for borrowing")
+
+        await db.execute(facets.availability_change(obj_in.book_id, -1))
+        outbox.add_event(db, "book_borrowed", _lending_payload(db_obj))
+        invalidate_book(db, obj_in.book_id)
+        await db.commit()
+        return db_obj
+
+    async def return_book(self, db: AsyncSession, *, lending_id: int) -> Lending:
+        """
+        Mark a lending as returned and update book availability.
+        """
+        lending = await self.get(db, lending_id)
+        if not lending:
+            raise ValueError("Lending record not found")
+        if lending.return_date is not None:
+            raise ValueError("Book already returned")
+
+        lending.return_date = date.today()
+        returned = await db.execute(
+            update(Book)
+            .where(Book.id == lending.book_id, Book.is_available == False)
+            .values(is_available=True, version=Book.version + 1)
+        )
+        if returned.rowcount:
+            await db.execute(facets.availability_change(lending.book_id, 1))
+        invalidate_book(db, lending.book_id)
+
+        outbox.add_event(db, "book_returned", {
+            **_lending_payload(lending),
+            "book_id": lending.book_id,
+            "is_available": True
+        })
+        await db.commit()
+        return lending
+
+
+lending = LendingCRUD()
+async_lending = AsyncLendingCRUD()
\ No newline at end of file
@@ -2,10 +2,19 @@ from datetime import date, datetime, timedelta
 from typing import List, Optional, Dict, Any
 
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from ..models import Lending, Book, User
 from ..schemas import UserCreate, UserUpdate
+from .. import outbox
+
+
+def _user_payload(user: User) -> Dict[str, Any]:
+    """
+    Column values of a user, used as the event payload.
+    """
+    return {column.name: getattr(user, column.name) for column in user.__table__.columns}
 
 
 # User operations
@@ -42,6 +51,11 @@ class UserCRUD:
             is_active=True
         )
         db.add(db_obj)
+
+        # Flush to assign the user id, then record the event in the same transaction
+        db.flush()
+        outbox.add_event(db, "user_created", _user_payload(db_obj))
+
         db.commit()
         db.refresh(db_obj)
         return db_obj
@@ -72,4 +86,41 @@ class UserCRUD:
         return obj
 
 
-user = UserCRUD()
\ No newline at end of file
+class AsyncUserCRUD:
+    """
+    User operations used by the async routes, on an AsyncSession.
+    """
+
+    async def get(self, db: AsyncSession, id: int) -> Optional[User]:
+        """
+        Get a user by ID using select statement.
+        """
+        statement = select(User).where(User.id == id)
+        return (await db.execute(statement)).scalar_one_or_none()
+
+    async def get_by_email(self, db: AsyncSession, email: str) -> Optional[User]:
+        """
+        Get a user by email using select statement.
+        """
+        statement = select(User).where(User.email == email)
+        return (await db.execute(statement)).scalar_one_or_none()
+
+    async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
+        """
+        Create a new user and record the user_created event in the outbox.
+        """
+        db_obj = User(
+            email=obj_in.email,
+            first_name=obj_in.first_name,
+            last_name=obj_in.last_name,
+            is_active=True
+        )
+        db.add(db_obj)
+        await db.flush()
+        outbox.add_event(db, "user_created", _user_payload(db_obj))
+        await db.commit()
+        return db_obj
+
+
+user = UserCRUD()
+async_user = AsyncUserCRUD()
\ No newline at end of file
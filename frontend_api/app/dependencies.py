@@ -1,14 +1,96 @@
-from typing import Generator
-from sqlalchemy import create_engine
+import time
+from typing import Any, AsyncGenerator, Dict, Generator, Optional
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from .config import settings
+from . import instrumentation, metrics
 
 Base = declarative_base()
 
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
+class _InstrumentedPool:
+    """Records checkout wait times and timeouts of a queue pool"""
+
+    engine_name: str
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.pool_timeouts_total.inc(engine=self.engine_name)
+            raise
+        finally:
+            metrics.pool_wait_seconds.observe(time.perf_counter() - start, engine=self.engine_name)
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    engine_name = "sync"
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    engine_name = "async"
+
+
+def engine_options(uri: str, poolclass) -> Dict[str, Any]:
+    """create_engine arguments for the DB_POOL_* settings"""
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING == "always"}
+    url = make_url(uri)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite lives in a single connection, keep its default pool
+        return options
+    options.update(
+        poolclass=poolclass,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE
+    )
+    return options
+
+
+def ping_when_idle(engine, engine_name: str, idle_seconds: float):
+    """
+    Check a connection's liveness on checkout only when it sat in the pool
+    for longer than `idle_seconds`. Connections in steady use skip the extra
+    round-trip that pool_pre_ping would cost on every request.
+    """
+    @event.listens_for(engine, "checkin")
+    def _record_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _ping_idle(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        metrics.pool_idle_pings_total.inc(engine=engine_name)
+        try:
+            cursor = dbapi_connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+        except Exception as e:
+            # The pool discards the connection and retries with a fresh one
+            raise exc.DisconnectionError(f"Idle connection failed liveness check: {str(e)}")
+
+
+def _instrument(engine, engine_name: str):
+    if settings.DB_POOL_PRE_PING == "idle":
+        ping_when_idle(engine, engine_name, settings.DB_POOL_PING_IDLE_SECONDS)
+    metrics.track_pool(engine_name, engine.pool)
+    instrumentation.instrument_engine(engine)
+
+
+engine = create_engine(
+    settings.SQLALCHEMY_DATABASE_URI,
+    **engine_options(settings.SQLALCHEMY_DATABASE_URI, InstrumentedQueuePool)
+)
+_instrument(engine, "sync")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db() -> Generator:
@@ -17,3 +99,32 @@ def get_db() -> Generator:
         yield db
     finally:
         db.close()
+
+
+# The async engine is only created when an async route first needs it,
+# so the asyncpg/aiosqlite drivers are not required otherwise
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            settings.SQLALCHEMY_ASYNC_DATABASE_URI,
+            **engine_options(settings.SQLALCHEMY_ASYNC_DATABASE_URI, InstrumentedAsyncQueuePool)
+        )
+        _instrument(_async_engine.sync_engine, "async")
+    return _async_engine
+
+def AsyncSessionLocal() -> AsyncSession:
+    global _async_session_factory
+    if _async_session_factory is None:
+        # Objects stay readable after commit without another round-trip
+        _async_session_factory = async_sessionmaker(
+            get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory()
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,37 @@
+import hashlib
+from typing import Iterable, Tuple
+
+from fastapi import Request, Response
+
+
+def book_etag(book_id: int, version: int) -> str:
+    """Strong ETag of one book, from its id and row version"""
+    return f'"{book_id}-{version}"'
+
+
+def page_etag(versions: Iterable[Tuple[int, int]]) -> str:
+    """
+    Strong ETag of a listing page, from the (id, version) pairs of its books
+    in page order. A book added to, dropped from or changed on the page
+    changes it; the rest of the catalog does not.
+    """
+    digest = hashlib.sha1()
+    for book_id, version in versions:
+        digest.update(f"{book_id}-{version};".encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match header names `etag`"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match compares weakly, so a W/ prefix still matches
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    """Bodyless 304 telling the client its copy is current"""
+    return Response(status_code=304, headers={"ETag": etag})
@@ -1,8 +1,14 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from .routers import api_router
-from .consumer import start_consumer
+from .routers import api_router, async_api_router
+from .consumer import create_async_consumer, start_consumer
+from .messaging import start_messaging, stop_messaging
+from .outbox import start_outbox_relay
+from .publisher import close_publisher
+from .cache import get_cache
+from .metrics import MetricsMiddleware, registry
 from .config import settings
 
 app = FastAPI(
@@ -21,15 +27,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route latency, in-flight requests and queries per request
+app.add_middleware(MetricsMiddleware)
+
 # Include API router
-app.include_router(api_router)
+app.include_router(async_api_router if settings.ASYNC_DB else api_router)
 
 @app.on_event("startup")
 async def startup_event():
     # Start the message consumer
-    start_consumer()
+    if settings.MESSAGING_BACKEND == "aio-pika":
+        await start_messaging(create_async_consumer())
+    else:
+        start_consumer()
+    # Start relaying committed outbox events to RabbitMQ
+    start_outbox_relay()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Let in-flight messages finish before disconnecting
+    await stop_messaging()
+    # Close pooled publisher connections
+    close_publisher()
 
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
 
+@app.get("/cache/stats")
+def cache_stats():
+    cache = get_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
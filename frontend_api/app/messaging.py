@@ -0,0 +1,234 @@
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+EXCHANGE_NAME = 'library_events'
+
+
+async def connect_rabbitmq():
+    """Open a self-healing aio-pika connection to RabbitMQ"""
+    import aio_pika
+
+    return await aio_pika.connect_robust(
+        host=settings.RABBITMQ_HOST,
+        port=settings.RABBITMQ_PORT,
+        login=settings.RABBITMQ_USER,
+        password=settings.RABBITMQ_PASSWORD,
+        virtualhost='/'
+    )
+
+
+def build_message(event_type: str, payload: Dict[str, Any]) -> str:
+    """
+    Serialize an event into the wire format shared by both services. The
+    pika publisher and AsyncMessaging both use it, so the bytes on the wire
+    do not depend on the messaging backend.
+    """
+    return json.dumps({
+        "event_type": event_type,
+        "payload": payload
+    })
+
+
+class AsyncMessaging:
+    """
+    asyncio-native consumer and publisher sharing one aio-pika connection.
+
+    Deliveries are handled concurrently up to the prefetch window: each one
+    runs the (blocking) `handle` callable on a worker thread and is acked or
+    requeued from the event loop. Messages with the same ordering key wait for
+    the previous one, so per-book ordering is preserved. Publishing uses a
+    separate channel in publisher-confirm mode.
+    """
+
+    def __init__(
+        self,
+        queue_name: str,
+        routing_keys: Iterable[str],
+        handle: Callable[[Dict[str, Any]], bool],
+        *,
+        ordering_key: Optional[Callable[[Dict[str, Any]], str]] = None,
+        prefetch_count: int = 50,
+        workers: int = 4,
+        connect: Optional[Callable] = None
+    ):
+        self.queue_name = queue_name
+        self.routing_keys = list(routing_keys)
+        self.handle = handle
+        self.ordering_key = ordering_key
+        self.prefetch_count = prefetch_count
+        self._connect = connect or connect_rabbitmq
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="messaging")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._connection = None
+        self._exchange = None
+        self._queue = None
+        self._consumer_tag = None
+        self._inflight: set = set()
+        self._lanes: Dict[str, asyncio.Task] = {}
+        self._starting: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Connect, declare the topology and start consuming"""
+        self._loop = asyncio.get_running_loop()
+        self._connection = await self._connect()
+
+        publish_channel = await self._connection.channel(publisher_confirms=True)
+        self._exchange = await publish_channel.declare_exchange(EXCHANGE_NAME, 'topic', durable=True)
+
+        consume_channel = await self._connection.channel()
+        await consume_channel.set_qos(prefetch_count=self.prefetch_count)
+        exchange = await consume_channel.declare_exchange(EXCHANGE_NAME, 'topic', durable=True)
+        self._queue = await consume_channel.declare_queue(self.queue_name, durable=True)
+        for routing_key in self.routing_keys:
+            await self._queue.bind(exchange, routing_key=routing_key)
+
+        self._consumer_tag = await self._queue.consume(self._on_message)
+        logger.info(f"Async consumer started on {self.queue_name}")
+
+    async def start_with_retry(self, retry_delay: float = 1.0, max_delay: float = 30.0):
+        """Start, retrying with exponential backoff until RabbitMQ is reachable"""
+        delay = retry_delay
+        while True:
+            try:
+                await self.start()
+                return
+            except Exception as e:
+                logger.warning(f"Failed to connect to RabbitMQ ({str(e)}). Retrying in {delay:g} seconds...")
+                await self._disconnect()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, max_delay)
+
+    def start_in_background(self, retry_delay: float = 1.0, max_delay: float = 30.0):
+        """
+        Connect in a background task, so the application comes up while
+        RabbitMQ is unreachable. Publishing fails until the connection is up.
+        """
+        self._starting = asyncio.ensure_future(self.start_with_retry(retry_delay, max_delay))
+
+    async def _disconnect(self):
+        self._exchange = None
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            try:
+                await connection.close()
+            except Exception:
+                pass
+
+    async def stop(self, timeout: Optional[float] = 10.0):
+        """Stop consuming, let in-flight messages finish, then disconnect"""
+        if self._starting is not None and not self._starting.done():
+            self._starting.cancel()
+            try:
+                await self._starting
+            except asyncio.CancelledError:
+                pass
+        if self._queue is not None and self._consumer_tag is not None:
+            await self._queue.cancel(self._consumer_tag)
+            self._consumer_tag = None
+
+        if self._inflight:
+            done, pending = await asyncio.wait(set(self._inflight), timeout=timeout)
+            if pending:
+                # Unacked deliveries go back to the queue when the connection closes
+                logger.warning(f"Stopping consumer with {len(pending)} messages still in progress")
+
+        await self._disconnect()
+        self._executor.shutdown(wait=False)
+        logger.info("Async consumer stopped")
+
+    async def _on_message(self, message):
+        try:
+            decoded = json.loads(message.body)
+        except ValueError as e:
+            # A malformed body would fail forever, drop it instead of requeueing
+            logger.error(f"Error processing message: {str(e)}")
+            await message.reject(requeue=False)
+            return
+
+        key = self.ordering_key(decoded) if self.ordering_key else None
+        previous = self._lanes.get(key) if key is not None else None
+        task = asyncio.ensure_future(self._process(message, decoded, previous))
+
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+        if key is not None:
+            self._lanes[key] = task
+            task.add_done_callback(lambda t: self._release_lane(key, t))
+
+    def _release_lane(self, key: str, task: asyncio.Task):
+        # Only the last message queued for a key clears its lane
+        if self._lanes.get(key) is task:
+            del self._lanes[key]
+
+    async def _process(self, message, decoded: Dict[str, Any], previous: Optional[asyncio.Task]):
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            success = await self._loop.run_in_executor(self._executor, self.handle, decoded)
+        except Exception as e:
+            logger.error(f"Error processing message: {str(e)}")
+            success = False
+
+        if success:
+            await message.ack()
+        else:
+            await message.nack(requeue=True)
+
+    async def publish_many(self, event_type: str, payloads: List[Dict[str, Any]]):
+        """Publish events and wait until the broker has confirmed all of them"""
+        import aio_pika
+
+        await asyncio.gather(*(
+            self._exchange.publish(
+                aio_pika.Message(
+                    body=build_message(event_type, payload).encode(),
+                    content_type='application/json',
+                    delivery_mode=aio_pika.DeliveryMode.PERSISTENT
+                ),
+                routing_key=event_type
+            )
+            for payload in payloads
+        ))
+        logger.info(f"Published {len(payloads)} {event_type} events")
+
+    async def publish(self, event_type: str, payload: Dict[str, Any]):
+        await self.publish_many(event_type, [payload])
+
+    def publish_threadsafe(self, event_type: str, payloads: List[Dict[str, Any]], timeout: float = 30.0):
+        """Publish from a worker thread through the event loop's connection"""
+        if self._loop is None or self._exchange is None:
+            raise RuntimeError("Messaging is not connected")
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            raise RuntimeError("publish_threadsafe called from the event loop, await publish() instead")
+        future = asyncio.run_coroutine_threadsafe(self.publish_many(event_type, payloads), self._loop)
+        future.result(timeout)
+
+
+_messaging: Optional[AsyncMessaging] = None
+
+def get_messaging() -> Optional[AsyncMessaging]:
+    """The running async messaging layer, or None with the pika backend"""
+    return _messaging
+
+async def start_messaging(messaging: AsyncMessaging, retry_delay: float = 1.0):
+    """Start messaging without waiting for RabbitMQ, see start_in_background"""
+    global _messaging
+    messaging.start_in_background(retry_delay)
+    _messaging = messaging
+
+async def stop_messaging(timeout: Optional[float] = 10.0):
+    global _messaging
+    if _messaging is not None:
+        messaging, _messaging = _messaging, None
+        await messaging.stop(timeout)
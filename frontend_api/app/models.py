@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, ForeignKey, Date, func
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Date, DateTime, Text
+from sqlalchemy import DDL, Index, event, text
+from sqlalchemy.orm import object_session, relationship
 from sqlalchemy.orm import declarative_base
 from datetime import datetime, timedelta
 
@@ -19,9 +20,39 @@ class Book(Base):
     publication_year = Column(Integer)
     description = Column(String)
     is_available = Column(Boolean, default=True)
+    # Bumped by every write to the row, the ETag of its representation
+    version = Column(Integer, nullable=False, default=1, server_default=text("1"))
     lendings = relationship("Lending", back_populates="book")
 
 
+@event.listens_for(Book, "before_update")
+def _bump_version(mapper, connection, target):
+    # ORM updates only; Core UPDATEs of books set version themselves
+    if object_session(target).is_modified(target, include_collections=False):
+        target.version = Book.version + 1
+
+
+# Full-text search over title, author and description. PostgreSQL keeps a
+# GIN index on this expression; searches must use the very same expression
+# (with literals, not bound parameters) for the planner to pick the index
+def book_search_vector():
+    document = None
+    for column in (Book.title, Book.author, Book.description):
+        part = func.coalesce(column, text("''"))
+        document = part if document is None else document.concat(text("' '")).concat(part)
+    return func.to_tsvector(text("'english'"), document)
+
+
+Index("ix_books_search", book_search_vector(), postgresql_using="gin").ddl_if(dialect="postgresql")
+
+# SQLite (local runs and tests) has no tsvector, an FTS5 table keyed by book
+# id takes its place. crud.books.reindex_search keeps it in step with books
+event.listen(Book.__table__, "after_create", DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS books_fts USING fts5(title, author, description, tokenize='porter unicode61')"
+).execute_if(dialect="sqlite"))
+event.listen(Book.__table__, "before_drop", DDL("DROP TABLE IF EXISTS books_fts").execute_if(dialect="sqlite"))
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -42,6 +73,49 @@ class Lending(Base):
     borrow_date = Column(Date, default=func.current_date())
     due_date = Column(Date)
     return_date = Column(Date, nullable=True)
+
+    __table_args__ = (
+        # Relationship loads and deletes look lendings up by book and user
+        Index("ix_lendings_book_id_return_date", "book_id", "return_date"),
+        Index("ix_lendings_user_id_id", "user_id", "id"),
+    )
     
     user = relationship("User", back_populates="lendings")
-    book = relationship("Book", back_populates="lendings")
\ No newline at end of file
+    book = relationship("Book", back_populates="lendings")
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=func.now())
+    attempts = Column(Integer, default=0)
+
+
+class OutboxDeadLetter(Base):
+    """An outbox event the relay gave up on after too many failed attempts"""
+    __tablename__ = "outbox_dead_letters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime)
+    attempts = Column(Integer, nullable=False)
+    last_error = Column(Text)
+    dead_lettered_at = Column(DateTime, default=func.now())
+
+
+class BookFacet(Base):
+    """
+    Number of books, and of available books, per category and per
+    publisher, kept current by crud.facets so navigation menus never scan
+    the books table.
+    """
+    __tablename__ = "book_facets"
+
+    facet = Column(String, primary_key=True)
+    value = Column(String, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    available = Column(Integer, nullable=False, default=0)
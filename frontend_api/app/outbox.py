@@ -0,0 +1,155 @@
+import json
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from .dependencies import SessionLocal
+from .config import settings
+from .models import OutboxDeadLetter, OutboxEvent
+from . import publisher
+
+logger = logging.getLogger(__name__)
+
+# Set whenever a transaction containing outbox events commits
+_wakeup = threading.Event()
+
+# PostgreSQL advisory lock held by the relay that is draining the outbox
+RELAY_LOCK_KEY = 0x6F7574626F78
+
+
+def _json_default(value: Any):
+    """Serialize dates the same way the routes used to before publishing"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def add_event(db: Session, event_type: str, payload: Dict[str, Any]) -> OutboxEvent:
+    """
+    Record an event in the outbox as part of the caller's transaction.
+    It is published by the relay only once that transaction commits.
+    """
+    db_obj = OutboxEvent(
+        event_type=event_type,
+        payload=json.dumps(payload, default=_json_default),
+        attempts=0
+    )
+    db.add(db_obj)
+    db.info['outbox_pending'] = True
+    return db_obj
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_relay(session: Session):
+    """Wake the relay as soon as new outbox events are committed"""
+    if session.info.pop('outbox_pending', False):
+        _wakeup.set()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session: Session):
+    session.info.pop('outbox_pending', None)
+
+
+def _lock_relay(db: Session) -> bool:
+    """
+    Take the relay lock for the current transaction, so only one relay
+    drains the outbox at a time and events leave it in order. SQLite
+    serializes writers itself and has no advisory locks.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return True
+    return bool(db.execute(select(func.pg_try_advisory_xact_lock(RELAY_LOCK_KEY))).scalar())
+
+
+def _dead_letter(db: Session, outbox_event: OutboxEvent, error: Exception):
+    """Move an event that keeps failing out of the outbox"""
+    db.add(OutboxDeadLetter(
+        event_type=outbox_event.event_type,
+        payload=outbox_event.payload,
+        created_at=outbox_event.created_at,
+        attempts=outbox_event.attempts,
+        last_error=repr(error)
+    ))
+    db.delete(outbox_event)
+
+
+def relay_batch(db: Session, batch_size: int = 500) -> int:
+    """
+    Publish up to `batch_size` outbox events in insertion order and delete
+    the published rows. Stops at the first failure so ordering is preserved.
+    An event the broker rejects is retried on the next run, or dead-lettered
+    once it has been rejected OUTBOX_MAX_ATTEMPTS times. When the broker
+    cannot be reached the remaining rows are left as they are and the error
+    is raised. Returns the number published, 0 when another relay holds the
+    lock.
+    """
+    if not _lock_relay(db):
+        db.rollback()
+        return 0
+
+    statement = (
+        select(OutboxEvent)
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+        .with_for_update()
+    )
+    pending = list(db.execute(statement).scalars().all())
+    if not pending:
+        db.commit()
+        return 0
+
+    batch = [(outbox_event.event_type, json.loads(outbox_event.payload)) for outbox_event in pending]
+    rejected = None
+    try:
+        publisher.publish_batch(batch)
+    except publisher.MessageRejectedError as e:
+        rejected = e
+    finally:
+        published = len(pending) - len(batch)
+        for outbox_event in pending[:published]:
+            db.delete(outbox_event)
+        if rejected is not None:
+            failed = pending[published]
+            failed.attempts = (failed.attempts or 0) + 1
+            logger.error(f"Outbox relay failed on event {failed.id} (attempt {failed.attempts}): {str(rejected)}")
+            if failed.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                logger.error(f"Dead-lettering outbox event {failed.id} after {failed.attempts} attempts")
+                _dead_letter(db, failed, rejected)
+        db.commit()
+
+    return published
+
+
+def start_outbox_relay():
+    """Start the outbox relay in a background thread"""
+    def relay():
+        backoff = settings.OUTBOX_POLL_INTERVAL
+        while True:
+            _wakeup.clear()
+            db = SessionLocal()
+            try:
+                # Drain the outbox completely before going back to sleep
+                while relay_batch(db, batch_size=settings.OUTBOX_BATCH_SIZE) == settings.OUTBOX_BATCH_SIZE:
+                    pass
+                backoff = settings.OUTBOX_POLL_INTERVAL
+            except Exception as e:
+                # Most likely the broker is down; new commits must not wake
+                # the relay early, so wait out the backoff before retrying
+                logger.error(f"Outbox relay cannot publish, retrying in {backoff:.0f}s: {str(e)}")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, settings.OUTBOX_MAX_BACKOFF)
+                continue
+            finally:
+                db.close()
+
+            _wakeup.wait(settings.OUTBOX_POLL_INTERVAL)
+
+    relay_thread = threading.Thread(target=relay, daemon=True)
+    relay_thread.start()
+    logger.info("Outbox relay thread started")
@@ -0,0 +1,63 @@
+import base64
+import json
+from typing import Any, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# Shape of the sort key each order puts in its cursors
+KEY_TYPES = {
+    "id": (_is_int,),
+    "title": (lambda value: isinstance(value, str), _is_int),
+    "rank": (_is_number, _is_int),
+}
+
+
+def encode_cursor(sort: str, key: Sequence[Any]) -> str:
+    """
+    Build an opaque continuation token from the sort key of the last row
+    of a page.
+    """
+    raw = json.dumps({"s": sort, "k": list(key)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, sort: str) -> Tuple:
+    """
+    Decode a continuation token. Raises ValueError if the token is malformed,
+    was issued for a different sort order or its key does not have the shape
+    that order uses.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = tuple(data["k"])
+        token_sort = data["s"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+    if token_sort != sort:
+        raise ValueError(f"Cursor was issued for sort={token_sort}, not sort={sort}")
+    checks = KEY_TYPES.get(sort)
+    if checks is not None and (len(key) != len(checks) or not all(check(value) for check, value in zip(checks, key))):
+        raise ValueError(f"Invalid cursor key for sort={sort}")
+    return key
+
+
+def set_next_cursor(request: Request, response: Response, token: Optional[str]):
+    """
+    Expose the next page's cursor in an X-Next-Cursor header and an RFC 8288
+    Link header, leaving the JSON body unchanged for existing clients.
+    """
+    if token is None:
+        return
+    next_url = request.url.remove_query_params("skip").include_query_params(cursor=token)
+    response.headers["X-Next-Cursor"] = token
+    response.headers["Link"] = f'<{next_url}>; rel="next"'
@@ -1,10 +1,17 @@
-import json
+import itertools
+import queue
+import threading
 import pika
 import logging
+from typing import List, Optional, Set, Tuple
+
 from .config import settings
+from . import messaging
 
 logger = logging.getLogger(__name__)
 
+EXCHANGE_NAME = 'library_events'
+
 def get_connection():
     """Establish a connection to RabbitMQ"""
     credentials = pika.PlainCredentials(
@@ -19,39 +26,288 @@ def get_connection():
     )
     return pika.BlockingConnection(parameters)
 
-def publish_event(event_type: str, payload: dict):
-    """Publish an event to RabbitMQ"""
-    try:
+
+_PROPERTIES = pika.BasicProperties(
+    delivery_mode=2,  # make message persistent
+    content_type='application/json'
+)
+
+# Per-message refusals in publisher-confirm mode; the channel stays usable
+REJECTED = (pika.exceptions.NackError, pika.exceptions.UnroutableError)
+
+
+class MessageRejectedError(RuntimeError):
+    """An event that cannot be published: refused by the broker or not serializable"""
+
+
+class ChannelPool:
+    """
+    Pool of long-lived RabbitMQ channels shared by all request workers.
+
+    pika's BlockingConnection is not thread-safe, so every pooled channel owns
+    its own connection and is handed to one thread at a time. The exchange is
+    declared once when a connection is opened instead of on every publish.
+    Channels are in publisher-confirm mode, so a publish only returns once
+    the broker has taken the message. A message the broker rejects is
+    reported to the caller as is; only a lost channel is reopened.
+    """
+
+    def __init__(self, size: int = 4, acquire_timeout: Optional[float] = 5.0):
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self._idle: "queue.LifoQueue[Tuple]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._open_items: Set[Tuple] = set()
+        # Checked out when close() ran, closed by the thread returning them
+        self._retired: Set[Tuple] = set()
+
+    def _open(self):
+        """Open a new connection/channel pair and declare the exchange"""
         connection = get_connection()
         channel = connection.channel()
-        
-        # Ensure the exchange exists
         channel.exchange_declare(
-            exchange='library_events',
+            exchange=EXCHANGE_NAME,
             exchange_type='topic',
             durable=True
         )
-        
-        # Prepare the message
-        message = {
-            "event_type": event_type,
-            "payload": payload
-        }
-        
-        # Publish the message
-        channel.basic_publish(
-            exchange='library_events',
+        # Every basic_publish now returns only once the broker confirmed it
+        channel.confirm_delivery()
+        item = (connection, channel)
+        with self._lock:
+            self._open_items.add(item)
+        return item
+
+    def _is_usable(self, item) -> bool:
+        """Service heartbeats on an idle connection and report if it is still open"""
+        connection, channel = item
+        try:
+            connection.process_data_events(time_limit=0)
+            return bool(connection.is_open and channel.is_open)
+        except pika.exceptions.AMQPError:
+            return False
+
+    def acquire(self):
+        """Take an idle channel from the pool, opening a new one if below capacity"""
+        while True:
+            try:
+                item = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if self._is_usable(item):
+                return item
+            self.discard(item)
+
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+
+        if can_open:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        # Pool is at capacity, wait for another worker to release a channel
+        try:
+            item = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise TimeoutError("Timed out waiting for a publisher channel")
+        if self._is_usable(item):
+            return item
+        self.discard(item)
+        return self.acquire()
+
+    def release(self, item):
+        """Return a healthy channel to the pool"""
+        with self._lock:
+            retired = item in self._retired
+            self._retired.discard(item)
+        if retired:
+            # close() ran while it was checked out
+            self.discard(item)
+            return
+        self._idle.put(item)
+
+    def discard(self, item):
+        """Close a broken channel and free its slot so it can be reopened"""
+        with self._lock:
+            if item not in self._open_items:
+                return
+            self._open_items.discard(item)
+            self._opened -= 1
+        connection, _ = item
+        try:
+            if connection.is_open:
+                connection.close()
+        except Exception:
+            pass
+
+    def publish(self, routing_key: str, body: str, properties: pika.BasicProperties):
+        """Publish on a pooled channel, reconnecting once if the channel was lost"""
+        for attempt in range(2):
+            item = self.acquire()
+            _, channel = item
+            lost = False
+            try:
+                channel.basic_publish(
+                    exchange=EXCHANGE_NAME,
+                    routing_key=routing_key,
+                    body=body,
+                    properties=properties
+                )
+                return
+            except REJECTED:
+                # The broker refused this message, the channel is fine
+                raise
+            except pika.exceptions.AMQPError as e:
+                lost = True
+                if attempt:
+                    raise
+                logger.warning(f"Publisher channel lost ({e!r}), reconnecting")
+            finally:
+                # Any other error leaves the channel usable, so it goes back
+                if lost:
+                    self.discard(item)
+                else:
+                    self.release(item)
+
+    def publish_batch(self, batch: List[Tuple[str, str]], properties: pika.BasicProperties):
+        """
+        Publish (routing_key, body) pairs in order on one pooled channel,
+        removing them from the head of `batch` as they are confirmed. On
+        failure the unconfirmed messages stay in `batch` and the error is raised.
+        """
+        item = self.acquire()
+        _, channel = item
+        confirmed = 0
+        lost = False
+        try:
+            for routing_key, body in batch:
+                channel.basic_publish(
+                    exchange=EXCHANGE_NAME,
+                    routing_key=routing_key,
+                    body=body,
+                    properties=properties
+                )
+                confirmed += 1
+        except REJECTED:
+            raise
+        except pika.exceptions.AMQPError:
+            lost = True
+            raise
+        finally:
+            del batch[:confirmed]
+            if lost:
+                self.discard(item)
+            else:
+                self.release(item)
+
+    def close(self):
+        """
+        Close the idle connections. Connections checked out by other threads
+        are closed when they are released, since a BlockingConnection must
+        not be used from two threads at once.
+        """
+        while True:
+            try:
+                item = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(item)
+        with self._lock:
+            self._retired.update(self._open_items)
+
+
+_pool: Optional[ChannelPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ChannelPool:
+    """Return the process-wide channel pool, creating it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ChannelPool(
+                    size=settings.PUBLISHER_POOL_SIZE,
+                    acquire_timeout=settings.PUBLISHER_ACQUIRE_TIMEOUT
+                )
+    return _pool
+
+def close_publisher():
+    """Close pooled publisher connections (called on application shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+def publish_event(event_type: str, payload: dict):
+    """Publish an event to RabbitMQ"""
+    # With the aio-pika backend, publish over the event loop's connection
+    async_messaging = messaging.get_messaging()
+    if async_messaging is not None:
+        async_messaging.publish_threadsafe(event_type, [payload])
+        return
+
+    try:
+        # Publish the message on a pooled, long-lived channel
+        get_pool().publish(
             routing_key=event_type,
-            body=json.dumps(message),
-            properties=pika.BasicProperties(
-                delivery_mode=2,  # make message persistent
-                content_type='application/json'
-            )
+            body=messaging.build_message(event_type, payload),
+            properties=_PROPERTIES
         )
-        
+
         logger.info(f"Published {event_type} event: {payload}")
-        connection.close()
     except Exception as e:
         logger.error(f"Error publishing event: {str(e)}")
         raise
 
+
+
+def publish_batch(batch: List[Tuple[str, dict]]):
+    """
+    Publish (event_type, payload) pairs in order, removing them from the
+    head of `batch` once the broker has confirmed them. On failure the
+    unpublished events stay in `batch` and the error is raised: a
+    MessageRejectedError when the head event itself cannot be published,
+    anything else when the broker could not be reached.
+    """
+    async_messaging = messaging.get_messaging()
+    if async_messaging is not None:
+        import aio_pika
+
+        # Consecutive events of one type go out together, in order
+        while batch:
+            event_type = batch[0][0]
+            run = list(itertools.takewhile(lambda event: event[0] == event_type, batch))
+            try:
+                async_messaging.publish_threadsafe(event_type, [payload for _, payload in run])
+            except (aio_pika.exceptions.DeliveryError, TypeError, ValueError) as e:
+                raise MessageRejectedError(f"{event_type} event rejected: {e!r}") from e
+            del batch[:len(run)]
+        return
+
+    messages = []
+    unserializable = None
+    for event_type, payload in batch:
+        try:
+            messages.append((event_type, messaging.build_message(event_type, payload)))
+        except (TypeError, ValueError) as e:
+            # Publish the events ahead of it, then report this one
+            unserializable = e
+            break
+    ready = len(messages)
+    try:
+        get_pool().publish_batch(messages, _PROPERTIES)
+        logger.info(f"Published batch of {ready} events")
+    except REJECTED as e:
+        # The confirmed messages left `messages`, the refused one is its head
+        raise MessageRejectedError(f"{messages[0][0]} event rejected: {e!r}") from e
+    finally:
+        del batch[:ready - len(messages)]
+    if unserializable is not None:
+        raise MessageRejectedError(f"{batch[0][0]} event is not serializable: {unserializable!r}") from unserializable
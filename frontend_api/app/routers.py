@@ -1,8 +1,16 @@
 from fastapi import APIRouter
 from .api import books, lending, users
+from .api import async_books, async_lending, async_users
 
 api_router = APIRouter()
 
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(books.router, prefix="/books", tags=["books"])
-api_router.include_router(lending.router, prefix="/lending", tags=["lending"])
\ No newline at end of file
+api_router.include_router(lending.router, prefix="/lending", tags=["lending"])
+
+# Same routes served by async handlers, used when settings.ASYNC_DB is set
+async_api_router = APIRouter()
+
+async_api_router.include_router(async_users.router, prefix="/users", tags=["users"])
+async_api_router.include_router(async_books.router, prefix="/books", tags=["books"])
+async_api_router.include_router(async_lending.router, prefix="/lending", tags=["lending"])
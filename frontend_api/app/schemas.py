@@ -1,6 +1,8 @@
 from typing import Optional, List
 from datetime import date
-from pydantic import BaseModel, Field, EmailStr
+from pydantic import BaseModel, ConfigDict, Field, EmailStr, field_validator
+
+from .config import settings
 
 class BookBase(BaseModel):
     title: str
@@ -18,8 +20,45 @@ class Book(BookBase):
     id: int
     is_available: bool
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class FacetCount(BaseModel):
+    value: str
+    total: int
+    available: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BookFacets(BaseModel):
+    categories: List[FacetCount]
+    publishers: List[FacetCount]
+
+
+class BookBatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=settings.BOOK_BATCH_MAX_IDS)
+
+    @field_validator("ids", mode="before")
+    @classmethod
+    def split_ids(cls, value):
+        # The query string form takes ?ids=1,2,3 as well as repeated ids
+        if isinstance(value, str):
+            value = [value]
+        if isinstance(value, list):
+            ids = []
+            for item in value:
+                if isinstance(item, str):
+                    ids.extend(part.strip() for part in item.split(",") if part.strip())
+                else:
+                    ids.append(item)
+            return ids
+        return value
+
+
+class BookBatch(BaseModel):
+    books: List[Book]
+    missing: List[int]
 
 
 class UserBase(BaseModel):
@@ -34,8 +73,7 @@ class User(UserBase):
     id: int
     is_active: bool
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class LendingBase(BaseModel):
     book_id: int
@@ -52,8 +90,7 @@ class Lending(BaseModel):
     due_date: date
     return_date: Optional[date] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class BookUpdate(BaseModel):
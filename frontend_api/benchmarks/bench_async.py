@@ -0,0 +1,80 @@
+"""
+Requests/sec for the sync and async route stacks at high concurrency,
+served in-process over ASGI with the book cache disabled.
+
+    python -m benchmarks.bench_async [requests] [concurrency] [sync|async]
+
+Past about 40 concurrent requests (the threadpool size) the sync stack can
+stall: every worker thread waits for a pooled connection while the sessions
+holding them wait for a thread to run their cleanup, until the pool times out.
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+os.environ["CACHE_ENABLED"] = "false"
+
+import httpx
+from fastapi import FastAPI
+
+from app.dependencies import SessionLocal, engine, get_async_engine
+from app.models import Base, Book
+from app.routers import api_router, async_api_router
+
+BOOKS = 1000
+
+
+def seed():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(
+        Book(title=f"Book {i}", author="Author", isbn=f"ASYNC{i:06d}", publisher="Publisher",
+             category=f"Category {i % 10}", publication_year=2000, is_available=True)
+        for i in range(BOOKS)
+    )
+    db.commit()
+    db.close()
+
+
+async def run(label: str, router, requests: int, concurrency: int):
+    app = FastAPI()
+    app.include_router(router)
+    # Report failures such as connection pool timeouts instead of aborting
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    paths = [
+        f"/books/{random.randint(1, BOOKS)}" if i % 2 else f"/books/?category=Category%20{i % 10}&limit=20"
+        for i in range(requests)
+    ]
+    queue = iter(paths)
+    errors = 0
+
+    async def worker(client):
+        nonlocal errors
+        for path in queue:
+            response = await client.get(path)
+            errors += response.status_code != 200
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    print(f"{label:<6} {requests / elapsed:>8.0f} req/s  errors {errors:>5}  ({requests} requests, concurrency {concurrency})")
+
+
+async def main(requests: int, concurrency: int, stacks):
+    if "sync" in stacks:
+        await run("sync", api_router, requests, concurrency)
+    if "async" in stacks:
+        await run("async", async_api_router, requests, concurrency)
+    await get_async_engine().dispose()
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    stacks = sys.argv[3:] or ["sync", "async"]
+    seed()
+    asyncio.run(main(requests, concurrency, stacks))
@@ -0,0 +1,79 @@
+"""
+Borrow throughput and correctness under contention: the old read-then-write
+borrow versus the conditional claim. Every thread tries to borrow every book.
+
+    python -m benchmarks.bench_borrow [books] [threads]
+"""
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+
+from app.crud.lending import BookUnavailableError, lending
+from app.dependencies import SessionLocal, engine
+from app.models import Base, Book, Lending, User
+from app.schemas import LendingCreate
+
+
+def seed(total: int) -> int:
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(
+        Book(title=f"Book {i}", author="Author", isbn=f"BORROW{i:06d}", publisher="Publisher",
+             category="Category", publication_year=2000, is_available=True)
+        for i in range(total)
+    )
+    user = User(email="bench@example.com", first_name="Bench", last_name="User", is_active=True)
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    db.close()
+    return user_id
+
+
+def borrow_read_then_write(db, obj_in: LendingCreate):
+    """The original borrow path: SELECT, check in Python, then write"""
+    book = db.execute(select(Book).where(Book.id == obj_in.book_id)).scalar_one_or_none()
+    if not book or not book.is_available:
+        raise BookUnavailableError("Book is not available for borrowing")
+    today = date.today()
+    db.add(Lending(user_id=obj_in.user_id, book_id=obj_in.book_id, borrow_date=today,
+                   due_date=today + timedelta(days=obj_in.duration_days)))
+    book.is_available = False
+    db.commit()
+
+
+def run(label: str, borrow, total: int, threads: int):
+    user_id = seed(total)
+    start_line = threading.Barrier(threads)
+
+    def worker(_):
+        db = SessionLocal()
+        start_line.wait()
+        for book_id in range(1, total + 1):
+            try:
+                borrow(db, LendingCreate(user_id=user_id, book_id=book_id, duration_days=14))
+            except BookUnavailableError:
+                db.rollback()
+        db.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - start
+
+    db = SessionLocal()
+    lendings = db.execute(select(func.count(Lending.id))).scalar_one()
+    db.close()
+    print(f"{label:<18} {total / elapsed:>8.0f} borrows/s   lendings {lendings:>6} for {total} books")
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    run("read then write", borrow_read_then_write, total, threads)
+    run("conditional claim", lambda db, obj_in: lending.borrow_book(db, obj_in=obj_in), total, threads)
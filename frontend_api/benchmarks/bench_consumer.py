@@ -0,0 +1,85 @@
+"""
+Consumer throughput: one message at a time, the prefetch window with ordered
+worker lanes, and micro-batched commits.
+
+    python -m benchmarks.bench_consumer [messages] [db_latency_ms]
+
+The lane runs replace handlers with a stand-in that sleeps for one database
+round-trip. The batching runs apply real book_updated events against the
+SQLite benchmark database, where the cost is dominated by commits.
+"""
+import json
+import sys
+import time
+from unittest.mock import MagicMock, patch
+
+from .broker import InMemoryQueue
+from app import consumer
+from app.dependencies import SessionLocal, engine
+from app.models import Base, Book
+
+
+def make_bodies(messages: int, books: int = 200):
+    return [
+        json.dumps({"event_type": "book_updated", "payload": {"id": i % books + 1, "title": f"Title {i}"}})
+        for i in range(messages)
+    ]
+
+
+def run_batched(label: str, bodies, batch_size: int):
+    broker = InMemoryQueue(bodies, prefetch_count=max(64, 2 * batch_size))
+    start = time.perf_counter()
+    if batch_size == 1:
+        db = SessionLocal()
+        broker.consume(lambda ch, method, properties, body: consumer.callback(ch, method, properties, body, db))
+        db.close()
+    else:
+        dispatcher = consumer.BatchingDispatcher(batch_size, max_wait=0.05)
+        dispatcher.attach(broker)
+        broker.consume(dispatcher.on_message)
+        dispatcher._worker.shutdown()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {len(bodies) / elapsed:>8.0f} msg/s  ({broker.acked} acks)")
+
+
+def seed_books(books: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        connection.execute(Book.__table__.insert(), [
+            {"id": i, "title": f"Title {i}", "author": "Author", "isbn": f"BENCH{i}",
+             "publisher": "Publisher", "category": "Category", "publication_year": 2000,
+             "is_available": True}
+            for i in range(1, books + 1)
+        ])
+
+
+def run(label: str, bodies, prefetch: int, workers: int):
+    broker = InMemoryQueue(bodies, prefetch_count=prefetch)
+    start = time.perf_counter()
+    if workers == 0:
+        # Original behaviour: handle and ack on the connection thread
+        broker.consume(lambda ch, method, properties, body: consumer.callback(ch, method, properties, body, MagicMock()))
+    else:
+        pool = consumer.OrderedWorkerPool(workers, session_factory=MagicMock)
+        dispatcher = consumer.ConcurrentDispatcher(broker, pool)
+        broker.consume(dispatcher.on_message)
+        pool.shutdown()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {len(bodies) / elapsed:>8.0f} msg/s  ({broker.acked} acked)")
+
+
+if __name__ == "__main__":
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 2.0) / 1000
+    bodies = make_bodies(messages)
+
+    consumer.logger.disabled = True
+    with patch.dict(consumer.EVENT_HANDLERS, {'book_updated': lambda data, db: time.sleep(latency)}):
+        run("prefetch=1, sequential", bodies, prefetch=1, workers=0)
+        for workers in (4, 8, 16):
+            run(f"prefetch=64, {workers} lanes", bodies, prefetch=64, workers=workers)
+
+    seed_books(200)
+    for batch_size in (1, 10, 100):
+        run_batched(f"batch size {batch_size} (SQLite)", bodies, batch_size)
@@ -0,0 +1,92 @@
+"""
+Per-request cost of the metrics middleware and query listeners: the same
+routes served with and without them, in-process over ASGI with the book
+cache disabled.
+
+    python -m benchmarks.bench_metrics [requests]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+os.environ["CACHE_ENABLED"] = "false"
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import event
+
+from app import instrumentation, metrics
+from app.dependencies import SessionLocal, engine
+from app.models import Base, Book
+from app.routers import api_router
+
+BOOKS = 1000
+
+
+def seed():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add_all(
+        Book(title=f"Book {i}", author="Author", isbn=f"METRICS{i:06d}", publisher="Publisher",
+             category=f"Category {i % 10}", publication_year=2000, is_available=True)
+        for i in range(BOOKS)
+    )
+    db.commit()
+    db.close()
+
+
+def build_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    app.include_router(api_router)
+
+    @app.get("/health")
+    def health_check():
+        return {"status": "healthy"}
+
+    if instrumented:
+        app.add_middleware(metrics.MetricsMiddleware)
+        instrumentation.instrument_engine(engine)
+    elif event.contains(engine, "before_cursor_execute", instrumentation._before_cursor_execute):
+        event.remove(engine, "before_cursor_execute", instrumentation._before_cursor_execute)
+        event.remove(engine, "after_cursor_execute", instrumentation._after_cursor_execute)
+    return app
+
+
+async def run(path_for, instrumented: bool, requests: int) -> float:
+    transport = httpx.ASGITransport(app=build_app(instrumented))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up the route and the connection pool
+        for i in range(50):
+            await client.get(path_for(i))
+        start = time.perf_counter()
+        for i in range(requests):
+            response = await client.get(path_for(i))
+            assert response.status_code == 200
+        elapsed = time.perf_counter() - start
+    return elapsed / requests * 1e6
+
+
+async def main(requests: int):
+    routes = [
+        ("/health", lambda i: "/health"),
+        ("/books/{book_id}", lambda i: f"/books/{random.randint(1, BOOKS)}"),
+        ("/books/?limit=20", lambda i: f"/books/?category=Category%20{i % 10}&limit=20"),
+    ]
+    for label, path_for in routes:
+        # Alternate so drift in the machine's speed hits both sides
+        plain, instrumented = [], []
+        for _ in range(3):
+            plain.append(await run(path_for, False, requests))
+            instrumented.append(await run(path_for, True, requests))
+        base, with_metrics = min(plain), min(instrumented)
+        print(f"{label:<20} plain {base:>7.1f} us/req  instrumented {with_metrics:>7.1f} us/req  "
+              f"overhead {with_metrics - base:>6.1f} us ({(with_metrics - base) / base:>5.1%})")
+
+
+if __name__ == "__main__":
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    seed()
+    asyncio.run(main(requests))
@@ -0,0 +1,58 @@
+"""
+GET /books/ page latency: OFFSET versus keyset cursors, first page versus
+page 10,000.
+
+    python -m benchmarks.bench_pagination [books] [page_size]
+"""
+import sys
+import time
+
+from app.crud import books
+from app.dependencies import SessionLocal, engine
+from app.models import Base, Book
+
+
+def seed(total: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rows = [
+        {"title": f"Title {i * 7919 % total:08d}", "author": "Author", "isbn": f"PAGE{i:08d}",
+         "publisher": "Publisher", "category": "Category", "publication_year": 2000, "is_available": True}
+        for i in range(total)
+    ]
+    with engine.begin() as connection:
+        for start in range(0, total, 50000):
+            connection.execute(Book.__table__.insert(), rows[start:start + 50000])
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    seed(total)
+
+    db = SessionLocal()
+    for sort in ("id", "title"):
+        for page in (1, 10_000):
+            skip = (page - 1) * page_size
+            if skip >= total:
+                continue
+            offset_ms = timed(lambda: books.book.get_all(db, skip=skip, limit=page_size, sort=sort))
+
+            # The cursor a client would hold after reading the previous page
+            after = None
+            if skip:
+                previous = books.book.get_all(db, skip=skip - 1, limit=1, sort=sort)[0]
+                after = books.book.sort_key(previous, sort)
+            keyset_ms = timed(lambda: books.book.get_all(db, limit=page_size, sort=sort, after=after))
+
+            print(f"sort={sort:<6} page {page:>6}:  offset {offset_ms:8.2f} ms   keyset {keyset_ms:6.2f} ms")
+    db.close()
@@ -0,0 +1,63 @@
+"""
+Publish latency and throughput: connection-per-event versus the pooled channels.
+
+    python -m benchmarks.bench_publisher [events] [threads]
+"""
+import json
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pika
+
+from . import broker as fake
+from app import publisher
+
+
+def publish_with_new_connection(event_type: str, payload: dict):
+    """The original publish path: handshake, declare, publish, close"""
+    connection = publisher.get_connection()
+    channel = connection.channel()
+    channel.exchange_declare(exchange='library_events', exchange_type='topic', durable=True)
+    channel.basic_publish(
+        exchange='library_events',
+        routing_key=event_type,
+        body=json.dumps({"event_type": event_type, "payload": payload}),
+        properties=pika.BasicProperties(delivery_mode=2, content_type='application/json')
+    )
+    connection.close()
+
+
+def run(label: str, publish, events: int, threads: int):
+    broker = fake.FakeBroker()
+    latencies = []
+
+    def one(i):
+        start = time.perf_counter()
+        publish("book_borrowed", {"id": i, "book_id": i, "user_id": 1})
+        latencies.append(time.perf_counter() - start)
+
+    with patch('app.publisher.get_connection', broker.connect):
+        publisher.close_publisher()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(one, range(events)))
+        elapsed = time.perf_counter() - start
+        publisher.close_publisher()
+
+    latencies.sort()
+    print(
+        f"{label:<22} {events / elapsed:>10.0f} msg/s  "
+        f"p50 {statistics.median(latencies) * 1000:6.2f} ms  "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:6.2f} ms  "
+        f"connections {broker.connections}"
+    )
+
+
+if __name__ == "__main__":
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    run("connection per event", publish_with_new_connection, events, threads)
+    run("pooled channels", publisher.publish_event, events, threads)
@@ -0,0 +1,105 @@
+"""
+GET /books/search latency on a large catalog: the SQLite FTS5 backend
+against a LIKE scan over title, author and description, for a common
+word, a rare word, two words and the 10th page of a common word.
+
+    python -m benchmarks.bench_search [books]
+"""
+import itertools
+import random
+import sys
+import time
+
+from sqlalchemy import or_, select
+
+from app.crud import books
+from app.dependencies import SessionLocal, engine
+from app.models import Base, Book
+
+SYLLABLES = ["ka", "lo", "mi", "ren", "sa", "tor", "vel", "un", "dra", "fen", "gal", "hy", "is", "jor", "que", "bel"]
+
+
+def vocabulary(size: int, rng: random.Random):
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def seed(total: int):
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(0)
+    words = vocabulary(20_000, rng)
+    # Skewed word frequencies, as in real titles: a few words are everywhere
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+
+    def text(length: int) -> str:
+        return " ".join(rng.choices(words, cum_weights=cum_weights, k=length))
+
+    with engine.begin() as connection:
+        for start in range(0, total, 50_000):
+            connection.execute(Book.__table__.insert(), [
+                {"title": text(3).title(), "author": text(2).title(), "isbn": f"FTS{i:08d}",
+                 "publisher": "Publisher", "category": "Category", "publication_year": 2000,
+                 "description": text(12), "is_available": True}
+                for i in range(start, min(start + 50_000, total))
+            ])
+        # The consumer indexes books as they arrive, a single INSERT ... SELECT
+        # does the same for the whole catalog at once
+        connection.execute(books.books_fts.insert().from_select(
+            ["rowid", "title", "author", "description"],
+            select(Book.id, Book.title, Book.author, Book.description)
+        ))
+    return words
+
+
+def like_search(db, q: str, limit: int = 20):
+    statement = select(Book)
+    for word in q.split():
+        pattern = f"%{word}%"
+        statement = statement.where(or_(
+            Book.title.ilike(pattern), Book.author.ilike(pattern), Book.description.ilike(pattern)
+        ))
+    return db.execute(statement.order_by(Book.id).limit(limit)).scalars().all()
+
+
+def timed(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def page_after(db, q: str, pages: int):
+    after = None
+    for _ in range(pages):
+        results = books.book.search(db, q, after=after)
+        found, score = results[-1]
+        after = (score, found.id)
+    return after
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"Seeding {total} books...")
+    words = seed(total)
+
+    db = SessionLocal()
+    # Share of books matching: ~82%, ~1.5%, ~0.02% and ~1.2%
+    queries = [
+        ("stopword", words[0]),
+        ("common word", words[100]),
+        ("rare word", words[15_000]),
+        ("two words", f"{words[3]} {words[40]}"),
+    ]
+    for label, q in queries:
+        fts_ms = timed(lambda: books.book.search(db, q))
+        like_ms = timed(lambda: like_search(db, q), repeat=1)
+        print(f"{label:<12} {q!r:<24} fts5 {fts_ms:9.2f} ms   LIKE scan {like_ms:9.2f} ms")
+
+    after = page_after(db, words[100], 9)
+    print(f"{'page 10':<12} {words[100]!r:<24} fts5 {timed(lambda: books.book.search(db, words[100], after=after)):9.2f} ms")
+    db.close()
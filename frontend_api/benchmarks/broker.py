@@ -0,0 +1,138 @@
+"""
+In-memory stand-in for a RabbitMQ broker.
+
+The fake connection mimics the latency profile of pika's BlockingConnection:
+opening a connection costs a TCP + AMQP handshake, and every synchronous
+channel operation costs one network round-trip, as does every publish on a
+channel in publisher-confirm mode. InMemoryQueue stands in for
+the consuming side.
+"""
+import queue
+import threading
+import time
+from types import SimpleNamespace
+
+
+class FakeChannel:
+    def __init__(self, broker, rtt: float):
+        self.broker = broker
+        self.rtt = rtt
+        self.is_open = True
+        self.confirming = False
+
+    def exchange_declare(self, **kwargs):
+        time.sleep(self.rtt)
+
+    def basic_publish(self, exchange, routing_key, body, properties=None, mandatory=False):
+        # basic.publish is asynchronous on the wire, only the write is paid,
+        # unless the channel waits for the broker's confirm
+        if self.confirming:
+            time.sleep(self.rtt)
+        self.broker.deliver(routing_key, body)
+
+    def confirm_delivery(self):
+        time.sleep(self.rtt)
+        self.confirming = True
+
+
+class FakeConnection:
+    def __init__(self, broker, handshake: float, rtt: float):
+        time.sleep(handshake)
+        self.broker = broker
+        self.rtt = rtt
+        self.is_open = True
+
+    def channel(self):
+        time.sleep(self.rtt)
+        return FakeChannel(self.broker, self.rtt)
+
+    def process_data_events(self, time_limit=0):
+        pass
+
+    def close(self):
+        time.sleep(self.rtt)
+        self.is_open = False
+
+
+class FakeBroker:
+    """Counts published messages and hands out fake connections"""
+
+    def __init__(self, handshake: float = 0.003, rtt: float = 0.0005):
+        self.handshake = handshake
+        self.rtt = rtt
+        self.published = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    def connect(self):
+        with self._lock:
+            self.connections += 1
+        return FakeConnection(self, self.handshake, self.rtt)
+
+    def deliver(self, routing_key, body):
+        with self._lock:
+            self.published += 1
+
+
+class InMemoryQueue:
+    """
+    Consumer-side stand-in: plays the role of both the BlockingConnection and
+    its channel for a pre-filled queue, honouring the prefetch window and
+    running callbacks scheduled with add_callback_threadsafe on the consuming
+    thread, like pika does.
+    """
+
+    def __init__(self, bodies, prefetch_count: int = 1):
+        self._bodies = list(bodies)
+        self.prefetch_count = prefetch_count
+        self._callbacks = queue.Queue()
+        self._unacked = set()
+        self._timers = []
+        self.acked = 0
+        self.nacked = 0
+
+    def add_callback_threadsafe(self, callback):
+        self._callbacks.put(callback)
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self._settle(delivery_tag, multiple)
+        self.acked += 1
+
+    def basic_nack(self, delivery_tag, multiple=False, requeue=True):
+        self._settle(delivery_tag, multiple)
+        self.nacked += 1
+
+    def _settle(self, delivery_tag, multiple):
+        if multiple:
+            self._unacked = {tag for tag in self._unacked if tag > delivery_tag}
+        else:
+            self._unacked.discard(delivery_tag)
+
+    def call_later(self, delay, callback):
+        self._timers.append((time.perf_counter() + delay, callback))
+        return callback
+
+    def remove_timeout(self, timer):
+        self._timers = [t for t in self._timers if t[1] is not timer]
+
+    def _run_due_timers(self):
+        now = time.perf_counter()
+        due = [t for t in self._timers if t[0] <= now]
+        if due:
+            self._timers = [t for t in self._timers if t[0] > now]
+            for _, callback in due:
+                callback()
+
+    def consume(self, on_message_callback):
+        """Deliver every message, returning once all of them are settled"""
+        tag = 0
+        while tag < len(self._bodies) or self._unacked:
+            while tag < len(self._bodies) and len(self._unacked) < self.prefetch_count:
+                tag += 1
+                self._unacked.add(tag)
+                on_message_callback(self, SimpleNamespace(delivery_tag=tag), None, self._bodies[tag - 1])
+            try:
+                self._callbacks.get(timeout=0.001)()
+            except queue.Empty:
+                pass
+            self._run_due_timers()
@@ -29,17 +29,22 @@ from fastapi.testclient import TestClient
 import unittest.mock as mock
 from unittest.mock import patch, MagicMock
 
-# Mock RabbitMQ consumer to avoid connecting to actual RabbitMQ during tests
-with mock.patch('app.consumer.start_consumer'):
+# Mock RabbitMQ consumer and outbox relay to avoid connecting to actual RabbitMQ during tests
+with mock.patch('app.consumer.start_consumer'), \
+     mock.patch('app.outbox.start_outbox_relay'):
     from app.main import app
     from app.models import Base
     from app.dependencies import get_db
+    from app.instrumentation import instrument_engine
+    from app.cache import get_cache
 
 @pytest.fixture(scope="session")
 def engine():
     # Create a test database engine
     engine = create_engine(TEST_DATABASE_URL)
     Base.metadata.create_all(bind=engine)
+    # Count queries like the application's own engine
+    instrument_engine(engine)
     yield engine
     Base.metadata.drop_all(bind=engine)
 
@@ -66,6 +71,12 @@ def mock_rabbitmq():
          patch('app.consumer.start_consumer', return_value=None):
         yield
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Tests write to the database directly, start each one with an empty cache."""
+    get_cache().clear()
+    yield
+
 @pytest.fixture(scope="module")
 def client(engine):
     # Override the dependency to use the test database
@@ -149,4 +149,220 @@ def test_borrow_and_return_flow(client, db_session):
     
     # Check book is available again
     book_check = client.get(f"/books/{book_id}")
-    assert book_check.json()["is_available"] == True
\ No newline at end of file
+    assert book_check.json()["is_available"] == True
+
+def test_cursor_pagination(client, db_session):
+    for i in range(5):
+        db_session.add(Book(
+            title=f"Cursor Book {i}",
+            author="Cursor Author",
+            isbn=f"CURSOR{i}",
+            publisher="Cursor Publisher",
+            category="Cursor",
+            publication_year=2023,
+            is_available=True
+        ))
+    db_session.commit()
+
+    for sort in ("id", "title"):
+        seen = []
+        params = {"category": "Cursor", "limit": 2, "sort": sort}
+        response = client.get("/books/", params=params)
+        while True:
+            assert response.status_code == 200
+            seen.extend(book["isbn"] for book in response.json())
+            next_cursor = response.headers.get("X-Next-Cursor")
+            if not next_cursor:
+                break
+            assert 'rel="next"' in response.headers["Link"]
+            response = client.get("/books/", params={**params, "cursor": next_cursor})
+
+        assert seen == [f"CURSOR{i}" for i in range(5)]
+
+    # A cursor for one sort order is rejected for another
+    response = client.get("/books/", params={"category": "Cursor", "limit": 2, "sort": "id"})
+    bad = client.get("/books/", params={"sort": "title", "cursor": response.headers["X-Next-Cursor"]})
+    assert bad.status_code == 400
+
+
+def test_search_books(client, db_session):
+    from app.crud.books import book
+    from app.schemas import BookCreate
+
+    for isbn, title, author, description in [
+        ("SEARCH1", "Zephyrine Gardens", "Ada Quill", "A walk through zephyrine gardens"),
+        ("SEARCH2", "Kitchen Notes", "Zephyrine Moss", None),
+        ("SEARCH3", "Zephyrine Tides", "Bo Quill", "Gardening by the sea"),
+        ("SEARCH4", "Unrelated", "Someone", "Nothing to see"),
+    ]:
+        book.create(db_session, obj_in=BookCreate(
+            title=title, author=author, isbn=isbn, publisher="Search Publisher",
+            category="Search", publication_year=2023, description=description
+        ))
+
+    response = client.get("/books/search", params={"q": "zephyrine"})
+    assert response.status_code == 200
+    found = [item["isbn"] for item in response.json()]
+    assert sorted(found) == ["SEARCH1", "SEARCH2", "SEARCH3"]
+    # Mentioned in both the title and the description ranks first
+    assert found[0] == "SEARCH1"
+
+    # Every word must match, stemmed, and search syntax is taken literally
+    response = client.get("/books/search", params={"q": 'garden "quill" -'})
+    assert [item["isbn"] for item in response.json()] == ["SEARCH1", "SEARCH3"]
+
+    seen = []
+    response = client.get("/books/search", params={"q": "zephyrine", "limit": 2})
+    while True:
+        assert response.status_code == 200
+        seen.extend(item["isbn"] for item in response.json())
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if not next_cursor:
+            break
+        response = client.get("/books/search", params={"q": "zephyrine", "limit": 2, "cursor": next_cursor})
+    assert seen == found
+
+    assert client.get("/books/search", params={"q": "?!"}).json() == []
+    assert client.get("/books/search", params={"q": ""}).status_code == 422
+
+
+@pytest.mark.parametrize("path, params, key", [
+    ("/books/", {"sort": "id"}, []),
+    ("/books/", {"sort": "id"}, ["7"]),
+    ("/books/", {"sort": "id"}, [True]),
+    ("/books/", {"sort": "title"}, [1]),
+    ("/books/", {"sort": "title"}, ["Title", None]),
+    ("/books/search", {"q": "zephyrine"}, ["a"]),
+    ("/books/search", {"q": "zephyrine"}, [0.5, 1, 2]),
+])
+def test_tampered_cursor_is_rejected(client, path, params, key):
+    from app.pagination import encode_cursor
+
+    sort = params.get("sort", "rank")
+    response = client.get(path, params={**params, "cursor": encode_cursor(sort, key)})
+    assert response.status_code == 400
+
+
+def test_book_facets_follow_consumer_and_lending(client, db_session):
+    from app.consumer import apply_batch, handle_book_created, handle_book_updated
+    from app.crud import books
+
+    def counts(category):
+        categories = {item["value"]: item for item in client.get("/books/facets").json()["categories"]}
+        item = categories.get(category)
+        return (item["total"], item["available"]) if item else (0, 0)
+
+    for i in range(2):
+        handle_book_created({"title": f"Facet {i}", "author": "Author", "isbn": f"FFACET{i}", "publisher": "Facet Press",
+                             "category": "Facet Opera", "publication_year": 2023}, db_session)
+    db_session.commit()
+    assert counts("Facet Opera") == (2, 2)
+
+    # The bulk upsert path moves one book and adds another
+    apply_batch([
+        {"event_type": "book_created", "payload": {"isbn": "FFACET1", "title": "Facet 1", "author": "Author",
+                                                    "publisher": "Facet Press", "category": "Facet Ballet",
+                                                    "publication_year": 2023}},
+        {"event_type": "book_created", "payload": {"isbn": "FFACET2", "title": "Facet 2", "author": "Author",
+                                                    "publisher": "Facet Press", "category": "Facet Ballet",
+                                                    "publication_year": 2023}},
+    ], db_session)
+    db_session.commit()
+    assert counts("Facet Opera") == (1, 1)
+    assert counts("Facet Ballet") == (2, 2)
+
+    # Borrowing claims the book with a Core UPDATE, returning goes through the ORM
+    user = client.post("/users/", json={"email": "facets@test.com", "first_name": "Facet", "last_name": "Reader"})
+    opera_id = books.book.get_by_isbn(db_session, "FFACET0").id
+    borrowed = client.post("/lending/borrow/", json={"user_id": user.json()["id"], "book_id": opera_id, "duration_days": 7})
+    assert borrowed.status_code == 200
+    assert counts("Facet Opera") == (1, 0)
+    assert client.post(f"/lending/return/{borrowed.json()['id']}").status_code == 200
+    assert counts("Facet Opera") == (1, 1)
+
+    handle_book_updated({"id": opera_id, "category": "Facet Ballet"}, db_session)
+    db_session.commit()
+    assert counts("Facet Opera") == (0, 0)
+    assert counts("Facet Ballet") == (3, 3)
+
+
+def test_read_books_batch(client, db_session):
+    batch = [
+        Book(title=f"Batch Book {i}", author="Batch Author", isbn=f"BATCH00{i}", publisher="Batch Publisher",
+             category="Batch", publication_year=2023, is_available=i != 1)
+        for i in range(3)
+    ]
+    db_session.add_all(batch)
+    db_session.commit()
+    ids = [book.id for book in batch]
+    unknown = max(ids) + 1000
+
+    requested = [ids[2], unknown, ids[0], ids[1], ids[2]]
+    response = client.get("/books/batch", params={"ids": ",".join(map(str, requested))})
+    assert response.status_code == 200
+    data = response.json()
+    assert [book["id"] for book in data["books"]] == [ids[2], ids[0], ids[1]]
+    assert [book["is_available"] for book in data["books"]] == [True, True, False]
+    assert data["missing"] == [unknown]
+
+    # Repeated ids in the query string, and the ids in a body
+    assert client.get("/books/batch", params={"ids": requested}).json() == data
+    assert client.post("/books/batch", json={"ids": requested}).json() == data
+
+    assert client.get("/books/batch", params={"ids": "1,x"}).status_code == 422
+    assert client.post("/books/batch", json={"ids": []}).status_code == 422
+    assert client.post("/books/batch", json={"ids": list(range(1000))}).status_code == 422
+
+
+def test_book_etags(client, db_session):
+    from app.cache import get_cache
+    from app.consumer import apply_batch, handle_book_created, handle_book_updated
+    from app.crud import books
+
+    handle_book_created({"title": "ETag Book", "author": "Author", "isbn": "ETAG001", "publisher": "ETag Press",
+                         "category": "ETag", "publication_year": 2023}, db_session)
+    db_session.commit()
+    book_id = books.book.get_by_isbn(db_session, "ETAG001").id
+
+    def conditional_get(url, etag):
+        return client.get(url, headers={"If-None-Match": etag})
+
+    for url in (f"/books/{book_id}", "/books/?category=ETag"):
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        # Served from the cache, then straight from the (id, version) pairs
+        for clear in (False, True):
+            if clear:
+                get_cache().clear()
+            not_modified = conditional_get(url, f'"other", {etag}')
+            assert not_modified.status_code == 304
+            assert not_modified.headers["etag"] == etag
+            assert not_modified.content == b""
+        assert conditional_get(url, '"other"').status_code == 200
+
+    # Borrowing (a Core UPDATE), consumer updates and the bulk upsert all
+    # make new versions
+    user = client.post("/users/", json={"email": "etags@test.com", "first_name": "ETag", "last_name": "Reader"})
+    etag = client.get(f"/books/{book_id}").headers["etag"]
+    borrowed = client.post("/lending/borrow/", json={"user_id": user.json()["id"], "book_id": book_id, "duration_days": 7})
+    assert borrowed.status_code == 200
+    assert conditional_get(f"/books/{book_id}", etag).status_code == 200
+    assert client.post(f"/lending/return/{borrowed.json()['id']}").status_code == 200
+
+    etag = client.get(f"/books/{book_id}").headers["etag"]
+    listing_etag = client.get("/books/?category=ETag").headers["etag"]
+    handle_book_updated({"id": book_id, "title": "ETag Book, 2nd edition", "version": 1}, db_session)
+    db_session.commit()
+    assert conditional_get(f"/books/{book_id}", etag).status_code == 200
+    assert conditional_get("/books/?category=ETag", listing_etag).status_code == 200
+
+    listing_etag = client.get("/books/?category=ETag").headers["etag"]
+    apply_batch([{"event_type": "book_created", "payload": {
+        "isbn": "ETAG001", "title": "ETag Book, 3rd edition", "author": "Author", "publisher": "ETag Press",
+        "category": "ETag", "publication_year": 2023
+    }}], db_session)
+    db_session.commit()
+    response = conditional_get("/books/?category=ETag", listing_etag)
+    assert response.status_code == 200
+    assert response.json()[0]["title"] == "ETag Book, 3rd edition"
@@ -0,0 +1,94 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.dependencies import get_async_db
+from app.models import Book
+from app.routers import async_api_router
+
+TEST_ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
+
+
+@pytest.fixture(scope="module")
+def async_client(engine):
+    async_engine = create_async_engine(TEST_ASYNC_DATABASE_URL)
+    session_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(async_api_router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    with TestClient(app) as client:
+        yield client
+
+
+def test_async_borrow_and_return_flow(async_client, db_session):
+    book = Book(title="Async Book", author="Async Author", isbn="ASYNC001", publisher="Async Publisher",
+                category="Async", publication_year=2023, is_available=True)
+    db_session.add(book)
+    db_session.commit()
+
+    user = async_client.post("/users/", json={
+        "email": "async@example.com", "first_name": "Async", "last_name": "User"
+    })
+    assert user.status_code == 200
+    assert async_client.post("/users/", json={
+        "email": "async@example.com", "first_name": "Async", "last_name": "User"
+    }).status_code == 400
+
+    listing = async_client.get("/books/", params={"category": "Async"})
+    assert [b["isbn"] for b in listing.json()] == ["ASYNC001"]
+
+    lending_in = {"user_id": user.json()["id"], "book_id": book.id, "duration_days": 7}
+    borrowed = async_client.post("/lending/borrow/", json=lending_in)
+    assert borrowed.status_code == 200
+    assert async_client.post("/lending/borrow/", json=lending_in).status_code == 400
+    assert async_client.get(f"/books/{book.id}").json()["is_available"] is False
+
+    returned = async_client.post(f"/lending/return/{borrowed.json()['id']}")
+    assert returned.status_code == 200
+    assert returned.json()["return_date"] is not None
+    assert async_client.get(f"/books/{book.id}").json()["is_available"] is True
+
+
+def test_async_search_books(async_client, db_session):
+    from app.crud.books import reindex_search
+
+    book = Book(title="Async Yarrowby", author="Async Author", isbn="ASYNCFTS1", publisher="Async Publisher",
+                category="Async", publication_year=2023, is_available=True)
+    db_session.add(book)
+    db_session.flush()
+    reindex_search(db_session, [book.id])
+    db_session.commit()
+
+    response = async_client.get("/books/search", params={"q": "yarrowby"})
+    assert response.status_code == 200
+    assert [item["isbn"] for item in response.json()] == ["ASYNCFTS1"]
+
+
+def test_async_read_books_batch(async_client, db_session):
+    book = Book(title="Async Batch", author="Async Author", isbn="ASYNCBATCH1", publisher="Async Publisher",
+                category="Async", publication_year=2023, is_available=True)
+    db_session.add(book)
+    db_session.commit()
+
+    response = async_client.get("/books/batch", params={"ids": f"{book.id},{book.id + 1000}"})
+    assert response.status_code == 200
+    assert [item["isbn"] for item in response.json()["books"]] == ["ASYNCBATCH1"]
+    assert response.json()["missing"] == [book.id + 1000]
+    assert async_client.post("/books/batch", json={"ids": [book.id]}).json()["books"][0]["id"] == book.id
+
+
+def test_async_book_etags(async_client, db_session):
+    book = Book(title="Async ETag", author="Async Author", isbn="ASYNCETAG1", publisher="Async Publisher",
+                category="Async ETag", publication_year=2023, is_available=True)
+    db_session.add(book)
+    db_session.commit()
+
+    for url in (f"/books/{book.id}", "/books/?category=Async ETag"):
+        etag = async_client.get(url).headers["etag"]
+        assert async_client.get(url, headers={"If-None-Match": etag}).status_code == 304
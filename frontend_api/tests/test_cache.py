@@ -0,0 +1,75 @@
+import time
+
+from app.cache import BookCache, LocalBackend, RedisBackend
+from app.consumer import apply_message
+from app.models import Book
+
+
+def test_local_backend_ttl_and_lru():
+    backend = LocalBackend(max_entries=2, ttl=0.05)
+    backend.set("a", 1)
+    backend.set("b", 2)
+    assert backend.get("a") == 1
+
+    # "b" is now the least recently used entry
+    backend.set("c", 3)
+    assert backend.get("b") is None
+    assert backend.evictions == 1
+
+    time.sleep(0.06)
+    assert backend.get("a") is None
+
+
+def test_stale_read_is_not_cached_after_invalidation():
+    cache = BookCache(LocalBackend())
+    generation = cache.generation()
+    cache.invalidate([1])
+
+    # A row read before the invalidation must not be stored after it
+    cache.set_book(1, {"id": 1}, generation)
+    cache.set_listing({"limit": 10}, [], generation)
+    assert cache.get_book(1) is None
+    assert cache.get_listing({"limit": 10}, cache.generation()) is None
+
+
+def test_redis_detail_write_checks_generation_atomically(monkeypatch):
+    import sys
+    import types
+    from unittest.mock import MagicMock
+
+    client = MagicMock()
+    monkeypatch.setitem(sys.modules, "redis", types.SimpleNamespace(
+        Redis=MagicMock(from_url=MagicMock(return_value=client))
+    ))
+    cache = BookCache(RedisBackend("redis://localhost:6379/0", ttl=30.0))
+
+    cache.set_book(1, {"id": 1}, 4)
+
+    # One server-side script compares the generation and writes the entry
+    script = client.register_script.return_value
+    script.assert_called_once_with(
+        keys=["books:generation", "books:1"], args=[4, '{"id": 1}', 30000]
+    )
+    client.get.assert_not_called()
+    client.set.assert_not_called()
+
+
+def test_book_detail_cached_until_event(client, db_session):
+    book = Book(title="Cached Book", author="Author", isbn="CACHE001", publisher="Publisher",
+                category="Cache", publication_year=2023, is_available=True)
+    db_session.add(book)
+    db_session.commit()
+
+    assert client.get(f"/books/{book.id}").json()["title"] == "Cached Book"
+    assert client.get(f"/books/{book.id}").json()["title"] == "Cached Book"
+    listing = client.get("/books/", params={"category": "Cache"}).json()
+    assert [b["isbn"] for b in listing] == ["CACHE001"]
+
+    stats = client.get("/cache/stats").json()
+    assert stats["hits"] == 1 and stats["misses"] == 2
+
+    # The consumer's commit drops the detail entry and the cached listings
+    apply_message({"event_type": "book_updated", "payload": {"id": book.id, "title": "Renamed Book"}}, db_session)
+    assert client.get(f"/books/{book.id}").json()["title"] == "Renamed Book"
+    apply_message({"event_type": "book_deleted", "payload": {"id": book.id}}, db_session)
+    assert client.get("/books/", params={"category": "Cache"}).json() == []
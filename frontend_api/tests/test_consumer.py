@@ -90,4 +90,184 @@ def handle_book_deleted(data, db):
     
     # Delete the book
     db.delete(book_obj)
-    db.commit()
\ No newline at end of file
+    db.commit()
+
+def test_handlers_keep_search_index_current(db_session):
+    # handle_book_deleted is shadowed by the helper above
+    from app.consumer import handle_book_deleted as delete_book
+
+    def search(q):
+        return [found.isbn for found, _ in book.search(db_session, q)]
+
+    handle_book_created({
+        "title": "Quenby Harbour", "author": "Search Author", "isbn": "FTS001", "publisher": "Search Publisher",
+        "category": "Search", "publication_year": 2023
+    }, db_session)
+    assert search("quenby") == ["FTS001"]
+
+    book_id = book.get_by_isbn(db_session, "FTS001").id
+    handle_book_updated({"id": book_id, "title": "Wrenfield Harbour"}, db_session)
+    assert search("quenby") == []
+    assert search("wrenfield") == ["FTS001"]
+
+    delete_book({"id": book_id}, db_session)
+    assert search("wrenfield") == []
+
+
+def test_concurrent_dispatcher_keeps_per_book_order():
+    import json
+    import threading
+    import time
+    from app.consumer import OrderedWorkerPool, ConcurrentDispatcher
+
+    applied = []
+    lock = threading.Lock()
+
+    def slow_handler(data, db):
+        # Earlier events for a book sleep longer, so only lane ordering keeps them in sequence
+        time.sleep(0.01 * (3 - data["seq"]))
+        with lock:
+            applied.append((data["book_id"], data["seq"]))
+
+    settled = []
+    connection = MagicMock()
+    connection.add_callback_threadsafe.side_effect = lambda cb: settled.append(cb)
+    channel = MagicMock()
+
+    pool = OrderedWorkerPool(4, session_factory=MagicMock)
+    dispatcher = ConcurrentDispatcher(connection, pool)
+    with patch.dict('app.consumer.EVENT_HANDLERS', {'book_returned': slow_handler}):
+        tag = 0
+        for seq in range(3):
+            for book_id in range(5):
+                tag += 1
+                body = json.dumps({"event_type": "book_returned", "payload": {"book_id": book_id, "seq": seq}})
+                dispatcher.on_message(channel, MagicMock(delivery_tag=tag), None, body)
+        pool.shutdown(wait=True)
+
+    for book_id in range(5):
+        assert [seq for b, seq in applied if b == book_id] == [0, 1, 2]
+
+    # Acks were handed to the connection thread rather than sent from the workers
+    assert len(settled) == 15
+    channel.basic_ack.assert_not_called()
+    for cb in settled:
+        cb()
+    assert channel.basic_ack.call_count == 15
+
+
+def test_concurrent_dispatcher_requeues_failures():
+    import json
+    from app.consumer import OrderedWorkerPool, ConcurrentDispatcher
+
+    connection = MagicMock()
+    connection.add_callback_threadsafe.side_effect = lambda cb: cb()
+    channel = MagicMock()
+
+    pool = OrderedWorkerPool(2, session_factory=MagicMock)
+    dispatcher = ConcurrentDispatcher(connection, pool)
+    failing = MagicMock(side_effect=RuntimeError("database unavailable"))
+    with patch.dict('app.consumer.EVENT_HANDLERS', {'book_deleted': failing}):
+        body = json.dumps({"event_type": "book_deleted", "payload": {"id": 1}})
+        dispatcher.on_message(channel, MagicMock(delivery_tag=7), None, body)
+        pool.shutdown(wait=True)
+
+    channel.basic_nack.assert_called_once_with(delivery_tag=7, requeue=True)
+
+
+def _book_created(isbn, **overrides):
+    import json
+    payload = {
+        "title": f"Batch Book {isbn}",
+        "author": "Batch Author",
+        "isbn": isbn,
+        "publisher": "Batch Publisher",
+        "category": "Batch",
+        "publication_year": 2023,
+        **overrides
+    }
+    return json.dumps({"event_type": "book_created", "payload": payload})
+
+
+def test_batching_dispatcher_commits_and_acks_once(engine):
+    from sqlalchemy.orm import sessionmaker
+    from app.consumer import BatchingDispatcher
+
+    connection = MagicMock()
+    connection.add_callback_threadsafe.side_effect = lambda cb: cb()
+    channel = MagicMock()
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    dispatcher = BatchingDispatcher(batch_size=10, max_wait=0.05, session_factory=Session)
+    dispatcher.attach(connection)
+    for tag, isbn in enumerate(["BATCH001", "BATCH002", "BATCH003"], start=1):
+        dispatcher.on_message(channel, MagicMock(delivery_tag=tag), None, _book_created(isbn))
+
+    # Below batch size: nothing applied yet, a flush timer is armed
+    connection.call_later.assert_called_once()
+    dispatcher.flush().result()
+
+    channel.basic_ack.assert_called_once_with(delivery_tag=3, multiple=True)
+    db = Session()
+    try:
+        assert book.get_by_isbn(db, "BATCH003") is not None
+    finally:
+        db.close()
+
+
+def test_batching_dispatcher_isolates_failures(engine):
+    import json
+    from sqlalchemy.orm import sessionmaker
+    from app.consumer import BatchingDispatcher
+
+    connection = MagicMock()
+    connection.add_callback_threadsafe.side_effect = lambda cb: cb()
+    channel = MagicMock()
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    dispatcher = BatchingDispatcher(batch_size=3, max_wait=1, session_factory=Session)
+    dispatcher.attach(connection)
+    # The second payload is missing required fields and must be requeued alone
+    bodies = [
+        _book_created("BATCH101"),
+        json.dumps({"event_type": "book_created", "payload": {"isbn": "BATCH102"}}),
+        _book_created("BATCH103")
+    ]
+    for tag, body in enumerate(bodies, start=1):
+        dispatcher.on_message(channel, MagicMock(delivery_tag=tag), None, body)
+    dispatcher._worker.shutdown(wait=True)
+
+    assert [c.kwargs["delivery_tag"] for c in channel.basic_ack.call_args_list] == [1, 3]
+    channel.basic_nack.assert_called_once_with(delivery_tag=2, requeue=True)
+
+
+def test_apply_batch_folds_book_events_into_upsert(db_session):
+    import json
+    from app.consumer import apply_batch
+
+    messages = [json.loads(_book_created(f"FOLD00{i}")) for i in range(3)]
+    messages.append({"event_type": "book_deleted", "payload": {"id": -1}})
+    messages.append(json.loads(_book_created("FOLD003")))
+
+    with patch('app.crud.books.book.upsert_many', wraps=book.upsert_many) as upsert_many:
+        apply_batch(messages, db_session)
+
+    # The delete splits the batch into two upserts and keeps event order
+    assert [len(c.kwargs["objs_in"]) for c in upsert_many.call_args_list] == [3, 1]
+    assert book.get_by_isbn(db_session, "FOLD003") is not None
+
+
+def test_book_and_lending_events_share_a_lane():
+    from app.consumer import OrderedWorkerPool, ordering_key
+
+    updated = {"event_type": "book_updated", "payload": {"id": 7, "isbn": "LANE007", "title": "Lane"}}
+    # A lending's own id is unrelated to the book it lends
+    borrowed = {"event_type": "book_borrowed", "payload": {"id": 3, "book_id": 7, "user_id": 1}}
+    returned = {"event_type": "book_returned", "payload": {"book_id": 7}}
+
+    assert ordering_key(updated) == ordering_key(borrowed) == ordering_key(returned) == "book:7"
+    assert ordering_key({"event_type": "book_borrowed", "payload": {"id": 7, "book_id": 3}}) == "book:3"
+
+    pool = OrderedWorkerPool(8, session_factory=MagicMock)
+    assert pool.lane(ordering_key(updated)) is pool.lane(ordering_key(borrowed))
+    pool.shutdown()
@@ -1,7 +1,14 @@
 import pytest
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
 
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
 from app.crud import books, users, lending
+from app.crud.lending import BookNotFoundError, BookUnavailableError
 from app.models import Book, User, Lending
 from app.schemas import UserCreate, BookCreate, LendingCreate
 
@@ -91,4 +98,142 @@ def test_return_book(db_session):
     
     # Check that book is available again
     db_session.refresh(book)
-    assert book.is_available == True
\ No newline at end of file
+    assert book.is_available == True
+
+def test_upsert_many_books(db_session):
+    existing = books.book.create(db_session, obj_in=BookCreate(
+        title="Upsert Original",
+        author="Upsert Author",
+        isbn="UPSERT001",
+        publisher="Upsert Publisher",
+        category="Test",
+        publication_year=2020
+    ))
+
+    rows = [
+        {"title": "Upsert Updated", "author": "Upsert Author", "isbn": "UPSERT001",
+         "publisher": "Upsert Publisher", "category": "Test", "publication_year": 2021},
+        {"title": "Upsert New", "author": "Upsert Author", "isbn": "UPSERT002",
+         "publisher": "Upsert Publisher", "category": "Test", "publication_year": 2022},
+        # Duplicate ISBN within the batch: the last payload wins
+        {"title": "Upsert New v2", "author": "Upsert Author", "isbn": "UPSERT002",
+         "publisher": "Upsert Publisher", "category": "Test", "publication_year": 2022},
+    ]
+    assert books.book.upsert_many(db_session, objs_in=rows) == 2
+
+    db_session.refresh(existing)
+    assert existing.title == "Upsert Updated"
+    assert existing.publication_year == 2021
+    created = books.book.get_by_isbn(db_session, "UPSERT002")
+    assert created.title == "Upsert New v2"
+    assert created.is_available == True
+
+
+def test_upsert_many_keeps_omitted_columns(db_session):
+    existing = books.book.create(db_session, obj_in=BookCreate(
+        title="Partial Original",
+        author="Partial Author",
+        isbn="UPSERT003",
+        publisher="Partial Publisher",
+        category="Test",
+        publication_year=2020,
+        description="Kept when a payload leaves it out"
+    ))
+
+    rows = [
+        # No description or publisher: both keep their current values
+        {"title": "Partial Updated", "author": "Partial Author", "isbn": "UPSERT003",
+         "category": "Test", "publication_year": 2021},
+        {"title": "Partial New", "author": "Partial Author", "isbn": "UPSERT004",
+         "publisher": "Partial Publisher", "category": "Test", "publication_year": 2022},
+        # A later partial payload for the same ISBN is merged into the earlier one
+        {"isbn": "UPSERT004", "description": "Added later"},
+    ]
+    assert books.book.upsert_many(db_session, objs_in=rows) == 2
+
+    db_session.refresh(existing)
+    assert (existing.title, existing.publication_year) == ("Partial Updated", 2021)
+    assert existing.description == "Kept when a payload leaves it out"
+    assert existing.publisher == "Partial Publisher"
+    created = books.book.get_by_isbn(db_session, "UPSERT004")
+    assert (created.title, created.description) == ("Partial New", "Added later")
+
+
+def test_concurrent_borrows_have_one_winner(engine, db_session):
+    book = books.book.create(db_session, obj_in=BookCreate(
+        title="Popular Book", author="Author", isbn="POPULAR1",
+        publisher="Publisher", category="Test", publication_year=2023
+    ))
+    user = users.user.create(db_session, obj_in=UserCreate(
+        email="racer@frontend.com", first_name="Race", last_name="Condition"
+    ))
+
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    start = threading.Barrier(16)
+
+    def borrow(_):
+        db = session_factory()
+        try:
+            start.wait()
+            lending.borrow_book(db, obj_in=LendingCreate(user_id=user.id, book_id=book.id, duration_days=7))
+            return "borrowed"
+        except BookUnavailableError:
+            return "unavailable"
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(borrow, range(16)))
+
+    assert results.count("borrowed") == 1
+    assert results.count("unavailable") == 15
+    lendings = db_session.execute(select(Lending).where(Lending.book_id == book.id)).scalars().all()
+    assert len(lendings) == 1
+
+    with pytest.raises(BookNotFoundError):
+        lending.borrow_book(db_session, obj_in=LendingCreate(user_id=user.id, book_id=999999, duration_days=7))
+
+
+def test_postgresql_search_score_is_float8():
+    from sqlalchemy.dialects import postgresql
+
+    statement = books._search_statement("postgresql", "harbour", limit=2, after=(0.0607927, 3))
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    # The selected score and every comparison against the cursor use the cast value
+    assert sql.count("CAST(ts_rank(") == sql.count("ts_rank(") == 4
+    assert "AS DOUBLE PRECISION)" in sql
+
+
+@pytest.mark.skipif(
+    not os.environ.get("TEST_POSTGRES_URL"),
+    reason="set TEST_POSTGRES_URL to an empty PostgreSQL database to run"
+)
+def test_postgresql_search_pages_without_gaps_or_repeats():
+    from sqlalchemy import create_engine
+    from app.models import Base
+
+    engine = create_engine(os.environ["TEST_POSTGRES_URL"])
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        # Equal titles tie on rank, the rest rank by how often the word appears
+        for n, title in enumerate(["Harbour", "Harbour", "Harbour Lights", "Harbour", "Old Harbour Harbour"]):
+            books.book.create(db, obj_in=BookCreate(
+                title=title, author="Author", isbn=f"PGSEARCH{n}", publisher="Publisher",
+                category="Search", publication_year=2023, description="harbour " * n
+            ))
+        everything = [found.isbn for found, _ in books.book.search(db, "harbour", limit=100)]
+
+        seen, after = [], None
+        while True:
+            page = books.book.search(db, "harbour", limit=2, after=after)
+            if not page:
+                break
+            seen.extend(found.isbn for found, _ in page)
+            after = (page[-1][1], page[-1][0].id)
+        assert seen == everything
+        assert len(everything) == 5
+    finally:
+        db.close()
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import select
+
+from app.config import settings
+from app.instrumentation import assert_max_queries, count_queries
+from app.models import Book, User
+
+
+def test_borrow_query_budget(client, db_session):
+    user = User(email="budget@test.com", first_name="Query", last_name="Budget")
+    book = Book(title="Budget Book", author="Author", isbn="BUDGET001", publisher="Publisher",
+                category="Budget", publication_year=2023, is_available=True)
+    db_session.add_all([user, book])
+    db_session.commit()
+    borrow_data = {"user_id": user.id, "book_id": book.id, "duration_days": 7}
+
+    # User lookup, book claim, lending insert, facet count update, outbox
+    # insert, lending refresh
+    with assert_max_queries(6):
+        response = client.post("/lending/borrow/", json=borrow_data)
+    assert response.status_code == 200
+
+
+def test_repeated_statements_are_flagged(db_session):
+    with count_queries() as stats:
+        for book_id in range(3):
+            db_session.execute(select(Book).where(Book.id == book_id)).scalar_one_or_none()
+    assert stats.count == 3
+    assert list(stats.repeated(3).values()) == [3]
+
+    with pytest.raises(AssertionError, match="at most 2 queries"):
+        with assert_max_queries(2):
+            for book_id in range(3):
+                db_session.execute(select(Book).where(Book.id == book_id)).scalar_one_or_none()
+
+
+def test_debug_headers(client, db_session, monkeypatch):
+    book = Book(title="Debug Book", author="Author", isbn="DEBUG001", publisher="Publisher",
+                category="Debug", publication_year=2023, is_available=True)
+    db_session.add(book)
+    db_session.commit()
+
+    assert "x-query-count" not in client.get(f"/books/{book.id}").headers
+
+    monkeypatch.setattr(settings, "QUERY_DEBUG", True)
+    response = client.get("/books/?category=Debug")
+    assert int(response.headers["x-query-count"]) >= 1
+    assert response.headers["x-query-repeated"] == "0"
+
+
+def test_batch_lookup_is_one_query(client, db_session):
+    batch = [
+        Book(title=f"Batch Budget {i}", author="Author", isbn=f"BATCHBUDGET{i:02d}", publisher="Publisher",
+             category="Budget", publication_year=2023, is_available=True)
+        for i in range(30)
+    ]
+    db_session.add_all(batch)
+    db_session.commit()
+    ids = ",".join(str(book.id) for book in batch)
+
+    with assert_max_queries(1):
+        response = client.get("/books/batch", params={"ids": ids})
+    assert len(response.json()["books"]) == 30
+
+
+def test_get_many_chunks_long_id_lists(db_session):
+    from app.crud.books import book as book_crud
+
+    batch = [
+        Book(title=f"Chunked {i}", author="Author", isbn=f"CHUNKED{i:02d}", publisher="Publisher",
+             category="Budget", publication_year=2023, is_available=True)
+        for i in range(5)
+    ]
+    db_session.add_all(batch)
+    db_session.commit()
+    ids = [book.id for book in reversed(batch)] + [-1]
+
+    with count_queries() as stats:
+        found, missing = book_crud.get_many(db_session, ids, chunk_size=2)
+    assert stats.count == 3
+    assert [book.id for book in found] == ids[:-1]
+    assert missing == [-1]
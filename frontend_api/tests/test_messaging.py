@@ -0,0 +1,151 @@
+import asyncio
+import json
+import threading
+import time
+
+from sqlalchemy import select
+
+from app.consumer import create_async_consumer
+from app.messaging import AsyncMessaging
+from tests.local_broker import LocalBroker
+from app.models import Book
+
+
+async def _wait_for(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_async_consumer_keeps_order_per_key_and_requeues_failures():
+    broker = LocalBroker()
+    handled = []
+    failed_once = set()
+    lock = threading.Lock()
+
+    def handle(message):
+        payload = message["payload"]
+        time.sleep(0.001 * (payload["seq"] % 3))
+        with lock:
+            if payload.get("fail") and payload["seq"] not in failed_once:
+                failed_once.add(payload["seq"])
+                return False
+            handled.append((payload["book_id"], payload["seq"]))
+        return True
+
+    async def scenario():
+        messaging = AsyncMessaging(
+            "test_queue", ["book_borrowed"], handle,
+            ordering_key=lambda m: m["payload"]["book_id"],
+            prefetch_count=10, workers=4, connect=broker.connect
+        )
+        await messaging.start()
+        for seq in range(20):
+            await messaging.publish("book_borrowed", {"book_id": seq % 2, "seq": seq, "fail": seq == 7})
+        broker.route("book_borrowed", b"not json")
+
+        queue = broker.queues["test_queue"]
+        await _wait_for(lambda: len(handled) == 20)
+        await messaging.stop()
+        return queue.settled
+
+    settled = asyncio.run(scenario())
+
+    # The failed message was requeued and applied later; everything else kept its order
+    for book_id in (0, 1):
+        seqs = [seq for key, seq in handled if key == book_id and seq != 7]
+        assert seqs == sorted(seqs)
+    assert (1, 7) in handled
+    assert ("reject", b"not json") in settled
+    assert [outcome for outcome, _ in settled].count("nack") == 1
+
+
+def test_async_consumer_drains_in_flight_messages_on_stop():
+    broker = LocalBroker()
+    started = threading.Event()
+
+    def handle(message):
+        started.set()
+        time.sleep(0.1)
+        return True
+
+    async def scenario():
+        messaging = AsyncMessaging("drain_queue", ["user_created"], handle, connect=broker.connect)
+        await messaging.start()
+        await messaging.publish("user_created", {"id": 1})
+        await _wait_for(started.is_set)
+        await messaging.stop(timeout=5)
+        return broker.queues["drain_queue"].settled
+
+    assert asyncio.run(scenario()) == [("ack", json.dumps({"event_type": "user_created", "payload": {"id": 1}}).encode())]
+
+
+def test_async_consumer_applies_events(db_session):
+    broker = LocalBroker()
+
+    async def scenario():
+        messaging = create_async_consumer(connect=broker.connect)
+        await messaging.start()
+        await messaging.publish("book_created", {
+            "title": "Async Event Book", "author": "Author", "isbn": "AIOPIKA1",
+            "publisher": "Publisher", "category": "Async", "publication_year": 2023
+        })
+        queue = broker.queues["frontend_service_queue"]
+        await _wait_for(lambda: queue.settled)
+        await messaging.stop()
+        return queue.settled
+
+    assert [outcome for outcome, _ in asyncio.run(scenario())] == ["ack"]
+    book = db_session.execute(select(Book).where(Book.isbn == "AIOPIKA1")).scalar_one()
+    assert book.title == "Async Event Book"
+
+
+def test_both_backends_publish_the_same_bytes():
+    from unittest.mock import patch
+    from app import publisher
+
+    payload = {"id": 1, "book_id": 7, "due_date": "2026-11-01"}
+    broker = LocalBroker()
+
+    async def scenario():
+        channel = await (await broker.connect()).channel()
+        queue = await channel.declare_queue("wire_queue")
+        await queue.bind(await channel.declare_exchange("library_events", "topic"), "book_borrowed")
+        messaging = AsyncMessaging("unused_queue", [], lambda message: True, connect=broker.connect)
+        await messaging.start()
+        await messaging.publish("book_borrowed", payload)
+        await messaging.stop()
+        return await queue._ready.get()
+
+    with patch('app.publisher.get_pool') as get_pool:
+        publisher.publish_event("book_borrowed", payload)
+
+    assert get_pool.return_value.publish.call_args.kwargs["body"].encode() == asyncio.run(scenario())
+
+
+def test_start_messaging_retries_until_broker_is_reachable():
+    from app import messaging as messaging_module
+
+    broker = LocalBroker()
+    attempts = []
+
+    async def connect():
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise ConnectionError("connection refused")
+        return await broker.connect()
+
+    async def scenario():
+        messaging = AsyncMessaging("retry_queue", ["user_created"], lambda message: True, connect=connect)
+        # Returns straight away, the app comes up while RabbitMQ is down
+        await messaging_module.start_messaging(messaging, retry_delay=0.01)
+        assert messaging_module.get_messaging() is messaging
+        await _wait_for(lambda: messaging._consumer_tag is not None)
+        await messaging.publish("user_created", {"id": 1})
+        await _wait_for(lambda: broker.queues["retry_queue"].settled)
+        await messaging_module.stop_messaging()
+        return broker.queues["retry_queue"].settled
+
+    assert [outcome for outcome, _ in asyncio.run(scenario())] == ["ack"]
+    assert len(attempts) == 3
@@ -0,0 +1,142 @@
+import json
+import pika
+import pytest
+from unittest.mock import patch
+from sqlalchemy import select
+
+from app import outbox
+from app.publisher import MessageRejectedError
+from app.config import settings
+from app.crud import books, users, lending
+from app.models import OutboxDeadLetter, OutboxEvent
+from app.schemas import UserCreate, BookCreate, LendingCreate
+
+
+def _broker(published, fail_on=()):
+    """A publish_batch stand-in that records events and rejects the given ones"""
+    def publish_batch(batch):
+        while batch:
+            event_type, payload = batch[0]
+            if (event_type, payload) in fail_on:
+                raise MessageRejectedError(f"{event_type} event rejected: NackError")
+            published.append((event_type, payload))
+            del batch[0]
+    return publish_batch
+
+
+def _drain(db_session):
+    """Publish and delete whatever earlier tests left in the outbox"""
+    with patch('app.publisher.publish_batch', side_effect=_broker([])):
+        while outbox.relay_batch(db_session):
+            pass
+
+
+def test_borrow_writes_outbox_event(db_session):
+    _drain(db_session)
+    user = users.user.create(db_session, obj_in=UserCreate(
+        email="outbox@frontend.com", first_name="Outbox", last_name="User"
+    ))
+    book = books.book.create(db_session, obj_in=BookCreate(
+        title="Outbox Book",
+        author="Outbox Author",
+        isbn="OUTBOX123",
+        publisher="Outbox Publisher",
+        category="Test",
+        publication_year=2023
+    ))
+    lending_record = lending.borrow_book(db_session, obj_in=LendingCreate(
+        user_id=user.id, book_id=book.id, duration_days=7
+    ))
+
+    events = db_session.execute(select(OutboxEvent).order_by(OutboxEvent.id)).scalars().all()
+    assert [e.event_type for e in events] == ["user_created", "book_borrowed"]
+    payload = json.loads(events[1].payload)
+    assert payload["id"] == lending_record.id
+    assert payload["due_date"] == lending_record.due_date.isoformat()
+
+
+def test_relay_publishes_in_order_and_deletes(db_session):
+    _drain(db_session)
+    outbox.add_event(db_session, "book_borrowed", {"id": 1})
+    outbox.add_event(db_session, "book_returned", {"id": 1})
+    db_session.commit()
+
+    published = []
+    with patch('app.publisher.publish_batch', side_effect=_broker(published)) as publish_batch:
+        assert outbox.relay_batch(db_session) == 2
+
+    # One bulk publish for the whole batch
+    publish_batch.assert_called_once()
+    assert published == [("book_borrowed", {"id": 1}), ("book_returned", {"id": 1})]
+    assert db_session.execute(select(OutboxEvent)).first() is None
+
+
+def test_relay_keeps_events_on_failure(db_session):
+    _drain(db_session)
+    outbox.add_event(db_session, "book_borrowed", {"id": 2})
+    outbox.add_event(db_session, "book_returned", {"id": 2})
+    db_session.commit()
+
+    published = []
+    with patch('app.publisher.publish_batch', side_effect=_broker(published, [("book_returned", {"id": 2})])):
+        assert outbox.relay_batch(db_session) == 1
+
+    assert published == [("book_borrowed", {"id": 2})]
+
+    remaining = db_session.execute(select(OutboxEvent)).scalars().all()
+    assert [(e.event_type, e.attempts) for e in remaining] == [("book_returned", 1)]
+    _drain(db_session)
+
+
+def test_relay_dead_letters_after_max_attempts(db_session, monkeypatch):
+    _drain(db_session)
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 2)
+    outbox.add_event(db_session, "book_borrowed", {"id": 3})
+    outbox.add_event(db_session, "book_returned", {"id": 3})
+    db_session.commit()
+
+    published = []
+    with patch('app.publisher.publish_batch', side_effect=_broker(published, [("book_borrowed", {"id": 3})])):
+        assert outbox.relay_batch(db_session) == 0
+        assert outbox.relay_batch(db_session) == 0
+        # The poisoned event is out of the way, so the next one goes out
+        assert outbox.relay_batch(db_session) == 1
+
+    assert published == [("book_returned", {"id": 3})]
+    assert db_session.execute(select(OutboxEvent)).first() is None
+    dead = db_session.execute(select(OutboxDeadLetter)).scalars().all()
+    assert [(d.event_type, json.loads(d.payload), d.attempts) for d in dead] == [("book_borrowed", {"id": 3}, 2)]
+    assert "NackError" in dead[0].last_error
+    db_session.query(OutboxDeadLetter).delete()
+    db_session.commit()
+
+
+def test_relay_skips_the_broker_when_outbox_is_empty(db_session):
+    _drain(db_session)
+    with patch('app.publisher.publish_batch') as publish_batch:
+        assert outbox.relay_batch(db_session) == 0
+    publish_batch.assert_not_called()
+
+
+def test_broker_outage_does_not_use_up_attempts(db_session, monkeypatch):
+    _drain(db_session)
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 2)
+    outbox.add_event(db_session, "book_borrowed", {"id": 4})
+    outbox.add_event(db_session, "book_returned", {"id": 4})
+    db_session.commit()
+
+    down = pika.exceptions.AMQPConnectionError("connection refused")
+    with patch('app.publisher.publish_batch', side_effect=down):
+        for _ in range(settings.OUTBOX_MAX_ATTEMPTS + 3):
+            with pytest.raises(pika.exceptions.AMQPConnectionError):
+                outbox.relay_batch(db_session)
+
+    remaining = db_session.execute(select(OutboxEvent).order_by(OutboxEvent.id)).scalars().all()
+    assert [(e.event_type, e.attempts) for e in remaining] == [("book_borrowed", 0), ("book_returned", 0)]
+    assert db_session.execute(select(OutboxDeadLetter)).first() is None
+
+    # Once the broker is back everything goes out in order
+    published = []
+    with patch('app.publisher.publish_batch', side_effect=_broker(published)):
+        assert outbox.relay_batch(db_session) == 2
+    assert published == [("book_borrowed", {"id": 4}), ("book_returned", {"id": 4})]
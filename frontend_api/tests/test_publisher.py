@@ -0,0 +1,127 @@
+import json
+import pytest
+import pika
+from unittest.mock import patch, MagicMock
+
+from app.publisher import ChannelPool
+
+
+def test_pool_reuses_connection():
+    mock_connection = MagicMock()
+    with patch('app.publisher.get_connection', return_value=mock_connection) as get_connection:
+        pool = ChannelPool(size=2)
+        for i in range(5):
+            pool.publish("book_borrowed", json.dumps({"id": i}), pika.BasicProperties())
+
+    # One handshake and one exchange declaration for all publishes
+    get_connection.assert_called_once()
+    channel = mock_connection.channel.return_value
+    channel.exchange_declare.assert_called_once()
+    assert channel.basic_publish.call_count == 5
+
+
+def test_pool_reconnects_after_lost_channel():
+    broken_connection = MagicMock()
+    broken_connection.channel.return_value.basic_publish.side_effect = \
+        pika.exceptions.StreamLostError("connection reset")
+    healthy_connection = MagicMock()
+
+    with patch('app.publisher.get_connection', side_effect=[broken_connection, healthy_connection]):
+        pool = ChannelPool(size=1)
+        pool.publish("user_created", "{}", pika.BasicProperties())
+
+    broken_connection.close.assert_called_once()
+    healthy_connection.channel.return_value.basic_publish.assert_called_once()
+
+
+def test_pool_times_out_when_exhausted():
+    with patch('app.publisher.get_connection', return_value=MagicMock()):
+        pool = ChannelPool(size=1, acquire_timeout=0.01)
+        item = pool.acquire()
+        with pytest.raises(TimeoutError):
+            pool.acquire()
+        pool.release(item)
+        assert pool.acquire() is item
+
+
+def test_pool_returns_channel_after_unexpected_error():
+    with patch('app.publisher.get_connection', return_value=MagicMock()) as get_connection:
+        pool = ChannelPool(size=1, acquire_timeout=0.01)
+        channel = get_connection.return_value.channel.return_value
+        channel.basic_publish.side_effect = TypeError("body must be bytes or str")
+        with pytest.raises(TypeError):
+            pool.publish("user_created", object(), pika.BasicProperties())
+
+        # The channel went back to the pool instead of leaking its slot
+        channel.basic_publish.side_effect = None
+        pool.publish("user_created", "{}", pika.BasicProperties())
+    get_connection.assert_called_once()
+
+
+def test_pool_close_leaves_checked_out_connections_to_their_thread():
+    idle, busy = MagicMock(), MagicMock()
+    with patch('app.publisher.get_connection', side_effect=[busy, idle]):
+        pool = ChannelPool(size=2)
+        checked_out = pool.acquire()
+        pool.release(pool.acquire())
+        pool.close()
+
+    idle.close.assert_called_once()
+    # Still in use by another thread, so it is closed when that thread returns it
+    busy.close.assert_not_called()
+    pool.release(checked_out)
+    busy.close.assert_called_once()
+    assert pool._idle.empty()
+
+
+def test_pool_reports_nack_without_reconnecting():
+    with patch('app.publisher.get_connection', return_value=MagicMock()) as get_connection:
+        pool = ChannelPool(size=1, acquire_timeout=0.01)
+        channel = get_connection.return_value.channel.return_value
+        channel.basic_publish.side_effect = pika.exceptions.NackError([])
+        with pytest.raises(pika.exceptions.NackError):
+            pool.publish("user_created", "{}", pika.BasicProperties())
+
+        # Not republished, and the channel went back to the pool
+        assert channel.basic_publish.call_count == 1
+        channel.basic_publish.side_effect = None
+        pool.publish("user_created", "{}", pika.BasicProperties())
+    get_connection.assert_called_once()
+    get_connection.return_value.close.assert_not_called()
+
+
+def test_pool_publishes_batch_on_one_confirmed_channel():
+    with patch('app.publisher.get_connection', return_value=MagicMock()) as get_connection:
+        pool = ChannelPool(size=2)
+        channel = get_connection.return_value.channel.return_value
+        channel.basic_publish.side_effect = [None, None, pika.exceptions.NackError([])]
+        batch = [("book_borrowed", json.dumps({"id": i})) for i in range(4)]
+        with pytest.raises(pika.exceptions.NackError):
+            pool.publish_batch(batch, pika.BasicProperties())
+
+    channel.confirm_delivery.assert_called_once()
+    get_connection.assert_called_once()
+    # The two confirmed messages left the batch, the rest are kept for a retry
+    assert batch == [("book_borrowed", json.dumps({"id": i})) for i in (2, 3)]
+
+
+def test_publish_batch_reports_rejected_and_unserializable_events():
+    from app import publisher
+
+    with patch('app.publisher.get_connection', return_value=MagicMock()) as get_connection:
+        publisher.close_publisher()
+        channel = get_connection.return_value.channel.return_value
+
+        channel.basic_publish.side_effect = [None, pika.exceptions.NackError([])]
+        batch = [("book_borrowed", {"id": 1}), ("book_returned", {"id": 1})]
+        with pytest.raises(publisher.MessageRejectedError, match="book_returned"):
+            publisher.publish_batch(batch)
+        assert batch == [("book_returned", {"id": 1})]
+
+        # Events ahead of an unserializable one are still published
+        channel.basic_publish.side_effect = None
+        batch = [("book_borrowed", {"id": 2}), ("book_returned", {"id": object()})]
+        with pytest.raises(publisher.MessageRejectedError, match="not serializable"):
+            publisher.publish_batch(batch)
+        assert [event_type for event_type, _ in batch] == ["book_returned"]
+        publisher.close_publisher()